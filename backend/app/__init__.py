@@ -19,6 +19,12 @@ def create_app(config_class='app.config.Config'):
     cors.init_app(app)
     jwt.init_app(app)
 
+    from utils.instrumentation import init_instrumentation
+    init_instrumentation(app)
+
+    from utils.report_cards import init_report_cards
+    init_report_cards(app)
+
     # Register blueprints
     from routes.auth import auth_bp
     from routes.students import students_bp
@@ -26,6 +32,7 @@ def create_app(config_class='app.config.Config'):
     from routes.attendance import attendance_bp
     from routes.timetable import timetable_bp
     from routes.results import results_bp
+    from routes.terms import terms_bp
     from routes.index import main_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -34,7 +41,12 @@ def create_app(config_class='app.config.Config'):
     app.register_blueprint(attendance_bp, url_prefix='/api/attendance')
     app.register_blueprint(timetable_bp, url_prefix='/api/timetable')
     app.register_blueprint(results_bp, url_prefix='/api/results')
+    app.register_blueprint(terms_bp, url_prefix='/api/terms')
 
     app.register_blueprint(main_bp)
 
+    # Register CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+
     return app
@@ -0,0 +1,86 @@
+from collections import Counter
+import time
+import click
+from app import db
+from app.models import Student
+from utils.attendance import rebuild_attendance_rollup
+from utils.fees import rebuild_fee_balances
+from utils.fee_import import import_payments
+from utils.student_search import rebuild_student_search
+from utils.student_import import import_students
+from utils.synthetic_data import generate_school_data
+
+def register_commands(app):
+    @app.cli.command('rebuild-attendance-rollup')
+    def rebuild_attendance_rollup_command():
+        """Recompute monthly attendance rollups from raw attendance rows."""
+        rows = rebuild_attendance_rollup()
+        db.session.commit()
+        click.echo(f'Rebuilt {rows} attendance rollup rows')
+
+    @app.cli.command('rebuild-fee-balances')
+    def rebuild_fee_balances_command():
+        """Recompute per-student, per-term fee balances from fee structures and payments."""
+        rows = rebuild_fee_balances()
+        db.session.commit()
+        click.echo(f'Rebuilt {rows} fee balance rows')
+
+    @app.cli.command('rebuild-student-search')
+    def rebuild_student_search_command():
+        """Repopulate the student full-text search index from the students table."""
+        rows = rebuild_student_search()
+        db.session.commit()
+        click.echo(f'Indexed {rows} students')
+
+    @app.cli.command('import-fee-payments')
+    @click.argument('statement', type=click.File('r', encoding='utf-8-sig'))
+    def import_fee_payments_command(statement):
+        """Import fee payments from a CSV bank or mobile-money statement."""
+        summary = Counter()
+        try:
+            for outcome in import_payments(statement):
+                summary[outcome['outcome']] += 1
+                if outcome['outcome'] != 'imported':
+                    click.echo(f"line {outcome['line']}: {outcome['outcome']} - {outcome['reason']}", err=True)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Imported {summary['imported']}, duplicates {summary['duplicate']}, errors {summary['error']}")
+
+    @app.cli.command('import-students')
+    @click.argument('roster', type=click.File('r', encoding='utf-8-sig'))
+    def import_students_command(roster):
+        """Import students from a CSV roster, e.g. when migrating a school's records."""
+        summary = Counter()
+        try:
+            for outcome in import_students(roster):
+                summary[outcome['outcome']] += 1
+                if outcome['outcome'] != 'imported':
+                    click.echo(f"line {outcome['line']}: {outcome['outcome']} - {outcome['reason']}", err=True)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Imported {summary['imported']}, duplicates {summary['duplicate']}, errors {summary['error']}")
+
+    @app.cli.command('generate-data')
+    @click.option('--schools', default=1, show_default=True, help='Copies of the class list, each with its own teachers.')
+    @click.option('--classes', default=12, show_default=True, help='Classes per school.')
+    @click.option('--students', default=5000, show_default=True)
+    @click.option('--subjects', default=10, show_default=True)
+    @click.option('--terms', default=10, show_default=True, help='Terms of results and fees, ending with --end-year.')
+    @click.option('--attendance-years', default=1, show_default=True, help='Years of daily attendance, ending with --end-year.')
+    @click.option('--end-year', type=int, help='Last school year generated; defaults to this year.')
+    @click.option('--seed', default=0, show_default=True)
+    @click.option('--reset', is_flag=True, help='Drop and recreate every table first.')
+    def generate_data_command(schools, classes, students, subjects, terms, attendance_years, end_year, seed, reset):
+        """Fill the database with deterministic synthetic data for load testing."""
+        if reset:
+            db.drop_all()
+            db.create_all()
+        elif db.session.query(Student.id).first() is not None:
+            raise click.ClickException('The database already has students; pass --reset to replace everything')
+
+        started = time.perf_counter()
+        counts = generate_school_data(schools, classes, students, subjects, terms, attendance_years, end_year, seed)
+        db.session.commit()
+        for table, rows in counts.items():
+            click.echo(f'{table:<20} {rows:>10}')
+        click.echo(f'Generated in {time.perf_counter() - started:.1f}s')
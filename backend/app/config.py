@@ -13,6 +13,14 @@ class Config:
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     UPLOAD_FOLDER = os.path.join(basedir, 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max upload size
+    # (minimum marks, grade), highest band first
+    GRADE_BOUNDARIES = [(80, 'A'), (70, 'B'), (60, 'C'), (50, 'D'), (0, 'F')]
+    # Processes used to render batch report cards; 0 means one per CPU
+    REPORT_CARD_WORKERS = int(os.environ.get('REPORT_CARD_WORKERS', 0))
+    # Server-Timing headers and a slow-request log; off unless REQUEST_INSTRUMENTATION is set
+    REQUEST_INSTRUMENTATION = os.environ.get('REQUEST_INSTRUMENTATION', '').lower() in ('1', 'true', 'yes')
+    SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 500))
+    SLOW_REQUEST_QUERIES = int(os.environ.get('SLOW_REQUEST_QUERIES', 50))
 
 class DevelopmentConfig(Config):
     DEBUG = True
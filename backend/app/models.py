@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy import DDL, event
 from app import db
 from flask_bcrypt import Bcrypt
 
@@ -42,6 +43,35 @@ class Student(db.Model):
     attendances = db.relationship('Attendance', back_populates='student')
     results = db.relationship('Result', back_populates='student')
 
+# SQLite full-text index over the searchable student columns, kept in step by
+# triggers so every write path (ORM, bulk executemany, raw SQL) updates it.
+# Rebuilding the students table (e.g. batch_alter_table) drops the triggers.
+STUDENT_SEARCH_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5(
+        first_name, last_name, admission_number, phone, email,
+        content='students', content_rowid='id', prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS students_fts_ai AFTER INSERT ON students BEGIN
+        INSERT INTO students_fts (rowid, first_name, last_name, admission_number, phone, email)
+        VALUES (new.id, new.first_name, new.last_name, new.admission_number, new.phone, new.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS students_fts_ad AFTER DELETE ON students BEGIN
+        INSERT INTO students_fts (students_fts, rowid, first_name, last_name, admission_number, phone, email)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.admission_number, old.phone, old.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS students_fts_au
+    AFTER UPDATE OF first_name, last_name, admission_number, phone, email ON students BEGIN
+        INSERT INTO students_fts (students_fts, rowid, first_name, last_name, admission_number, phone, email)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.admission_number, old.phone, old.email);
+        INSERT INTO students_fts (rowid, first_name, last_name, admission_number, phone, email)
+        VALUES (new.id, new.first_name, new.last_name, new.admission_number, new.phone, new.email);
+    END"""
+)
+
+for statement in STUDENT_SEARCH_DDL:
+    event.listen(Student.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(Student.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS students_fts').execute_if(dialect='sqlite'))
+
 class Class(db.Model):
     __tablename__ = 'classes'
     
@@ -63,22 +93,71 @@ class Subject(db.Model):
     timetables = db.relationship('Timetable', back_populates='subject')
     results = db.relationship('Result', back_populates='subject')
 
+class Term(db.Model):
+    __tablename__ = 'terms'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(20), unique=True, nullable=False)  # e.g., "Term 1 2023"
+    # Inclusive; only terms carried over from free-text names can lack dates
+    start_date = db.Column(db.Date, index=True)
+    end_date = db.Column(db.Date)
+
 class Fee(db.Model):
     __tablename__ = 'fees'
+    __table_args__ = (
+        # Serves per-term "who has (not) paid" lookups without touching the table
+        db.Index('ix_fees_term_id_student_id', 'term_id', 'student_id', 'amount'),
+        # Keyset pagination of the payment history, newest first
+        db.Index('ix_fees_payment_date', 'payment_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     payment_date = db.Column(db.Date, default=datetime.utcnow)
-    term = db.Column(db.String(20), nullable=False)  # e.g., "Term 1 2023"
+    term_id = db.Column(db.Integer, db.ForeignKey('terms.id'), nullable=False)
     payment_method = db.Column(db.String(50))
     receipt_number = db.Column(db.String(50), unique=True)
     notes = db.Column(db.Text)
     
     student = db.relationship('Student', back_populates='fees')
+    term = db.relationship('Term')
+
+class FeeStructure(db.Model):
+    __tablename__ = 'fee_structures'
+    __table_args__ = (
+        db.UniqueConstraint('class_id', 'term_id', name='uq_fee_structures_class_id_term_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    class_id = db.Column(db.Integer, db.ForeignKey('classes.id'), nullable=False)
+    term_id = db.Column(db.Integer, db.ForeignKey('terms.id'), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    
+    class_ = db.relationship('Class')
+    term = db.relationship('Term')
+
+class FeeBalance(db.Model):
+    __tablename__ = 'fee_balances'
+    __table_args__ = (
+        db.Index('ix_fee_balances_term_id_balance', 'term_id', 'balance'),
+    )
+    
+    # Running per-student, per-term ledger kept in step with fee payments
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), primary_key=True)
+    term_id = db.Column(db.Integer, db.ForeignKey('terms.id'), primary_key=True)
+    amount_due = db.Column(db.Float, nullable=False, default=0)
+    amount_paid = db.Column(db.Float, nullable=False, default=0)
+    balance = db.Column(db.Float, nullable=False, default=0)
+    
+    student = db.relationship('Student')
+    term = db.relationship('Term')
 
 class Attendance(db.Model):
     __tablename__ = 'attendances'
+    __table_args__ = (
+        db.Index('ix_attendances_student_id_date', 'student_id', 'date', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
@@ -88,6 +167,18 @@ class Attendance(db.Model):
     
     student = db.relationship('Student', back_populates='attendances')
 
+class AttendanceRollup(db.Model):
+    __tablename__ = 'attendance_rollups'
+    
+    # Per-student monthly counts, kept in step with writes to attendances
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    present_days = db.Column(db.Integer, nullable=False, default=0)
+    absent_days = db.Column(db.Integer, nullable=False, default=0)
+    late_days = db.Column(db.Integer, nullable=False, default=0)
+    total_days = db.Column(db.Integer, nullable=False, default=0)
+
 class Timetable(db.Model):
     __tablename__ = 'timetable'
     
@@ -98,21 +189,36 @@ class Timetable(db.Model):
     start_time = db.Column(db.Time, nullable=False)
     end_time = db.Column(db.Time, nullable=False)
     teacher_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    room = db.Column(db.String(50))
     
     class_ = db.relationship('Class', back_populates='timetables')
     subject = db.relationship('Subject', back_populates='timetables')
     teacher = db.relationship('User')
 
+class TimetableVersion(db.Model):
+    __tablename__ = 'timetable_version'
+    
+    # One row, advanced by every timetable write in its own transaction; see utils.timetable
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+event.listen(TimetableVersion.__table__, 'after_create', DDL('INSERT INTO timetable_version (id, version) VALUES (1, 0)'))
+
 class Result(db.Model):
     __tablename__ = 'results'
+    __table_args__ = (
+        db.Index('ix_results_student_id_subject_id_term_id', 'student_id', 'subject_id', 'term_id', unique=True),
+        db.Index('ix_results_term_id', 'term_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
     subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id'), nullable=False)
-    term = db.Column(db.String(20), nullable=False)  # e.g., "Term 1 2023"
+    term_id = db.Column(db.Integer, db.ForeignKey('terms.id'), nullable=False)
     marks = db.Column(db.Float, nullable=False)
     grade = db.Column(db.String(2))
     remarks = db.Column(db.String(200))
     
     student = db.relationship('Student', back_populates='results')
-    subject = db.relationship('Subject', back_populates='results')
\ No newline at end of file
+    subject = db.relationship('Subject', back_populates='results')
+    term = db.relationship('Term')
\ No newline at end of file
@@ -0,0 +1,68 @@
+# Run from backend/: python -m benchmarks.attendance_grid
+import json
+import sys
+from datetime import date, timedelta
+from app import db
+from app.models import Attendance
+from utils.attendance import upsert_attendance
+from utils.attendance_calendar import class_month_grid
+from benchmarks.common import create_benchmark_app, create_students, timed
+
+def school_days(year, month):
+    day = date(year, month, 1)
+    while day.month == month:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+def per_row_fetch(student_ids):
+    # What the UI fetched before: /api/attendance/student/<id> once per student
+    return [Attendance.query.filter_by(student_id=student_id).order_by(Attendance.date).all()
+            for student_id in student_ids]
+
+def per_row_serialize(histories):
+    return json.dumps([[{
+        'id': attendance.id,
+        'date': attendance.date.isoformat(),
+        'status': attendance.status,
+        'remarks': attendance.remarks
+    } for attendance in attendances] for attendances in histories])
+
+def grid_serialize(grid):
+    return json.dumps([{
+        'student_id': student_id,
+        'admission_number': entry['admission_number'],
+        'name': entry['name'],
+        'days': entry['calendar'].to_symbols()
+    } for student_id, entry in grid.items()])
+
+def run(class_size=50):
+    app = create_benchmark_app()
+    with app.app_context():
+        student_ids = create_students(class_size)
+        statuses = ['present'] * 8 + ['absent', 'late']
+        upsert_attendance([
+            {'student_id': student_id, 'date': day.isoformat(), 'status': statuses[(student_id + day.day) % 10]}
+            for day in school_days(2024, 3) for student_id in student_ids
+        ])
+        db.session.commit()
+        print(f'Class-month attendance grid, {class_size} students')
+
+        results = {}
+        with timed('per-row: queries', results):
+            histories = per_row_fetch(student_ids)
+        with timed('per-row: serialize', results):
+            rows_json = per_row_serialize(histories)
+        with timed('grid: query', results):
+            _, grid = class_month_grid(1, 2024, 3)
+        with timed('grid: serialize', results):
+            grid_json = grid_serialize(grid)
+
+        print(f'payload bytes: per-row {len(rows_json)}, grid {len(grid_json)} '
+              f'({len(rows_json) / len(grid_json):.1f}x smaller)')
+        for step in ('queries', 'serialize'):
+            grid_step = 'query' if step == 'queries' else step
+            print(f'{step} speedup: {results["per-row: " + step] / results["grid: " + grid_step]:.1f}x')
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,52 @@
+# Run from backend/: python -m benchmarks.attendance_upsert
+import sys
+from datetime import date
+from app import db
+from app.models import Attendance
+from utils.attendance import upsert_attendance
+from benchmarks.common import create_benchmark_app, create_students, timed
+
+def legacy_mark_attendance(records):
+    # The per-record SELECT loop that POST /api/attendance used to run
+    for record in records:
+        attendance_date = date.fromisoformat(record['date'])
+        existing = Attendance.query.filter_by(
+            student_id=record['student_id'],
+            date=attendance_date
+        ).first()
+        if existing:
+            existing.status = record['status']
+            existing.remarks = record.get('remarks')
+        else:
+            db.session.add(Attendance(
+                student_id=record['student_id'],
+                date=attendance_date,
+                status=record['status'],
+                remarks=record.get('remarks')
+            ))
+    db.session.commit()
+
+def register(student_ids, day, status):
+    return [{'student_id': student_id, 'date': day, 'status': status} for student_id in student_ids]
+
+def run(count=10000):
+    app = create_benchmark_app()
+    with app.app_context():
+        student_ids = create_students(count, class_count=40)
+        print(f'Attendance upsert, {count} records')
+
+        with timed('legacy insert'):
+            legacy_mark_attendance(register(student_ids, '2024-03-04', 'present'))
+        with timed('legacy update'):
+            legacy_mark_attendance(register(student_ids, '2024-03-04', 'absent'))
+        db.session.expunge_all()
+
+        with timed('bulk upsert insert'):
+            upsert_attendance(register(student_ids, '2024-03-05', 'present'))
+            db.session.commit()
+        with timed('bulk upsert update'):
+            upsert_attendance(register(student_ids, '2024-03-05', 'absent'))
+            db.session.commit()
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
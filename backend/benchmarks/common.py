@@ -0,0 +1,52 @@
+import time
+from contextlib import contextmanager
+from datetime import date
+from sqlalchemy import insert
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import Student, Class, Term
+
+def create_benchmark_app():
+    app = create_app('app.config.TestingConfig')
+    with app.app_context():
+        db.create_all()
+    return app
+
+def create_students(count, class_count=1):
+    db.session.execute(insert(Class), [{'name': f'Class {i}'} for i in range(1, class_count + 1)])
+    class_ids = [row.id for row in db.session.query(Class.id).order_by(Class.id)]
+    db.session.execute(insert(Student), [{
+        'admission_number': f'ADM-{i:06d}',
+        'first_name': f'First{i}',
+        'last_name': f'Last{i}',
+        'date_of_birth': date(2012, 1, 1),
+        'gender': 'Female' if i % 2 else 'Male',
+        'class_id': class_ids[i % class_count],
+        'is_active': True
+    } for i in range(1, count + 1)])
+    db.session.commit()
+    return [row.id for row in db.session.query(Student.id).order_by(Student.id)]
+
+def create_terms(year=2024):
+    terms = [
+        Term(name=f'Term 1 {year}', start_date=date(year, 1, 1), end_date=date(year, 4, 30)),
+        Term(name=f'Term 2 {year}', start_date=date(year, 5, 1), end_date=date(year, 8, 31)),
+        Term(name=f'Term 3 {year}', start_date=date(year, 9, 1), end_date=date(year, 12, 31))
+    ]
+    db.session.add_all(terms)
+    db.session.commit()
+    return terms
+
+def admin_headers():
+    # Must be called inside an app context
+    token = create_access_token(identity={'id': 1, 'role': 'admin'})
+    return {'Authorization': f'Bearer {token}'}
+
+@contextmanager
+def timed(label, results=None):
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    if results is not None:
+        results[label] = elapsed
+    print(f'{label:<40} {elapsed * 1000:10.1f} ms')
@@ -0,0 +1,35 @@
+# Run from backend/: python -m benchmarks.fees_unpaid
+import random
+import sys
+from datetime import date
+from sqlalchemy import insert
+from app import db
+from app.models import Fee
+from benchmarks.common import create_benchmark_app, create_students, create_terms, admin_headers, timed
+
+def run(count=50000):
+    random.seed(0)
+    app = create_benchmark_app()
+    with app.app_context():
+        student_ids = create_students(count, class_count=count // 40)
+        terms = create_terms()
+        db.session.execute(insert(Fee), [{
+            'student_id': student_id,
+            'amount': random.choice([2500, 5000, 10000]),
+            'payment_date': date(2024, 1, 15),
+            'term_id': term.id
+        } for term in terms for student_id in student_ids if random.random() < 0.95])
+        db.session.commit()
+
+        client = app.test_client()
+        headers = admin_headers()
+        print(f'GET /api/fees/unpaid, {count} students')
+        for label, query in [('no payment', f'term_id={terms[1].id}'),
+                             ('paid below 5000', f'term_id={terms[1].id}&paid_below=5000')]:
+            client.get(f'/api/fees/unpaid?{query}', headers=headers)
+            with timed(label):
+                response = client.get(f'/api/fees/unpaid?{query}', headers=headers)
+            print(f'  {len(response.get_json())} students returned')
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
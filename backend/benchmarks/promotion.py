@@ -0,0 +1,39 @@
+# Run from backend/: python -m benchmarks.promotion
+import random
+import sys
+from app import db
+from app.models import Class, Student
+from benchmarks.common import create_benchmark_app, create_students, admin_headers, timed
+
+LEGACY_SAMPLE = 500
+
+def run(count=40000):
+    random.seed(0)
+    app = create_benchmark_app()
+    with app.app_context():
+        # Forms 1-4 in three streams; create_students spreads students over the classes
+        student_ids = create_students(count, class_count=12)
+        classes = [row.id for row in db.session.query(Class.id).order_by(Class.id)]
+        mapping = {str(class_id): (class_id + 3 if class_id + 3 <= classes[-1] else None) for class_id in classes}
+        repeaters = random.sample(student_ids, count // 100)
+        client = app.test_client()
+        headers = admin_headers()
+        print(f'Year-end promotion, {count} students in {len(classes)} classes')
+
+        with timed(f'legacy: {LEGACY_SAMPLE} PUT /api/students/<id>'):
+            for student_id in student_ids[:LEGACY_SAMPLE]:
+                student = db.session.get(Student, student_id)
+                target = mapping[str(student.class_id)]
+                client.put(f'/api/students/{student_id}', headers=headers,
+                           json={'class_id': target} if target else {'is_active': False})
+        db.session.expire_all()
+
+        body = {'mapping': mapping, 'repeaters': repeaters}
+        with timed('dry run'):
+            client.post('/api/students/promote', json={**body, 'dry_run': True}, headers=headers)
+        with timed('promote'):
+            summary = client.post('/api/students/promote', json=body, headers=headers).get_json()
+        print(f"  promoted {summary['total_promoted']}, graduated {summary['graduated']}, repeating {summary['repeating']}")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 40000)
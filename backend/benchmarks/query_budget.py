@@ -0,0 +1,227 @@
+# Run from backend/: python -m benchmarks.query_budget [students]
+"""Fail if any route issues more SQL statements than its budget, or more at a larger scale.
+
+Every blueprint route is called against a database seeded with ``students``
+students and again with four times as many. A route passes when both counts
+are within its budget and equal, i.e. nothing is loaded per row. Caches are
+cleared before each call, so these are cold-cache counts. Exits non-zero on
+any failure, or when a route has no budget; tests/test_query_budget.py runs
+the same check under pytest.
+"""
+import random
+import sys
+from datetime import date, timedelta
+from sqlalchemy import event, insert
+from app import db
+from app.models import User, Subject, Fee, FeeStructure
+from utils.attendance import upsert_attendance, rebuild_attendance_rollup
+from utils.fees import rebuild_fee_balances
+from utils.result_stats import invalidate_result_stats
+from utils.results import upsert_mark_sheet
+from utils.student_profile import invalidate_student_profiles
+from utils.student_search import rebuild_student_search
+from utils.timetable import timetable_index
+from utils.timetable_feeds import invalidate_timetable_feeds
+from benchmarks.common import create_benchmark_app, create_students, create_terms, admin_headers
+from benchmarks.timetable_bulk import weekly_grid
+
+CLASSES = 4
+SUBJECTS = 6
+SCHOOL_DAYS = 20
+
+# (endpoint, method, url, JSON body, statement budget); ids refer to the seeded rows
+ROUTES = [
+    ('main.home', 'GET', '/', None, 0),
+    ('auth.auth_root', 'GET', '/api/auth/', None, 0),
+    ('auth.login', 'POST', '/api/auth/login', {'username': 'admin', 'password': 'admin'}, 1),
+    ('auth.protected', 'GET', '/api/auth/protected', None, 0),
+    ('auth.refresh', 'POST', '/api/auth/refresh', None, 0),
+    ('students_bp.get_students', 'GET', '/api/students/?limit=500', None, 1),
+    ('students_bp.search_student_index', 'GET', '/api/students/search?q=First1', None, 1),
+    ('students_bp.get_student', 'GET', '/api/students/1', None, 1),
+    ('students_bp.get_student_profile', 'GET', '/api/students/1/profile', None, 6),
+    ('fees_bp.get_fees', 'GET', '/api/fees/?limit=500', None, 1),
+    ('fees_bp.get_unpaid_students', 'GET', '/api/fees/unpaid?term_id=3&paid_below=5000', None, 2),
+    ('fees_bp.get_fee_structure', 'GET', '/api/fees/structure', None, 1),
+    ('fees_bp.get_fee_balances', 'GET', '/api/fees/balances?term_id=3', None, 2),
+    ('fees_bp.get_fee_summary', 'GET', '/api/fees/summary?term_id=3', None, 2),
+    ('attendance_bp.attendance_home', 'GET', '/api/attendance/', None, 0),
+    ('attendance_bp.get_attendance_report', 'GET', '/api/attendance/report?term_id=3', None, 2),
+    ('attendance_bp.get_attendance_grid', 'GET', '/api/attendance/grid?class_id=1&month=9&year=2024', None, 1),
+    ('attendance_bp.get_student_attendance', 'GET', '/api/attendance/student/1?limit=500', None, 1),
+    ('attendance_bp.get_student_calendar', 'GET', '/api/attendance/student/1/calendar?year=2024', None, 1),
+    ('results_bp.get_results', 'GET', '/api/results/?limit=500', None, 1),
+    ('results_bp.get_class_rankings', 'GET', '/api/results/rankings?class_id=1&term_id=3', None, 2),
+    ('results_bp.get_subject_statistics', 'GET', '/api/results/statistics?class_id=1&term_id=3', None, 2),
+    ('results_bp.generate_report_card', 'GET', '/api/results/report-card/1?term_id=3', None, 2),
+    ('results_bp.generate_class_report_cards', 'GET', '/api/results/report-cards?class_id=1&term_id=3', None, 4),
+    ('terms_bp.get_terms', 'GET', '/api/terms/', None, 1),
+    ('terms_bp.get_current_term', 'GET', '/api/terms/current', None, 1),
+    ('timetable_bp.get_timetable', 'GET', '/api/timetable/?limit=500', None, 2),
+    ('timetable_bp.get_free_teachers_or_classes', 'GET',
+     '/api/timetable/free?kind=teacher&day_of_week=Monday&start_time=08:00&end_time=08:40', None, 3),
+    ('timetable_bp.get_substitute_teachers', 'GET', '/api/timetable/substitutes?teacher_id=2&day_of_week=Monday', None, 3),
+    ('timetable_bp.get_weekly_grid', 'GET', '/api/timetable/class/1/grid', None, 4),
+    ('timetable_bp.get_calendar_feed', 'GET', '/api/timetable/teacher/2/timetable.ics', None, 5),
+    # Writes, after every read so that the reads see the same data at both scales
+    ('students_bp.create_student', 'POST', '/api/students/', {
+        'admission_number': 'NEW-1', 'first_name': 'New', 'last_name': 'Student', 'date_of_birth': '2012-05-01',
+        'gender': 'Female', 'class_id': 1
+    }, 5),
+    ('students_bp.update_student', 'PUT', '/api/students/1', {'first_name': 'Renamed', 'class_id': 3}, 5),
+    ('students_bp.delete_student', 'DELETE', '/api/students/2', None, 5),
+    ('students_bp.import_student_roster', 'POST', '/api/students/import', None, 5),
+    ('students_bp.promote_class_students', 'POST', '/api/students/promote', {
+        'mapping': {'1': 2, '2': None}, 'dry_run': True
+    }, 4),
+    ('fees_bp.record_payment', 'POST', '/api/fees/', {'student_id': 3, 'amount': 1000, 'term_id': 3}, 6),
+    ('fees_bp.update_payment', 'PUT', '/api/fees/1', {'amount': 2000}, 7),
+    ('fees_bp.set_fee_structure_entry', 'POST', '/api/fees/structure', {'class_id': 1, 'term_id': 3, 'amount': 6000}, 5),
+    ('fees_bp.import_fee_payments', 'POST', '/api/fees/import', None, 6),
+    ('attendance_bp.mark_attendance', 'POST', '/api/attendance/', [
+        {'student_id': student_id, 'date': '2024-10-01', 'status': 'present'} for student_id in range(3, 13)
+    ], 4),
+    ('terms_bp.create_term', 'POST', '/api/terms/', {
+        'name': 'Term 1 2025', 'start_date': '2025-01-06', 'end_date': '2025-04-04'
+    }, 3),
+    ('terms_bp.update_term', 'PUT', '/api/terms/4', {'end_date': '2025-04-11'}, 2),
+    ('results_bp.create_result', 'POST', '/api/results/', {
+        'student_id': 3, 'subject_id': 1, 'term_id': 4, 'marks': 70
+    }, 5),
+    ('results_bp.update_result', 'PUT', '/api/results/1', {'marks': 55}, 4),
+    ('results_bp.save_mark_sheet', 'POST', '/api/results/bulk', {
+        'subject_id': 2, 'term_id': 2,
+        'results': [{'student_id': student_id, 'marks': 60} for student_id in range(3, 13)]
+    }, 7),
+    ('timetable_bp.create_timetable_entry', 'POST', '/api/timetable/', {
+        'class_id': 1, 'subject_id': 1, 'day_of_week': 'Saturday', 'start_time': '08:00', 'end_time': '08:40'
+    }, 5),
+    ('timetable_bp.update_timetable_entry', 'PUT', '/api/timetable/1', {'room': 'Hall'}, 6),
+    ('timetable_bp.delete_timetable_entry', 'DELETE', '/api/timetable/2', None, 5),
+    ('timetable_bp.replace_class_timetables', 'PUT', '/api/timetable/bulk', {'class_ids': [CLASSES], 'entries': []}, 7),
+    ('timetable_bp.generate_class_timetables', 'POST', '/api/timetable/generate', {
+        'days': ['Monday', 'Tuesday'], 'periods': [
+            {'start_time': '08:00', 'end_time': '08:40'}, {'start_time': '08:40', 'end_time': '09:20'}
+        ],
+        'lessons': [{'class_id': 1, 'subject_id': 1, 'teacher_id': 2, 'periods_per_week': 2}], 'dry_run': True
+    }, 1)
+]
+
+# Streaming uploads, sent as CSV rather than JSON
+UPLOADS = {
+    'students_bp.import_student_roster': (
+        'admission_number,first_name,last_name,date_of_birth,gender,class\r\n'
+        + ''.join(f'IMP-{i},Imported,Student{i},2012-01-01,Male,Class 1\r\n' for i in range(10))
+    ),
+    'fees_bp.import_fee_payments': (
+        'admission_number,amount,payment_date,term,receipt_number\r\n'
+        + ''.join(f'ADM-{i:06d},500,2024-10-01,Term 3 2024,RCP-{i}\r\n' for i in range(3, 13))
+    )
+}
+
+def seed(client, students):
+    rng = random.Random(0)
+    admin = User(username='admin', email='admin@example.com', role='admin')
+    admin.set_password('admin')
+    db.session.add(admin)
+    db.session.execute(insert(User), [{
+        'username': f'teacher{i}', 'email': f'teacher{i}@example.com', 'role': 'teacher'
+    } for i in range(1, CLASSES + 9)])
+    db.session.execute(insert(Subject), [{'name': f'Subject {i}', 'code': f'S{i}'} for i in range(1, SUBJECTS + 1)])
+    student_ids = create_students(students, class_count=CLASSES)
+    terms = create_terms(2024)
+
+    db.session.execute(insert(FeeStructure), [
+        {'class_id': class_id, 'term_id': term.id, 'amount': 5000}
+        for class_id in range(1, CLASSES + 1) for term in terms
+    ])
+    for term in terms:
+        for subject_id in range(1, SUBJECTS + 1):
+            upsert_mark_sheet(term.id, subject_id, [(student_id, rng.randint(30, 100), None) for student_id in student_ids])
+        db.session.execute(insert(Fee), [{
+            'student_id': student_id,
+            'amount': rng.choice([2500, 5000]),
+            'payment_date': term.start_date,
+            'term_id': term.id,
+            'receipt_number': f'SEED-{term.id}-{student_id}'
+        } for student_id in student_ids])
+    upsert_attendance([{
+        'student_id': student_id,
+        'date': (date(2024, 9, 2) + timedelta(days=day)).isoformat(),
+        'status': rng.choice(['present', 'present', 'absent', 'late'])
+    } for student_id in student_ids for day in range(SCHOOL_DAYS * 7 // 5) if day % 7 < 5])
+    rebuild_attendance_rollup()
+    rebuild_fee_balances()
+    rebuild_student_search()
+    db.session.commit()
+
+    teacher_ids = [row.id for row in db.session.query(User.id).filter(User.role == 'teacher').order_by(User.id)]
+    client.put('/api/timetable/bulk', json={
+        'entries': weekly_grid(CLASSES, teacher_ids, list(range(1, SUBJECTS + 1)))
+    }, headers=admin_headers())
+
+def reset_caches():
+    timetable_index.invalidate()
+    invalidate_timetable_feeds()
+    invalidate_student_profiles()
+    invalidate_result_stats()
+
+def count_statements(students):
+    app = create_benchmark_app()
+    counts = {}
+    with app.app_context():
+        client = app.test_client()
+        headers = admin_headers()
+        seed(client, students)
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+        login = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin'}).get_json()
+        refresh = {'Authorization': f"Bearer {login['refresh_token']}"}
+        for endpoint, method, url, body, _ in ROUTES:
+            reset_caches()
+            db.session.expire_all()
+            statements.clear()
+            kwargs = {'headers': refresh if endpoint == 'auth.refresh' else headers}
+            if endpoint in UPLOADS:
+                kwargs.update(data=UPLOADS[endpoint], content_type='text/csv')
+            elif body is not None:
+                kwargs['json'] = body
+            response = client.open(url, method=method, **kwargs)
+            response.get_data()
+            counts[endpoint] = (response.status_code, len(statements), list(statements))
+    reset_caches()
+    return app, counts
+
+def budget_failures(students=200):
+    """Print the statement count of every route and return one message per failing route."""
+    small_app, small = count_statements(students)
+    _, large = count_statements(students * 4)
+    endpoints = {rule.endpoint for rule in small_app.url_map.iter_rules() if rule.endpoint != 'static'}
+
+    failures = [f'{endpoint}: no budget' for endpoint in sorted(endpoints - {route[0] for route in ROUTES})]
+    print(f'Query budgets, {students} and {students * 4} students')
+    for endpoint, method, url, _, budget in ROUTES:
+        (status, count, _), (large_status, large_count, statements) = small[endpoint], large[endpoint]
+        problems = []
+        if status >= 400 or large_status >= 400:
+            problems.append(f'status {status}/{large_status}')
+        if large_count > budget:
+            problems.append(f'over budget of {budget}')
+        if large_count != count:
+            problems.append('grows with rows')
+        print(f"{'FAIL' if problems else 'ok':<5} {method:<6} {url[:60]:<60} {count:>3} {large_count:>3} / {budget}")
+        if problems:
+            failures.append(f"{endpoint}: {', '.join(problems)}")
+            for statement in statements[:budget + 3]:
+                print(f"        {' '.join(statement.split())[:150]}")
+
+    return failures
+
+def run(students=200):
+    failures = budget_failures(students)
+    for failure in failures:
+        print(failure)
+    return not failures
+
+if __name__ == '__main__':
+    sys.exit(0 if run(int(sys.argv[1]) if len(sys.argv) > 1 else 200) else 1)
@@ -0,0 +1,43 @@
+# Run from backend/: python -m benchmarks.report_cards
+import random
+import sys
+import time
+import warnings
+from app import db
+from app.models import Subject
+from utils.results import upsert_mark_sheet
+from utils.report_cards import init_report_cards, load_class_report_cards, render_report_cards, stream_zip
+from benchmarks.common import create_benchmark_app, create_students, create_terms, timed
+
+def run(count=400):
+    random.seed(0)
+    # fpdf warns once per document about substituting Arial with Helvetica
+    warnings.simplefilter('ignore', UserWarning)
+    app = create_benchmark_app()
+    with app.app_context():
+        student_ids = create_students(count)
+        term = create_terms()[0]
+        subjects = [Subject(name=f'Subject {i}', code=f'S{i}') for i in range(1, 9)]
+        db.session.add_all(subjects)
+        db.session.commit()
+        for subject in subjects:
+            upsert_mark_sheet(term.id, subject.id, [
+                (student_id, random.randint(30, 100), None) for student_id in student_ids
+            ])
+        db.session.commit()
+        print(f'Batch report cards, {count} students x {len(subjects)} subjects')
+
+        with timed('load (fixed query count)'):
+            cards = load_class_report_cards(1, term)
+
+        for workers in (1, 4):
+            app.config['REPORT_CARD_WORKERS'] = workers
+            init_report_cards(app)
+            label = 'serial' if workers == 1 else f'process pool ({workers} workers)'
+            start = time.perf_counter()
+            size = sum(len(chunk) for chunk in stream_zip(render_report_cards(cards)))
+            elapsed = time.perf_counter() - start
+            print(f'{label:<40} {count / elapsed:10.1f} cards/s  ({size // 1024} KiB zip)')
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 400)
@@ -0,0 +1,57 @@
+# Run from backend/: python -m benchmarks.results_bulk
+import random
+import sys
+from app import db
+from app.models import Result, Subject
+from utils.grading import calculate_grade
+from utils.results import validate_mark_sheet, upsert_mark_sheet
+from benchmarks.common import create_benchmark_app, create_students, create_terms, timed
+
+def legacy_create_results(term_id, subject_id, rows):
+    # One POST /api/results per row: existence SELECT, grade, commit
+    for row in rows:
+        existing = Result.query.filter_by(
+            student_id=row['student_id'],
+            subject_id=subject_id,
+            term_id=term_id
+        ).first()
+        if existing:
+            continue
+        marks = float(row['marks'])
+        db.session.add(Result(
+            student_id=row['student_id'],
+            subject_id=subject_id,
+            term_id=term_id,
+            marks=marks,
+            grade=calculate_grade(marks)
+        ))
+        db.session.commit()
+
+def bulk_save(term_id, subject_id, rows):
+    entries, errors = validate_mark_sheet(rows)
+    assert not errors
+    upsert_mark_sheet(term_id, subject_id, entries)
+    db.session.commit()
+
+def run(count=2000):
+    random.seed(0)
+    app = create_benchmark_app()
+    with app.app_context():
+        student_ids = create_students(count, class_count=count // 40)
+        term_id = create_terms()[0].id
+        db.session.add_all([Subject(name='Mathematics', code='MATH'), Subject(name='English', code='ENG')])
+        db.session.commit()
+        rows = [{'student_id': student_id, 'marks': random.randint(0, 100)} for student_id in student_ids]
+        print(f'Mark sheet entry, {count} rows')
+
+        results = {}
+        with timed('legacy per-row create', results):
+            legacy_create_results(term_id, 1, rows)
+        with timed('bulk sheet insert', results):
+            bulk_save(term_id, 2, rows)
+        with timed('bulk sheet update', results):
+            bulk_save(term_id, 2, rows)
+        print(f'speedup: {results["legacy per-row create"] / results["bulk sheet insert"]:.1f}x')
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
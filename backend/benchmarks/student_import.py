@@ -0,0 +1,58 @@
+# Run from backend/: python -m benchmarks.student_import
+import csv
+import io
+import sys
+from sqlalchemy import insert
+from app import db
+from app.models import Class, Student
+from benchmarks.common import create_benchmark_app, admin_headers, timed
+
+LEGACY_SAMPLE = 1000
+
+def roster_rows(count, start=1):
+    for i in range(start, start + count):
+        yield {
+            'admission_number': f'ADM-{i:06d}',
+            'first_name': f'First{i}',
+            'last_name': f'Last{i}',
+            'date_of_birth': '2012-01-01' if i % 997 else '2012-13-01',
+            'gender': 'Female' if i % 2 else 'Male',
+            'class': f'Class {i % 40 + 1}',
+            'phone': f'07{i:08d}',
+            'email': f'student{i}@example.com'
+        }
+
+def roster_csv(count):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(next(roster_rows(1))))
+    writer.writeheader()
+    writer.writerows(roster_rows(count))
+    # A repeated admission number, reported as a duplicate
+    writer.writerow(next(roster_rows(1)))
+    return buffer.getvalue().encode()
+
+def run(count=100000):
+    app = create_benchmark_app()
+    with app.app_context():
+        db.session.execute(insert(Class), [{'name': f'Class {i}'} for i in range(1, 41)])
+        db.session.commit()
+        client = app.test_client()
+        headers = admin_headers()
+
+        with timed(f'legacy: {LEGACY_SAMPLE} POST /api/students'):
+            for row in roster_rows(LEGACY_SAMPLE, start=count + 1):
+                row['class_id'] = int(row.pop('class').split()[1])
+                client.post('/api/students/', json=row, headers=headers)
+
+        body = roster_csv(count)
+        with timed(f'import {count} rows'):
+            response = client.post('/api/students/import', data=body, headers={**headers, 'Content-Type': 'text/csv'})
+            report = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+
+        outcomes = {}
+        for outcome in report:
+            outcomes[outcome['outcome']] = outcomes.get(outcome['outcome'], 0) + 1
+        print(f'  {outcomes}, {db.session.query(Student).count()} students stored')
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,78 @@
+# Run from backend/: python -m benchmarks.student_profile
+import random
+import sys
+from datetime import date, timedelta
+from sqlalchemy import event, insert
+from app import db
+from app.models import Fee, Subject
+from utils.attendance import upsert_attendance
+from utils.fees import rebuild_fee_balances
+from utils.results import upsert_mark_sheet
+from benchmarks.common import create_benchmark_app, create_students, create_terms, admin_headers, timed
+
+def fan_out(student_id):
+    # The calls a profile page made before the profile endpoint existed
+    return [
+        f'/api/students/{student_id}',
+        f'/api/fees/?student_id={student_id}&limit=500',
+        f'/api/attendance/student/{student_id}?limit=500',
+        f'/api/results/?student_id={student_id}&limit=500'
+    ]
+
+def run(count=500, repeats=50):
+    random.seed(0)
+    app = create_benchmark_app()
+    with app.app_context():
+        student_ids = create_students(count, class_count=10)
+        terms = [term for year in (2022, 2023, 2024) for term in create_terms(year)]
+        subjects = [Subject(name=f'Subject {i}', code=f'S{i}') for i in range(1, 11)]
+        db.session.add_all(subjects)
+        db.session.commit()
+        for term in terms:
+            for subject in subjects:
+                upsert_mark_sheet(term.id, subject.id, [
+                    (student_id, random.randint(30, 100), None) for student_id in student_ids
+                ])
+            db.session.execute(insert(Fee), [{
+                'student_id': student_id,
+                'amount': random.choice([2500, 5000]),
+                'payment_date': term.start_date,
+                'term_id': term.id
+            } for student_id in student_ids])
+        school_days = [date(2024, 1, 1) + timedelta(days=day) for day in range(300) if day % 7 < 5]
+        upsert_attendance([{
+            'student_id': student_id,
+            'date': day.isoformat(),
+            'status': random.choice(['present', 'present', 'present', 'absent', 'late'])
+        } for student_id in student_ids for day in school_days])
+        rebuild_fee_balances()
+        db.session.commit()
+
+        queries = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: queries.append(1))
+        client = app.test_client()
+        headers = admin_headers()
+        sample = random.sample(student_ids, repeats)
+        print(f'Student profile, {len(terms)} terms x {len(subjects)} subjects, {len(school_days)} school days')
+
+        queries.clear()
+        with timed(f'fan-out: 4 calls x {repeats} students'):
+            for student_id in sample:
+                for url in fan_out(student_id):
+                    client.get(url, headers=headers)
+        print(f'  {len(queries) / repeats:.1f} queries per student')
+
+        queries.clear()
+        with timed(f'profile, cold x {repeats} students'):
+            for student_id in sample:
+                client.get(f'/api/students/{student_id}/profile', headers=headers)
+        print(f'  {len(queries) / repeats:.1f} queries per student')
+
+        queries.clear()
+        with timed(f'profile, cached x {repeats} students'):
+            for student_id in sample:
+                client.get(f'/api/students/{student_id}/profile', headers=headers)
+        print(f'  {len(queries) / repeats:.1f} queries per student')
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,50 @@
+# Run from backend/: python -m benchmarks.student_search
+import random
+import sys
+from datetime import date
+from sqlalchemy import insert
+from app import db
+from app.models import Class, Student
+from benchmarks.common import create_benchmark_app, admin_headers, timed
+
+FIRST_NAMES = ['John', 'Joan', 'Joseph', 'Mary', 'Maria', 'Peter', 'Grace', 'Ann', 'James', 'Faith',
+               'David', 'Esther', 'Samuel', 'Ruth', 'Daniel', 'Mercy', 'Brian', 'Joy', 'Kevin', 'Lucy']
+LAST_NAMES = ['Smith', 'Otieno', 'Wanjiru', 'Mwangi', 'Kamau', 'Achieng', 'Njoroge', 'Johnson', 'Brown',
+              'Odhiambo', 'Kiprono', 'Chebet', 'Mutua', 'Wambui', 'Okoth', 'Nyambura', 'Kariuki', 'Adongo']
+
+def create_roster(count):
+    db.session.execute(insert(Class), [{'name': f'Class {i}'} for i in range(1, 41)])
+    db.session.execute(insert(Student), [{
+        'admission_number': f'ADM-{i:06d}',
+        'first_name': random.choice(FIRST_NAMES),
+        'last_name': random.choice(LAST_NAMES),
+        'date_of_birth': date(2012, 1, 1),
+        'gender': 'Female' if i % 2 else 'Male',
+        'phone': f'07{random.randint(10000000, 99999999)}',
+        'email': f'student{i}@example.com',
+        'class_id': i % 40 + 1,
+        'is_active': random.random() < 0.9
+    } for i in range(1, count + 1)])
+    db.session.commit()
+
+def run(count=100000):
+    random.seed(0)
+    app = create_benchmark_app()
+    with app.app_context():
+        with timed(f'insert {count} students (index via triggers)'):
+            create_roster(count)
+
+        client = app.test_client()
+        headers = admin_headers()
+        with timed('legacy: download full roster'):
+            roster = client.get('/api/students/', headers=headers).get_json()
+        print(f'  {len(roster)} students returned')
+
+        for query in ['jo', 'john', 'mary wanj', 'ADM-0421', 'ADM-042137', '0712', 'student999']:
+            client.get('/api/students/search', query_string={'q': query}, headers=headers)
+            with timed(f'search {query!r}'):
+                matches = client.get('/api/students/search', query_string={'q': query}, headers=headers).get_json()
+            print(f"  top: {matches[0]['admission_number'] if matches else None} of {len(matches)}")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
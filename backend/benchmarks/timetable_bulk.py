@@ -0,0 +1,59 @@
+# Run from backend/: python -m benchmarks.timetable_bulk
+import sys
+from sqlalchemy import insert
+from app import db
+from app.models import Class, Subject, User, Timetable
+from utils.timetable import DAYS, format_minutes
+from benchmarks.common import create_benchmark_app, admin_headers, timed
+
+PERIODS = [(8 * 60 + 40 * period, 8 * 60 + 40 * (period + 1)) for period in range(8)]
+
+def weekly_grid(class_count, teacher_ids, subject_ids):
+    # Teachers rotate across classes so that no teacher is booked twice in a period
+    entries = []
+    for class_index in range(class_count):
+        for day_index, day in enumerate(DAYS[:5]):
+            for period, (start, end) in enumerate(PERIODS):
+                entries.append({
+                    'class_id': class_index + 1,
+                    'subject_id': subject_ids[(class_index + period) % len(subject_ids)],
+                    'teacher_id': teacher_ids[(class_index + period + day_index) % len(teacher_ids)],
+                    'room': f'Room {class_index + 1}',
+                    'day_of_week': day,
+                    'start_time': format_minutes(start),
+                    'end_time': format_minutes(end)
+                })
+    return entries
+
+def run(class_count=40):
+    app = create_benchmark_app()
+    with app.app_context():
+        db.session.execute(insert(Class), [{'name': f'Class {i}'} for i in range(1, class_count + 1)])
+        db.session.execute(insert(Subject), [{'name': f'Subject {i}', 'code': f'S{i}'} for i in range(1, 13)])
+        db.session.execute(insert(User), [{
+            'username': f'teacher{i}', 'email': f'teacher{i}@example.com', 'role': 'teacher'
+        } for i in range(1, class_count + 21)])
+        db.session.commit()
+        teacher_ids = [row.id for row in db.session.query(User.id).order_by(User.id)]
+        subject_ids = [row.id for row in db.session.query(Subject.id).order_by(Subject.id)]
+        entries = weekly_grid(class_count, teacher_ids, subject_ids)
+        client = app.test_client()
+        headers = admin_headers()
+        print(f'Weekly timetable, {class_count} classes, {len(entries)} entries')
+
+        with timed(f'legacy: {len(entries)} POST /api/timetable'):
+            for entry in entries:
+                client.post('/api/timetable/', json=entry, headers=headers)
+        print(f'  {db.session.query(Timetable).count()} entries stored')
+
+        with timed('bulk replace'):
+            response = client.put('/api/timetable/bulk', json={'entries': entries}, headers=headers)
+        print(f"  {response.get_json()['entries']} entries, replaced {response.get_json()['replaced']}")
+
+        clashing = entries + [{**entry, 'room': None} for entry in entries[::50]]
+        with timed('bulk with clashes'):
+            response = client.put('/api/timetable/bulk', json={'entries': clashing}, headers=headers)
+        print(f"  {len(response.get_json()['conflicts'])} conflicts reported")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 40)
@@ -0,0 +1,59 @@
+# Run from backend/: python -m benchmarks.timetable_feeds
+import sys
+from sqlalchemy import event, insert
+from app import db
+from app.models import Class, Subject, User
+from utils.timetable import timetable_index
+from benchmarks.common import create_benchmark_app, admin_headers, timed
+from benchmarks.timetable_bulk import weekly_grid
+from benchmarks.timetable_free import full_listing
+
+def run(class_count=40, polls=200):
+    app = create_benchmark_app()
+    with app.app_context():
+        db.session.execute(insert(Class), [{'name': f'Class {i}'} for i in range(1, class_count + 1)])
+        db.session.execute(insert(Subject), [{'name': f'Subject {i}', 'code': f'S{i}'} for i in range(1, 13)])
+        db.session.execute(insert(User), [{
+            'username': f'teacher{i}', 'email': f'teacher{i}@example.com', 'role': 'teacher'
+        } for i in range(1, class_count + 21)])
+        db.session.commit()
+        teacher_ids = [row.id for row in db.session.query(User.id).filter(User.role == 'teacher').order_by(User.id)]
+        subject_ids = [row.id for row in db.session.query(Subject.id).order_by(Subject.id)]
+        client = app.test_client()
+        headers = admin_headers()
+        client.put('/api/timetable/bulk', json={
+            'entries': weekly_grid(class_count, teacher_ids, subject_ids)
+        }, headers=headers)
+        timetable_index.invalidate()
+
+        queries = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: queries.append(1))
+        class_ids = [(i % class_count) + 1 for i in range(polls)]
+        print(f'Timetable polling, {class_count} classes, {polls} polls')
+
+        queries.clear()
+        with timed(f'full listing x {polls}'):
+            for _ in range(polls):
+                full_listing(client, headers)
+        print(f'  {len(queries) / polls:.1f} queries per poll')
+
+        etags = {}
+        queries.clear()
+        with timed(f'class grid, first fetch x {polls}'):
+            for class_id in class_ids:
+                etags[class_id] = client.get(f'/api/timetable/class/{class_id}/grid', headers=headers).headers['ETag']
+        print(f'  {len(queries) / polls:.1f} queries per poll')
+
+        for kind, url in [('grid', '/api/timetable/class/{}/grid'), ('ics', '/api/timetable/class/{}/timetable.ics')]:
+            if kind == 'ics':
+                for class_id in set(class_ids):
+                    etags[class_id] = client.get(url.format(class_id), headers=headers).headers['ETag']
+            queries.clear()
+            with timed(f'class {kind}, If-None-Match x {polls}'):
+                statuses = [client.get(url.format(class_id), headers={
+                    **headers, 'If-None-Match': etags[class_id]
+                }).status_code for class_id in class_ids]
+            print(f'  {statuses.count(304)} not modified, {len(queries) / polls:.1f} queries per poll')
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 40)
@@ -0,0 +1,69 @@
+# Run from backend/: python -m benchmarks.timetable_free
+import sys
+from sqlalchemy import insert
+from app import db
+from app.models import Class, Subject, User, Timetable
+from utils.timetable import DAYS, format_minutes, timetable_index
+from benchmarks.common import create_benchmark_app, admin_headers, timed
+from benchmarks.timetable_bulk import PERIODS, weekly_grid
+
+def full_listing(client, headers):
+    entries, query = [], {'limit': 500}
+    while True:
+        page = client.get('/api/timetable/', query_string=query, headers=headers).get_json()
+        entries.extend(page['items'])
+        if page['next_cursor'] is None:
+            return entries
+        query['cursor'] = page['next_cursor']
+
+def free_from_listing(entries, teacher_ids, day_of_week, start, end):
+    # What a client did before /free existed: fetch everything and scan it
+    busy = {
+        entry['teacher_id'] for entry in entries
+        if entry['day_of_week'] == day_of_week and entry['start_time'] < end and start < entry['end_time']
+    }
+    return [teacher_id for teacher_id in teacher_ids if teacher_id not in busy]
+
+def run(class_count=40, repeats=200):
+    app = create_benchmark_app()
+    with app.app_context():
+        db.session.execute(insert(Class), [{'name': f'Class {i}'} for i in range(1, class_count + 1)])
+        db.session.execute(insert(Subject), [{'name': f'Subject {i}', 'code': f'S{i}'} for i in range(1, 13)])
+        db.session.execute(insert(User), [{
+            'username': f'teacher{i}', 'email': f'teacher{i}@example.com', 'role': 'teacher'
+        } for i in range(1, class_count + 21)])
+        db.session.commit()
+        teacher_ids = [row.id for row in db.session.query(User.id).filter(User.role == 'teacher').order_by(User.id)]
+        subject_ids = [row.id for row in db.session.query(Subject.id).order_by(Subject.id)]
+        client = app.test_client()
+        headers = admin_headers()
+        client.put('/api/timetable/bulk', json={
+            'entries': weekly_grid(class_count, teacher_ids, subject_ids)
+        }, headers=headers)
+        timetable_index.invalidate()
+        total = db.session.query(Timetable).count()
+        windows = [(DAYS[i % 5], format_minutes(PERIODS[i % 8][0]), format_minutes(PERIODS[i % 8][1]))
+                   for i in range(repeats)]
+        print(f'Free teachers, {len(teacher_ids)} teachers, {total} entries, {repeats} lookups')
+
+        with timed(f'legacy: full listing x {repeats}'):
+            for day_of_week, start, end in windows:
+                legacy = free_from_listing(full_listing(client, headers), teacher_ids, day_of_week, start, end)
+
+        with timed(f'/free x {repeats}'):
+            for day_of_week, start, end in windows:
+                response = client.get(
+                    f'/api/timetable/free?kind=teacher&day_of_week={day_of_week}&start_time={start}&end_time={end}',
+                    headers=headers
+                )
+        print(f"  last window: {len(response.get_json()['free'])} free, legacy scan found {len(legacy)}")
+
+        with timed(f'/substitutes x {repeats}'):
+            for i in range(repeats):
+                client.get(
+                    f'/api/timetable/substitutes?teacher_id={teacher_ids[i % len(teacher_ids)]}&day_of_week={DAYS[i % 5]}',
+                    headers=headers
+                )
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 40)
@@ -0,0 +1,62 @@
+# Run from backend/: python -m benchmarks.timetable_generator
+import random
+import sys
+from sqlalchemy import insert
+from app import db
+from app.models import Class, Subject, User, Timetable
+from benchmarks.common import create_benchmark_app, admin_headers, timed
+
+# Eight 40-minute periods around a morning break and lunch
+PERIODS = ['08:00', '08:40', '09:20', '10:00', '10:30', '11:10', '11:50', '12:30', '13:10', '14:00', '14:40']
+BREAKS = [{'start_time': '10:00', 'end_time': '10:30'}, {'start_time': '13:10', 'end_time': '14:00'}]
+WEEKLY_PERIODS = [6, 5, 5, 4, 4, 4, 3, 3, 3, 3]
+
+def school(class_count, teacher_count, rng):
+    # Each class-subject goes to the least loaded teacher, as a deputy would allocate them
+    loads = {teacher_id: 0 for teacher_id in range(1, teacher_count + 1)}
+    lessons = []
+    for class_id in range(1, class_count + 1):
+        for subject_id, periods in enumerate(WEEKLY_PERIODS, start=1):
+            teacher_id = min(loads, key=lambda teacher_id: (loads[teacher_id], rng.random()))
+            loads[teacher_id] += periods
+            lessons.append({'class_id': class_id, 'subject_id': subject_id, 'teacher_id': teacher_id,
+                            'periods_per_week': periods})
+    # A few part-time teachers are away on Friday afternoons
+    unavailable = [{'teacher_id': teacher_id, 'day_of_week': 'Friday', 'start_time': '11:50', 'end_time': '15:20'}
+                   for teacher_id in range(1, teacher_count + 1, 10)]
+    return lessons, unavailable
+
+def run(class_count=40, teacher_count=60):
+    app = create_benchmark_app()
+    with app.app_context():
+        db.session.execute(insert(Class), [{'name': f'Class {i}'} for i in range(1, class_count + 1)])
+        db.session.execute(insert(Subject), [{'name': f'Subject {i}', 'code': f'S{i}'}
+                                             for i in range(1, len(WEEKLY_PERIODS) + 1)])
+        db.session.execute(insert(User), [{'username': f'teacher{i}', 'email': f'teacher{i}@example.com', 'role': 'teacher'}
+                                          for i in range(1, teacher_count + 1)])
+        db.session.commit()
+        lessons, unavailable = school(class_count, teacher_count, random.Random(0))
+        body = {
+            'lessons': lessons,
+            'unavailable': unavailable,
+            'periods': [{'start_time': start, 'end_time': end} for start, end in zip(PERIODS, PERIODS[1:])],
+            'breaks': BREAKS
+        }
+        client = app.test_client()
+        headers = admin_headers()
+        print(f'Timetable generator, {class_count} classes, {teacher_count} teachers, '
+              f'{sum(WEEKLY_PERIODS)} lesson periods per class per week')
+
+        for seed in range(3):
+            with timed(f'generate, seed {seed} (dry run)'):
+                response = client.post('/api/timetable/generate', json={**body, 'seed': seed, 'dry_run': True},
+                                       headers=headers)
+            print(f"  {len(response.get_json().get('entries', []))} entries")
+
+        with timed('generate and save'):
+            response = client.post('/api/timetable/generate', json=body, headers=headers)
+        print(f"  {response.get_json()}"[:120])
+        print(f'  {db.session.query(Timetable).count()} entries stored')
+
+if __name__ == '__main__':
+    run(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,29 @@
+"""Unique attendance per student and date
+
+Revision ID: a1c4e2f7b9d0
+Revises: 6f3e603a5d8e
+Create Date: 2026-10-18 09:12:44.310552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c4e2f7b9d0'
+down_revision = '6f3e603a5d8e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep only the most recent row for any duplicated (student_id, date)
+    op.execute(
+        'DELETE FROM attendances WHERE id NOT IN '
+        '(SELECT MAX(id) FROM attendances GROUP BY student_id, date)'
+    )
+    op.create_index('ix_attendances_student_id_date', 'attendances', ['student_id', 'date'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_attendances_student_id_date', table_name='attendances')
@@ -0,0 +1,55 @@
+"""Student search index
+
+Revision ID: a4d8c2e6f1b3
+Revises: f2b6d9e4c8a1
+Create Date: 2026-10-18 16:21:44.318257
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d8c2e6f1b3'
+down_revision = 'f2b6d9e4c8a1'
+branch_labels = None
+depends_on = None
+
+STUDENT_SEARCH_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5(
+        first_name, last_name, admission_number, phone, email,
+        content='students', content_rowid='id', prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS students_fts_ai AFTER INSERT ON students BEGIN
+        INSERT INTO students_fts (rowid, first_name, last_name, admission_number, phone, email)
+        VALUES (new.id, new.first_name, new.last_name, new.admission_number, new.phone, new.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS students_fts_ad AFTER DELETE ON students BEGIN
+        INSERT INTO students_fts (students_fts, rowid, first_name, last_name, admission_number, phone, email)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.admission_number, old.phone, old.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS students_fts_au
+    AFTER UPDATE OF first_name, last_name, admission_number, phone, email ON students BEGIN
+        INSERT INTO students_fts (students_fts, rowid, first_name, last_name, admission_number, phone, email)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.admission_number, old.phone, old.email);
+        INSERT INTO students_fts (rowid, first_name, last_name, admission_number, phone, email)
+        VALUES (new.id, new.first_name, new.last_name, new.admission_number, new.phone, new.email);
+    END"""
+)
+
+
+def upgrade():
+    # Other databases fall back to prefix LIKE queries in utils.student_search
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in STUDENT_SEARCH_DDL:
+        op.execute(statement)
+    op.execute("INSERT INTO students_fts (students_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for trigger in ('students_fts_ai', 'students_fts_ad', 'students_fts_au'):
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.execute('DROP TABLE IF EXISTS students_fts')
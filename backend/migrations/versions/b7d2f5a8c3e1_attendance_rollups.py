@@ -0,0 +1,56 @@
+"""Attendance rollups
+
+Revision ID: b7d2f5a8c3e1
+Revises: a1c4e2f7b9d0
+Create Date: 2026-10-18 10:03:17.842116
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2f5a8c3e1'
+down_revision = 'a1c4e2f7b9d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    rollups = op.create_table('attendance_rollups',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('present_days', sa.Integer(), nullable=False),
+    sa.Column('absent_days', sa.Integer(), nullable=False),
+    sa.Column('late_days', sa.Integer(), nullable=False),
+    sa.Column('total_days', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+    sa.PrimaryKeyConstraint('student_id', 'year', 'month')
+    )
+
+    # Backfill from existing attendance rows
+    attendances = sa.table('attendances',
+        sa.column('id', sa.Integer),
+        sa.column('student_id', sa.Integer),
+        sa.column('date', sa.Date),
+        sa.column('status', sa.String)
+    )
+    year = sa.extract('year', attendances.c.date)
+    month = sa.extract('month', attendances.c.date)
+    op.execute(rollups.insert().from_select(
+        ['student_id', 'year', 'month', 'present_days', 'absent_days', 'late_days', 'total_days'],
+        sa.select(
+            attendances.c.student_id,
+            year,
+            month,
+            sa.func.count(sa.case((attendances.c.status == 'present', 1))),
+            sa.func.count(sa.case((attendances.c.status == 'absent', 1))),
+            sa.func.count(sa.case((attendances.c.status == 'late', 1))),
+            sa.func.count(attendances.c.id)
+        ).group_by(attendances.c.student_id, year, month)
+    ))
+
+
+def downgrade():
+    op.drop_table('attendance_rollups')
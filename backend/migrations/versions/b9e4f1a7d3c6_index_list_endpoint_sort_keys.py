@@ -0,0 +1,26 @@
+"""Index list endpoint sort keys
+
+Revision ID: b9e4f1a7d3c6
+Revises: a4d8c2e6f1b3
+Create Date: 2026-10-18 17:02:13.604518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9e4f1a7d3c6'
+down_revision = 'a4d8c2e6f1b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_fees_payment_date', 'fees', ['payment_date'], unique=False)
+    op.create_index('ix_results_term_id', 'results', ['term_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_results_term_id', table_name='results')
+    op.drop_index('ix_fees_payment_date', table_name='fees')
@@ -0,0 +1,24 @@
+"""Index fees by term and student
+
+Revision ID: c3e9a1d6f4b2
+Revises: b7d2f5a8c3e1
+Create Date: 2026-10-18 11:26:05.517309
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e9a1d6f4b2'
+down_revision = 'b7d2f5a8c3e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_fees_term_student_id', 'fees', ['term', 'student_id', 'amount'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_fees_term_student_id', table_name='fees')
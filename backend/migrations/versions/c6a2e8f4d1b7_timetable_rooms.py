@@ -0,0 +1,26 @@
+"""Timetable rooms
+
+Revision ID: c6a2e8f4d1b7
+Revises: b9e4f1a7d3c6
+Create Date: 2026-10-18 18:11:52.740193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6a2e8f4d1b7'
+down_revision = 'b9e4f1a7d3c6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('timetable', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('room', sa.String(length=50), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('timetable', schema=None) as batch_op:
+        batch_op.drop_column('room')
@@ -0,0 +1,56 @@
+"""Fee structures and balances
+
+Revision ID: d5f1b8e2a7c4
+Revises: c3e9a1d6f4b2
+Create Date: 2026-10-18 12:41:52.093874
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f1b8e2a7c4'
+down_revision = 'c3e9a1d6f4b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('fee_structures',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('class_id', sa.Integer(), nullable=False),
+    sa.Column('term', sa.String(length=20), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['class_id'], ['classes.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('class_id', 'term', name='uq_fee_structures_class_id_term')
+    )
+    balances = op.create_table('fee_balances',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('term', sa.String(length=20), nullable=False),
+    sa.Column('amount_due', sa.Float(), nullable=False),
+    sa.Column('amount_paid', sa.Float(), nullable=False),
+    sa.Column('balance', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+    sa.PrimaryKeyConstraint('student_id', 'term')
+    )
+    op.create_index('ix_fee_balances_term_balance', 'fee_balances', ['term', 'balance'], unique=False)
+
+    # No fee structures exist yet, so existing payments open balances with nothing due
+    fees = sa.table('fees',
+        sa.column('student_id', sa.Integer),
+        sa.column('term', sa.String),
+        sa.column('amount', sa.Float)
+    )
+    paid = sa.func.sum(fees.c.amount)
+    op.execute(balances.insert().from_select(
+        ['student_id', 'term', 'amount_due', 'amount_paid', 'balance'],
+        sa.select(fees.c.student_id, fees.c.term, sa.literal(0), paid, -paid).group_by(fees.c.student_id, fees.c.term)
+    ))
+
+
+def downgrade():
+    op.drop_index('ix_fee_balances_term_balance', table_name='fee_balances')
+    op.drop_table('fee_balances')
+    op.drop_table('fee_structures')
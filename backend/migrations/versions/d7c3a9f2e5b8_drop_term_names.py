@@ -0,0 +1,83 @@
+"""Drop term names
+
+Revision ID: d7c3a9f2e5b8
+Revises: c6a2e8f4d1b7
+Create Date: 2026-10-18 21:40:52.118306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7c3a9f2e5b8'
+down_revision = 'c6a2e8f4d1b7'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def _backfill(bind, table, assignment, condition):
+    last = bind.execute(sa.text(f'SELECT MAX(id) FROM {table}')).scalar() or 0
+    for start in range(0, last, BATCH_SIZE):
+        bind.execute(sa.text(f'UPDATE {table} SET {assignment} WHERE {condition} AND id > :start AND id <= :end'),
+                     {'start': start, 'end': start + BATCH_SIZE})
+
+
+def upgrade():
+    """Contract: run once the release that writes only term_id is the only one left."""
+    bind = op.get_bind()
+    # f2b6d9e4c8a1 added a term for every name in use, with its dates. Names the old
+    # release wrote after that get a term without dates, to be set like any other
+    bind.execute(sa.text(
+        'INSERT INTO terms (name) SELECT term FROM ('
+        + ' UNION '.join(f'SELECT term FROM {table} WHERE term_id IS NULL AND term IS NOT NULL'
+                         for table in ('fees', 'results', 'fee_structures'))
+        + ') AS names WHERE term NOT IN (SELECT name FROM terms) ORDER BY term'
+    ))
+    for table in ('fees', 'results', 'fee_structures'):
+        _backfill(bind, table, f'term_id = (SELECT id FROM terms WHERE terms.name = {table}.term)', 'term_id IS NULL')
+
+    with op.batch_alter_table('fees') as batch_op:
+        batch_op.drop_index('ix_fees_term_student_id')
+        batch_op.alter_column('term_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_fees_term_id_terms', 'terms', ['term_id'], ['id'])
+        batch_op.drop_column('term')
+
+    with op.batch_alter_table('results') as batch_op:
+        batch_op.drop_index('ix_results_student_id_subject_id_term')
+        batch_op.alter_column('term_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_results_term_id_terms', 'terms', ['term_id'], ['id'])
+        batch_op.drop_column('term')
+
+    with op.batch_alter_table('fee_structures') as batch_op:
+        batch_op.drop_constraint('uq_fee_structures_class_id_term', type_='unique')
+        batch_op.alter_column('term_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_fee_structures_term_id_terms', 'terms', ['term_id'], ['id'])
+        batch_op.drop_column('term')
+
+
+def downgrade():
+    # Back to the expanded schema, with the names filled in again
+    for table in ('fees', 'results', 'fee_structures'):
+        op.add_column(table, sa.Column('term', sa.String(length=20), nullable=True))
+
+    bind = op.get_bind()
+    for table in ('fees', 'results', 'fee_structures'):
+        _backfill(bind, table, f'term = (SELECT name FROM terms WHERE terms.id = {table}.term_id)', '1 = 1')
+
+    with op.batch_alter_table('fee_structures') as batch_op:
+        batch_op.drop_constraint('fk_fee_structures_term_id_terms', type_='foreignkey')
+        batch_op.alter_column('term_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.create_unique_constraint('uq_fee_structures_class_id_term', ['class_id', 'term'])
+
+    with op.batch_alter_table('results') as batch_op:
+        batch_op.drop_constraint('fk_results_term_id_terms', type_='foreignkey')
+        batch_op.alter_column('term_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.create_index('ix_results_student_id_subject_id_term', ['student_id', 'subject_id', 'term'], unique=True)
+
+    with op.batch_alter_table('fees') as batch_op:
+        batch_op.drop_constraint('fk_fees_term_id_terms', type_='foreignkey')
+        batch_op.alter_column('term_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.create_index('ix_fees_term_student_id', ['term', 'student_id', 'amount'], unique=False)
@@ -0,0 +1,29 @@
+"""Timetable version
+
+Revision ID: e4b8d2a6c9f1
+Revises: d7c3a9f2e5b8
+Create Date: 2026-10-18 22:26:09.511874
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b8d2a6c9f1'
+down_revision = 'd7c3a9f2e5b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    timetable_version = op.create_table('timetable_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(timetable_version, [{'id': 1, 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('timetable_version')
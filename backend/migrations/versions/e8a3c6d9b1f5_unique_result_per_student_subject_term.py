@@ -0,0 +1,29 @@
+"""Unique result per student, subject and term
+
+Revision ID: e8a3c6d9b1f5
+Revises: d5f1b8e2a7c4
+Create Date: 2026-10-18 14:08:39.226471
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a3c6d9b1f5'
+down_revision = 'd5f1b8e2a7c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep only the most recent row for any duplicated (student_id, subject_id, term)
+    op.execute(
+        'DELETE FROM results WHERE id NOT IN '
+        '(SELECT MAX(id) FROM results GROUP BY student_id, subject_id, term)'
+    )
+    op.create_index('ix_results_student_id_subject_id_term', 'results', ['student_id', 'subject_id', 'term'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_results_student_id_subject_id_term', table_name='results')
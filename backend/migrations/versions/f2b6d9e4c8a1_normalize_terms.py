@@ -0,0 +1,144 @@
+"""Normalize terms
+
+Revision ID: f2b6d9e4c8a1
+Revises: e8a3c6d9b1f5
+Create Date: 2026-10-18 15:02:17.640391
+
+"""
+import re
+from datetime import date, timedelta
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b6d9e4c8a1'
+down_revision = 'e8a3c6d9b1f5'
+branch_labels = None
+depends_on = None
+
+# Month ranges the free-text names were read with before terms had their own dates
+TERM_MONTHS = {1: (1, 4), 2: (5, 8), 3: (9, 12)}
+TERM_PATTERN = re.compile(r'^\s*Term\s+(\d+)\s+(\d{4})\s*$', re.IGNORECASE)
+BATCH_SIZE = 5000
+
+
+def _term_dates(name):
+    match = TERM_PATTERN.match(name)
+    months = TERM_MONTHS.get(int(match.group(1))) if match else None
+    if not months:
+        return None, None
+    year = int(match.group(2))
+    end = date(year + 1, 1, 1) if months[1] == 12 else date(year, months[1] + 1, 1)
+    return date(year, months[0], 1), end - timedelta(days=1)
+
+
+def _backfill(bind, table, assignment):
+    # Walk the table in id ranges so no single statement holds its lock for long
+    last = bind.execute(sa.text(f'SELECT MAX(id) FROM {table}')).scalar() or 0
+    for start in range(0, last, BATCH_SIZE):
+        bind.execute(sa.text(f'UPDATE {table} SET {assignment} WHERE id > :start AND id <= :end'),
+                     {'start': start, 'end': start + BATCH_SIZE})
+
+
+def _rebuild_fee_balances(term_column, rows, *constraints):
+    op.create_table('fee_balances_new',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    term_column,
+    sa.Column('amount_due', sa.Float(), nullable=False),
+    sa.Column('amount_paid', sa.Float(), nullable=False),
+    sa.Column('balance', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+    *constraints,
+    sa.PrimaryKeyConstraint('student_id', term_column.name)
+    )
+    op.execute(f'INSERT INTO fee_balances_new (student_id, {term_column.name}, amount_due, amount_paid, balance) {rows}')
+    op.drop_table('fee_balances')
+    op.rename_table('fee_balances_new', 'fee_balances')
+
+
+def upgrade():
+    """Expand and backfill; the string columns are dropped by d7c3a9f2e5b8.
+
+    Both releases can run against the schema this leaves: the string columns
+    become nullable so the new one can insert without them, and the unique
+    keys it upserts on are added next to the old ones. The fee ledger is
+    derived data and small, so it is re-keyed here; payments recorded by the
+    old release fail until the new one is deployed.
+    """
+    terms = op.create_table('terms',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=20), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=True),
+    sa.Column('end_date', sa.Date(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_terms_start_date'), 'terms', ['start_date'], unique=False)
+
+    # Expand: nullable integer keys next to the strings, filled in batches
+    for table in ('fees', 'results', 'fee_structures'):
+        op.add_column(table, sa.Column('term_id', sa.Integer(), nullable=True))
+
+    bind = op.get_bind()
+    names = set()
+    for table in ('fees', 'results', 'fee_structures', 'fee_balances'):
+        names.update(row[0] for row in bind.execute(sa.text(f'SELECT DISTINCT term FROM {table}')))
+    op.bulk_insert(terms, [
+        dict(zip(('name', 'start_date', 'end_date'), (name, *_term_dates(name)))) for name in sorted(names)
+    ])
+
+    for table in ('fees', 'results', 'fee_structures'):
+        _backfill(bind, table, f'term_id = (SELECT id FROM terms WHERE terms.name = {table}.term)')
+
+    op.create_index('ix_fees_term_id_student_id', 'fees', ['term_id', 'student_id', 'amount'], unique=False)
+    op.create_index('ix_results_student_id_subject_id_term_id', 'results', ['student_id', 'subject_id', 'term_id'], unique=True)
+    for table in ('fees', 'results'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('term', existing_type=sa.String(length=20), nullable=True)
+
+    with op.batch_alter_table('fee_structures') as batch_op:
+        batch_op.alter_column('term', existing_type=sa.String(length=20), nullable=True)
+        batch_op.create_unique_constraint('uq_fee_structures_class_id_term_id', ['class_id', 'term_id'])
+
+    # The ledger's primary key changes, so copy it into a new table rather than alter it
+    op.drop_index('ix_fee_balances_term_balance', table_name='fee_balances')
+    _rebuild_fee_balances(
+        sa.Column('term_id', sa.Integer(), nullable=False),
+        'SELECT b.student_id, t.id, b.amount_due, b.amount_paid, b.balance '
+        'FROM fee_balances b JOIN terms t ON t.name = b.term',
+        sa.ForeignKeyConstraint(['term_id'], ['terms.id'], )
+    )
+    op.create_index('ix_fee_balances_term_id_balance', 'fee_balances', ['term_id', 'balance'], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    for table in ('fees', 'results', 'fee_structures'):
+        _backfill(bind, table, f'term = COALESCE((SELECT name FROM terms WHERE terms.id = {table}.term_id), term)')
+
+    op.drop_index('ix_fee_balances_term_id_balance', table_name='fee_balances')
+    _rebuild_fee_balances(
+        sa.Column('term', sa.String(length=20), nullable=False),
+        'SELECT b.student_id, t.name, b.amount_due, b.amount_paid, b.balance '
+        'FROM fee_balances b JOIN terms t ON t.id = b.term_id'
+    )
+    op.create_index('ix_fee_balances_term_balance', 'fee_balances', ['term', 'balance'], unique=False)
+
+    with op.batch_alter_table('fee_structures') as batch_op:
+        batch_op.drop_constraint('uq_fee_structures_class_id_term_id', type_='unique')
+        batch_op.alter_column('term', existing_type=sa.String(length=20), nullable=False)
+        batch_op.drop_column('term_id')
+
+    with op.batch_alter_table('results') as batch_op:
+        batch_op.drop_index('ix_results_student_id_subject_id_term_id')
+        batch_op.alter_column('term', existing_type=sa.String(length=20), nullable=False)
+        batch_op.drop_column('term_id')
+
+    with op.batch_alter_table('fees') as batch_op:
+        batch_op.drop_index('ix_fees_term_id_student_id')
+        batch_op.alter_column('term', existing_type=sa.String(length=20), nullable=False)
+        batch_op.drop_column('term_id')
+
+    op.drop_index(op.f('ix_terms_start_date'), table_name='terms')
+    op.drop_table('terms')
@@ -1,11 +1,24 @@
 from flask import request, jsonify, Blueprint
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models import Attendance, Student, Class
-from datetime import datetime, date
+from app.models import Attendance
+from utils.attendance import (
+    upsert_attendance, summarize_outcomes, parse_report_range, month_bounds, attendance_report
+)
+from utils.attendance_calendar import DAY_SYMBOLS, class_month_grid, student_year_calendar
+from utils.terms import requested_term, term_date_range
+from utils.pagination import column_field, isoformat, paginate
+from utils.student_profile import invalidate_student_profiles
 
 attendance_bp = Blueprint('attendance_bp', __name__)
 
+ATTENDANCE_FIELDS = {
+    'id': column_field(Attendance.id),
+    'date': column_field(Attendance.date, isoformat),
+    'status': column_field(Attendance.status),
+    'remarks': column_field(Attendance.remarks)
+}
+
 @attendance_bp.route('/', methods=['GET'])
 def attendance_home():
     return jsonify({'message': 'Attendance API is working'}), 200
@@ -22,37 +35,17 @@ def mark_attendance():
     if not isinstance(data, list):
         return jsonify({'message': 'Expected an array of attendance records'}), 400
     
-    records = []
-    for record in data:
-        required_fields = ['student_id', 'date', 'status']
-        if not all(field in record for field in required_fields):
-            continue  # Skip invalid records
-        
-        try:
-            attendance_date = datetime.strptime(record['date'], '%Y-%m-%d').date()
-        except ValueError:
-            continue  # Skip records with invalid date format
-        
-        # Check if attendance already exists for this student on this date
-        existing = Attendance.query.filter_by(
-            student_id=record['student_id'],
-            date=attendance_date
-        ).first()
-        
-        if existing:
-            existing.status = record['status']
-            existing.remarks = record.get('remarks')
-        else:
-            new_attendance = Attendance(
-                student_id=record['student_id'],
-                date=attendance_date,
-                status=record['status'],
-                remarks=record.get('remarks')
-            )
-            db.session.add(new_attendance)
-    
+    outcomes = upsert_attendance(data)
     db.session.commit()
-    return jsonify({'message': 'Attendance recorded successfully'}), 201
+    invalidate_student_profiles(
+        int(data[outcome['index']]['student_id']) for outcome in outcomes if outcome['outcome'] != 'skipped'
+    )
+    
+    return jsonify({
+        'message': 'Attendance recorded successfully',
+        'summary': summarize_outcomes(outcomes),
+        'records': outcomes
+    }), 201
 
 @attendance_bp.route('/report', methods=['GET'])
 @jwt_required()
@@ -62,53 +55,83 @@ def get_attendance_report():
         return jsonify({'message': 'Unauthorized access'}), 403
     
     class_id = request.args.get('class_id')
+    
+    if request.args.get('term_id') or request.args.get('term'):
+        term = requested_term(request.args)
+        if not term:
+            return jsonify({'message': 'Term not found'}), 404
+        date_range = term_date_range(term)
+        if not date_range:
+            return jsonify({'message': 'Term has no dates set'}), 400
+        start, end = date_range
+    else:
+        try:
+            start, end = parse_report_range(request.args)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+    
+    return jsonify(attendance_report(start, end, class_id)), 200
+
+@attendance_bp.route('/grid', methods=['GET'])
+@jwt_required()
+def get_attendance_grid():
+    current_user = get_jwt_identity()
+    if current_user['role'] not in ['admin', 'teacher']:
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    class_id = request.args.get('class_id', type=int)
     month = request.args.get('month')
     year = request.args.get('year')
     
-    if not (month and year):
-        return jsonify({'message': 'Month and year are required'}), 400
+    if not (class_id and month and year):
+        return jsonify({'message': 'class_id, month and year are required'}), 400
     
     try:
-        month = int(month)
-        year = int(year)
+        template, grid = class_month_grid(class_id, int(year), int(month))
     except ValueError:
         return jsonify({'message': 'Month and year must be numbers'}), 400
     
-    # Get all students in the class (if class_id is provided)
-    query = Student.query.filter_by(is_active=True)
-    if class_id:
-        query = query.filter_by(class_id=class_id)
-    students = query.all()
-    
-    report = []
-    for student in students:
-        # Get all attendance records for this student in the specified month/year
-        attendances = Attendance.query.filter(
-            Attendance.student_id == student.id,
-            db.extract('year', Attendance.date) == year,
-            db.extract('month', Attendance.date) == month
-        ).all()
-        
-        present_days = sum(1 for a in attendances if a.status == 'present')
-        absent_days = sum(1 for a in attendances if a.status == 'absent')
-        late_days = sum(1 for a in attendances if a.status == 'late')
-        total_days = len(attendances)
-        
-        report.append({
-            'student_id': student.id,
-            'admission_number': student.admission_number,
-            'first_name': student.first_name,
-            'last_name': student.last_name,
-            'class_id': student.class_id,
-            'class_name': student.class_.name if student.class_ else None,
-            'present_days': present_days,
-            'absent_days': absent_days,
-            'late_days': late_days,
-            'total_days': total_days,
-            'attendance_rate': round((present_days / total_days * 100), 2) if total_days > 0 else 0
-        })
-    
-    return jsonify(report), 200
+    # 'symbols' gives one character per day; 'packed' gives base64 of two bits per day
+    packed = request.args.get('encoding') == 'packed'
+    
+    return jsonify({
+        'class_id': class_id,
+        'start': template.start.isoformat(),
+        'days': template.days,
+        'encoding': 'packed' if packed else 'symbols',
+        'legend': dict(zip(DAY_SYMBOLS, [None, 'present', 'absent', 'late'])),
+        'students': [{
+            'student_id': student_id,
+            'admission_number': entry['admission_number'],
+            'name': entry['name'],
+            'days': entry['calendar'].to_base64() if packed else entry['calendar'].to_symbols()
+        } for student_id, entry in grid.items()]
+    }), 200
+
+@attendance_bp.route('/student/<int:student_id>/calendar', methods=['GET'])
+@jwt_required()
+def get_student_calendar(student_id):
+    current_user = get_jwt_identity()
+    if current_user['role'] not in ['admin', 'teacher']:
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    year = request.args.get('year', type=int)
+    if not year:
+        return jsonify({'message': 'Year is required'}), 400
+    
+    try:
+        calendar = student_year_calendar(student_id, year)
+    except ValueError:
+        return jsonify({'message': 'Year is out of range'}), 400
+    
+    return jsonify({
+        'student_id': student_id,
+        'start': calendar.start.isoformat(),
+        'days': calendar.days,
+        'encoding': 'packed',
+        'data': calendar.to_base64(),
+        'summary': calendar.counts()
+    }), 200
 
 @attendance_bp.route('/student/<int:student_id>', methods=['GET'])
 @jwt_required()
@@ -124,22 +147,14 @@ def get_student_attendance(student_id):
     
     if month and year:
         try:
-            month = int(month)
-            year = int(year)
-            query = query.filter(
-                db.extract('year', Attendance.date) == year,
-                db.extract('month', Attendance.date) == month
-            )
+            start, end = month_bounds(int(year), int(month))
+            query = query.filter(Attendance.date >= start, Attendance.date < end)
         except ValueError:
             return jsonify({'message': 'Month and year must be numbers'}), 400
     
-    attendances = query.order_by(Attendance.date).all()
-    
-    attendance_data = [{
-        'id': attendance.id,
-        'date': attendance.date.isoformat(),
-        'status': attendance.status,
-        'remarks': attendance.remarks
-    } for attendance in attendances]
+    try:
+        page = paginate(query, [(Attendance.date, False), (Attendance.id, False)], ATTENDANCE_FIELDS)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
-    return jsonify(attendance_data), 200
\ No newline at end of file
+    return jsonify(page), 200
\ No newline at end of file
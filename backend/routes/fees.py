@@ -1,11 +1,44 @@
+import io
 from flask import request, jsonify, Blueprint
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
 from app import db
-from app.models import Fee, Student
+from app.models import Fee, FeeStructure, FeeBalance, Student, Class, Term
 from datetime import datetime
+from utils.fees import apply_payment, parse_amount, set_fee_structure, collection_summary
+from utils.fee_import import import_payments
+from utils.student_profile import invalidate_student_profiles
+from utils.terms import requested_term, current_term
+from utils.pagination import Field, column_field, isoformat, paginate
+from utils.helpers import stream_csv
 
 fees_bp = Blueprint('fees_bp', __name__)
 
+# Shared by the student fields so the student is joined once
+fee_student = joinedload(Fee.student).load_only(Student.first_name, Student.last_name, Student.admission_number)
+
+FEE_FIELDS = {
+    'id': column_field(Fee.id),
+    'student_id': column_field(Fee.student_id),
+    'student_name': Field(
+        lambda fee: f"{fee.student.first_name} {fee.student.last_name}",
+        [Fee.student_id],
+        [fee_student]
+    ),
+    'admission_number': Field(
+        lambda fee: fee.student.admission_number,
+        [Fee.student_id],
+        [fee_student]
+    ),
+    'amount': column_field(Fee.amount),
+    'payment_date': column_field(Fee.payment_date, isoformat),
+    'term_id': column_field(Fee.term_id),
+    'term': Field(lambda fee: fee.term.name, [Fee.term_id], [joinedload(Fee.term).load_only(Term.name)]),
+    'payment_method': column_field(Fee.payment_method),
+    'receipt_number': column_field(Fee.receipt_number),
+    'notes': column_field(Fee.notes)
+}
+
 @fees_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_fees():
@@ -14,31 +47,23 @@ def get_fees():
         return jsonify({'message': 'Unauthorized access'}), 403
     
     student_id = request.args.get('student_id')
-    term = request.args.get('term')
     
     query = Fee.query
     
     if student_id:
         query = query.filter_by(student_id=student_id)
-    if term:
-        query = query.filter_by(term=term)
-    
-    fees = query.order_by(Fee.payment_date.desc()).all()
-    
-    fees_data = [{
-        'id': fee.id,
-        'student_id': fee.student_id,
-        'student_name': f"{fee.student.first_name} {fee.student.last_name}",
-        'admission_number': fee.student.admission_number,
-        'amount': fee.amount,
-        'payment_date': fee.payment_date.isoformat() if fee.payment_date else None,
-        'term': fee.term,
-        'payment_method': fee.payment_method,
-        'receipt_number': fee.receipt_number,
-        'notes': fee.notes
-    } for fee in fees]
-    
-    return jsonify(fees_data), 200
+    if request.args.get('term_id') or request.args.get('term'):
+        term = requested_term(request.args)
+        if not term:
+            return jsonify({'message': 'Term not found'}), 404
+        query = query.filter_by(term_id=term.id)
+    
+    try:
+        page = paginate(query, [(Fee.payment_date, True), (Fee.id, True)], FEE_FIELDS)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return jsonify(page), 200
 
 @fees_bp.route('/unpaid', methods=['GET'])
 @jwt_required()
@@ -47,15 +72,38 @@ def get_unpaid_students():
     if current_user['role'] not in ['admin', 'teacher']:
         return jsonify({'message': 'Unauthorized access'}), 403
     
-    term = request.args.get('term', 'Term 1 2023')  # Default to current term
+    if request.args.get('term_id') or request.args.get('term'):
+        term = requested_term(request.args)
+    else:
+        term = current_term()
+    if not term:
+        return jsonify({'message': 'Term not found'}), 404
+    paid_below = request.args.get('paid_below', type=float)
     
-    # Get all active students
-    all_students = Student.query.filter_by(is_active=True).all()
+    query = db.session.query(
+        Student.id,
+        Student.admission_number,
+        Student.first_name,
+        Student.last_name,
+        Student.class_id,
+        Class.name.label('class_name')
+    ).outerjoin(Class, Student.class_id == Class.id).filter(Student.is_active == True)
     
-    # Get students who have paid for the term
-    paid_student_ids = [fee.student_id for fee in Fee.query.filter_by(term=term).all()]
-    
-    unpaid_students = [student for student in all_students if student.id not in paid_student_ids]
+    if paid_below is None:
+        # Students with no payment at all for the term
+        query = query.add_columns(db.literal(0).label('amount_paid')).filter(
+            ~db.exists().where(Fee.student_id == Student.id, Fee.term_id == term.id)
+        )
+    else:
+        # Students whose payments for the term total less than the threshold
+        paid = db.session.query(
+            Fee.student_id,
+            db.func.sum(Fee.amount).label('amount_paid')
+        ).filter(Fee.term_id == term.id).group_by(Fee.student_id).subquery()
+        amount_paid = db.func.coalesce(paid.c.amount_paid, 0)
+        query = query.add_columns(amount_paid.label('amount_paid')).outerjoin(
+            paid, paid.c.student_id == Student.id
+        ).filter(amount_paid < paid_below)
     
     unpaid_students_data = [{
         'id': student.id,
@@ -63,8 +111,9 @@ def get_unpaid_students():
         'first_name': student.first_name,
         'last_name': student.last_name,
         'class_id': student.class_id,
-        'class_name': student.class_.name if student.class_ else None
-    } for student in unpaid_students]
+        'class_name': student.class_name,
+        'amount_paid': student.amount_paid
+    } for student in query.order_by(Student.id)]
     
     return jsonify(unpaid_students_data), 200
 
@@ -77,28 +126,55 @@ def record_payment():
     
     data = request.get_json()
     
-    required_fields = ['student_id', 'amount', 'term']
-    if not all(field in data for field in required_fields):
+    required_fields = ['student_id', 'amount']
+    if not all(field in data for field in required_fields) or not ('term_id' in data or 'term' in data):
         return jsonify({'message': 'Missing required fields'}), 400
     
     student = Student.query.get(data['student_id'])
     if not student:
         return jsonify({'message': 'Student not found'}), 404
     
+    term = requested_term(data)
+    if not term:
+        return jsonify({'message': 'Term not found'}), 404
+    
+    try:
+        amount = parse_amount(data['amount'])
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
     fee = Fee(
         student_id=data['student_id'],
-        amount=data['amount'],
-        term=data['term'],
+        amount=amount,
+        term_id=term.id,
         payment_method=data.get('payment_method'),
         receipt_number=data.get('receipt_number'),
         notes=data.get('notes')
     )
     
     db.session.add(fee)
+    apply_payment(fee.student_id, fee.term_id, amount)
     db.session.commit()
+    invalidate_student_profiles([fee.student_id])
     
     return jsonify({'message': 'Payment recorded successfully', 'id': fee.id}), 201
 
+@fees_bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_fee_payments():
+    current_user = get_jwt_identity()
+    if current_user['role'] != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    # Accept a multipart upload named 'file' or a raw text/csv body
+    upload = request.files.get('file')
+    lines = io.TextIOWrapper(upload.stream if upload else request.stream, encoding='utf-8-sig', newline='')
+    
+    try:
+        return stream_csv(import_payments(lines), ['line', 'receipt_number', 'outcome', 'reason'])
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
 @fees_bp.route('/<int:fee_id>', methods=['PUT'])
 @jwt_required()
 def update_payment(fee_id):
@@ -109,8 +185,18 @@ def update_payment(fee_id):
     fee = Fee.query.get_or_404(fee_id)
     data = request.get_json()
     
-    fee.amount = data.get('amount', fee.amount)
-    fee.term = data.get('term', fee.term)
+    previous_term_id, previous_amount = fee.term_id, fee.amount
+    
+    if 'amount' in data:
+        try:
+            fee.amount = parse_amount(data['amount'])
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+    if 'term_id' in data or 'term' in data:
+        term = requested_term(data)
+        if not term:
+            return jsonify({'message': 'Term not found'}), 404
+        fee.term_id = term.id
     fee.payment_method = data.get('payment_method', fee.payment_method)
     fee.receipt_number = data.get('receipt_number', fee.receipt_number)
     fee.notes = data.get('notes', fee.notes)
@@ -121,6 +207,136 @@ def update_payment(fee_id):
         except ValueError:
             return jsonify({'message': 'Invalid date format. Use YYYY-MM-DD'}), 400
     
+    if (fee.term_id, fee.amount) != (previous_term_id, previous_amount):
+        apply_payment(fee.student_id, previous_term_id, -previous_amount)
+        apply_payment(fee.student_id, fee.term_id, fee.amount)
+    
     db.session.commit()
+    invalidate_student_profiles([fee.student_id])
+    
+    return jsonify({'message': 'Payment updated successfully'}), 200
+
+@fees_bp.route('/structure', methods=['GET'])
+@jwt_required()
+def get_fee_structure():
+    current_user = get_jwt_identity()
+    if current_user['role'] not in ['admin', 'teacher']:
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    query = db.session.query(FeeStructure, Class.name, Term.name).join(
+        Class, FeeStructure.class_id == Class.id
+    ).join(Term, FeeStructure.term_id == Term.id)
+    if request.args.get('term_id') or request.args.get('term'):
+        term = requested_term(request.args)
+        if not term:
+            return jsonify({'message': 'Term not found'}), 404
+        query = query.filter(FeeStructure.term_id == term.id)
+    
+    structure_data = [{
+        'id': structure.id,
+        'class_id': structure.class_id,
+        'class_name': class_name,
+        'term_id': structure.term_id,
+        'term': term_name,
+        'amount': structure.amount
+    } for structure, class_name, term_name in query.order_by(Term.start_date, Term.id, Class.name)]
+    
+    return jsonify(structure_data), 200
+
+@fees_bp.route('/structure', methods=['POST'])
+@jwt_required()
+def set_fee_structure_entry():
+    current_user = get_jwt_identity()
+    if current_user['role'] != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    data = request.get_json()
+    
+    required_fields = ['class_id', 'amount']
+    if not all(field in data for field in required_fields) or not ('term_id' in data or 'term' in data):
+        return jsonify({'message': 'Missing required fields'}), 400
+    
+    if not Class.query.get(data['class_id']):
+        return jsonify({'message': 'Class not found'}), 404
+    
+    term = requested_term(data)
+    if not term:
+        return jsonify({'message': 'Term not found'}), 404
+    
+    try:
+        amount = float(data['amount'])
+    except (TypeError, ValueError):
+        return jsonify({'message': 'Amount must be a number'}), 400
+    
+    set_fee_structure(data['class_id'], term.id, amount)
+    db.session.commit()
+    invalidate_student_profiles()
+    
+    return jsonify({'message': 'Fee structure saved successfully'}), 200
+
+@fees_bp.route('/balances', methods=['GET'])
+@jwt_required()
+def get_fee_balances():
+    current_user = get_jwt_identity()
+    if current_user['role'] not in ['admin', 'teacher']:
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    filter_term = request.args.get('term_id') or request.args.get('term')
+    student_id = request.args.get('student_id')
+    class_id = request.args.get('class_id')
+    in_arrears = request.args.get('in_arrears', 'false').lower() == 'true'
+    
+    if not (filter_term or student_id):
+        return jsonify({'message': 'Term or student_id is required'}), 400
+    
+    query = db.session.query(
+        FeeBalance,
+        Term.name,
+        Student.admission_number,
+        Student.first_name,
+        Student.last_name,
+        Student.class_id
+    ).join(Student, Student.id == FeeBalance.student_id).join(Term, Term.id == FeeBalance.term_id)
+    
+    if filter_term:
+        term = requested_term(request.args)
+        if not term:
+            return jsonify({'message': 'Term not found'}), 404
+        query = query.filter(FeeBalance.term_id == term.id)
+    if student_id:
+        query = query.filter(FeeBalance.student_id == student_id)
+    if class_id:
+        query = query.filter(Student.class_id == class_id)
+    if in_arrears:
+        query = query.filter(FeeBalance.balance > 0)
+    
+    balances_data = [{
+        'student_id': balance.student_id,
+        'admission_number': admission_number,
+        'student_name': f"{first_name} {last_name}",
+        'class_id': student_class_id,
+        'term_id': balance.term_id,
+        'term': term_name,
+        'amount_due': balance.amount_due,
+        'amount_paid': balance.amount_paid,
+        'balance': balance.balance
+    } for balance, term_name, admission_number, first_name, last_name, student_class_id
+        in query.order_by(FeeBalance.balance.desc(), FeeBalance.student_id)]
+    
+    return jsonify(balances_data), 200
+
+@fees_bp.route('/summary', methods=['GET'])
+@jwt_required()
+def get_fee_summary():
+    current_user = get_jwt_identity()
+    if current_user['role'] not in ['admin', 'teacher']:
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    if not (request.args.get('term_id') or request.args.get('term')):
+        return jsonify({'message': 'Term is required'}), 400
+    
+    term = requested_term(request.args)
+    if not term:
+        return jsonify({'message': 'Term not found'}), 404
     
-    return jsonify({'message': 'Payment updated successfully'}), 200
\ No newline at end of file
+    return jsonify(collection_summary(term, request.args.get('class_id'))), 200
\ No newline at end of file
@@ -1,11 +1,49 @@
-from flask import request, jsonify, Blueprint
+from flask import request, jsonify, Blueprint, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
 from app import db
-from app.models import Result, Student, Subject
+from app.models import Result, Student, Subject, Term
 from datetime import datetime
+from utils.grading import calculate_grade
+from utils.results import validate_mark_sheet, upsert_mark_sheet
+from utils.result_stats import class_term_statistics, invalidate_for_students
+from utils.student_profile import invalidate_student_profiles
+from utils.attendance import parse_report_range
+from utils.report_cards import (
+    EMPTY_ATTENDANCE, load_report_card, load_class_report_cards, render_report_cards, stream_zip, merge_pdfs,
+    report_card_filename
+)
+from utils.pdf_generator import generate_pdf_report_card
+from utils.terms import requested_term
+from utils.pagination import Field, column_field, paginate
 
 results_bp = Blueprint('results_bp', __name__)
 
+# Shared by the student fields so the student is joined once
+result_student = joinedload(Result.student).load_only(Student.first_name, Student.last_name, Student.admission_number)
+
+RESULT_FIELDS = {
+    'id': column_field(Result.id),
+    'student_id': column_field(Result.student_id),
+    'student_name': Field(
+        lambda result: f"{result.student.first_name} {result.student.last_name}",
+        [Result.student_id],
+        [result_student]
+    ),
+    'admission_number': Field(lambda result: result.student.admission_number, [Result.student_id], [result_student]),
+    'subject_id': column_field(Result.subject_id),
+    'subject_name': Field(
+        lambda result: result.subject.name,
+        [Result.subject_id],
+        [joinedload(Result.subject).load_only(Subject.name)]
+    ),
+    'term_id': column_field(Result.term_id),
+    'term': Field(lambda result: result.term.name, [Result.term_id], [joinedload(Result.term).load_only(Term.name)]),
+    'marks': column_field(Result.marks),
+    'grade': column_field(Result.grade),
+    'remarks': column_field(Result.remarks)
+}
+
 @results_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_results():
@@ -15,7 +53,6 @@ def get_results():
     
     student_id = request.args.get('student_id')
     subject_id = request.args.get('subject_id')
-    term = request.args.get('term')
     class_id = request.args.get('class_id')
     
     query = Result.query
@@ -24,27 +61,22 @@ def get_results():
         query = query.filter_by(student_id=student_id)
     if subject_id:
         query = query.filter_by(subject_id=subject_id)
-    if term:
-        query = query.filter_by(term=term)
+    if request.args.get('term_id') or request.args.get('term'):
+        term = requested_term(request.args)
+        if not term:
+            return jsonify({'message': 'Term not found'}), 404
+        query = query.filter(Result.term_id == term.id)
     if class_id:
         query = query.join(Student).filter(Student.class_id == class_id)
     
-    results = query.order_by(Result.term).all()
-    
-    results_data = [{
-        'id': result.id,
-        'student_id': result.student_id,
-        'student_name': f"{result.student.first_name} {result.student.last_name}",
-        'admission_number': result.student.admission_number,
-        'subject_id': result.subject_id,
-        'subject_name': result.subject.name,
-        'term': result.term,
-        'marks': result.marks,
-        'grade': result.grade,
-        'remarks': result.remarks
-    } for result in results]
-    
-    return jsonify(results_data), 200
+    try:
+        page = paginate(query.join(Term, Result.term_id == Term.id), [
+            (Term.start_date, False), (Term.id, False), (Result.id, False)
+        ], RESULT_FIELDS)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return jsonify(page), 200
 
 @results_bp.route('/', methods=['POST'])
 @jwt_required()
@@ -55,37 +87,31 @@ def create_result():
     
     data = request.get_json()
     
-    required_fields = ['student_id', 'subject_id', 'term', 'marks']
-    if not all(field in data for field in required_fields):
+    required_fields = ['student_id', 'subject_id', 'marks']
+    if not all(field in data for field in required_fields) or not ('term_id' in data or 'term' in data):
         return jsonify({'message': 'Missing required fields'}), 400
     
+    term = requested_term(data)
+    if not term:
+        return jsonify({'message': 'Term not found'}), 404
+    
     # Check if result already exists for this student, subject, and term
     existing = Result.query.filter_by(
         student_id=data['student_id'],
         subject_id=data['subject_id'],
-        term=data['term']
+        term_id=term.id
     ).first()
     
     if existing:
         return jsonify({'message': 'Result already exists for this student, subject, and term'}), 400
     
-    # Calculate grade based on marks (simple example)
     marks = float(data['marks'])
-    if marks >= 80:
-        grade = 'A'
-    elif marks >= 70:
-        grade = 'B'
-    elif marks >= 60:
-        grade = 'C'
-    elif marks >= 50:
-        grade = 'D'
-    else:
-        grade = 'F'
+    grade = calculate_grade(marks)
     
     result = Result(
         student_id=data['student_id'],
         subject_id=data['subject_id'],
-        term=data['term'],
+        term_id=term.id,
         marks=marks,
         grade=grade,
         remarks=data.get('remarks')
@@ -93,9 +119,46 @@ def create_result():
     
     db.session.add(result)
     db.session.commit()
+    invalidate_for_students([result.student_id], [result.term_id])
+    invalidate_student_profiles([result.student_id])
     
     return jsonify({'message': 'Result created successfully', 'id': result.id}), 201
 
+@results_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def save_mark_sheet():
+    current_user = get_jwt_identity()
+    if current_user['role'] not in ['admin', 'teacher']:
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    data = request.get_json()
+    
+    required_fields = ['subject_id', 'results']
+    if not isinstance(data, dict) or not all(field in data for field in required_fields) \
+            or not ('term_id' in data or 'term' in data):
+        return jsonify({'message': 'Missing required fields'}), 400
+    
+    if not isinstance(data['results'], list):
+        return jsonify({'message': 'Expected an array of results'}), 400
+    
+    if not Subject.query.get(data['subject_id']):
+        return jsonify({'message': 'Subject not found'}), 404
+    
+    term = requested_term(data)
+    if not term:
+        return jsonify({'message': 'Term not found'}), 404
+    
+    entries, errors = validate_mark_sheet(data['results'])
+    if errors:
+        return jsonify({'message': 'Mark sheet has invalid rows', 'errors': errors}), 400
+    
+    summary = upsert_mark_sheet(term.id, data['subject_id'], entries)
+    db.session.commit()
+    invalidate_for_students([student_id for student_id, _, _ in entries], [term.id])
+    invalidate_student_profiles(student_id for student_id, _, _ in entries)
+    
+    return jsonify({'message': 'Mark sheet saved successfully', 'summary': summary}), 200
+
 @results_bp.route('/<int:result_id>', methods=['PUT'])
 @jwt_required()
 def update_result(result_id):
@@ -105,30 +168,107 @@ def update_result(result_id):
     
     result = Result.query.get_or_404(result_id)
     data = request.get_json()
+    previous_term_id = result.term_id
     
     if 'marks' in data:
         marks = float(data['marks'])
         result.marks = marks
-        
-        # Recalculate grade
-        if marks >= 80:
-            result.grade = 'A'
-        elif marks >= 70:
-            result.grade = 'B'
-        elif marks >= 60:
-            result.grade = 'C'
-        elif marks >= 50:
-            result.grade = 'D'
-        else:
-            result.grade = 'F'
-    
-    result.term = data.get('term', result.term)
+        result.grade = calculate_grade(marks)
+    
+    if 'term_id' in data or 'term' in data:
+        term = requested_term(data)
+        if not term:
+            return jsonify({'message': 'Term not found'}), 404
+        result.term_id = term.id
     result.remarks = data.get('remarks', result.remarks)
     
     db.session.commit()
+    invalidate_for_students([result.student_id], {previous_term_id, result.term_id})
+    invalidate_student_profiles([result.student_id])
     
     return jsonify({'message': 'Result updated successfully'}), 200
 
+@results_bp.route('/rankings', methods=['GET'])
+@jwt_required()
+def get_class_rankings():
+    current_user = get_jwt_identity()
+    if current_user['role'] not in ['admin', 'teacher']:
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    class_id = request.args.get('class_id', type=int)
+    if not (class_id and (request.args.get('term_id') or request.args.get('term'))):
+        return jsonify({'message': 'class_id and term are required'}), 400
+    
+    term = requested_term(request.args)
+    if not term:
+        return jsonify({'message': 'Term not found'}), 404
+    
+    stats = class_term_statistics(class_id, term.id)
+    
+    return jsonify({'class_id': class_id, 'term_id': term.id, 'term': term.name, 'rankings': stats['rankings']}), 200
+
+@results_bp.route('/statistics', methods=['GET'])
+@jwt_required()
+def get_subject_statistics():
+    current_user = get_jwt_identity()
+    if current_user['role'] not in ['admin', 'teacher']:
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    class_id = request.args.get('class_id', type=int)
+    if not (class_id and (request.args.get('term_id') or request.args.get('term'))):
+        return jsonify({'message': 'class_id and term are required'}), 400
+    
+    term = requested_term(request.args)
+    if not term:
+        return jsonify({'message': 'Term not found'}), 404
+    
+    stats = class_term_statistics(class_id, term.id)
+    
+    return jsonify({'class_id': class_id, 'term_id': term.id, 'term': term.name, 'subjects': stats['subjects']}), 200
+
+@results_bp.route('/report-cards', methods=['GET'])
+@jwt_required()
+def generate_class_report_cards():
+    current_user = get_jwt_identity()
+    if current_user['role'] not in ['admin', 'teacher']:
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    class_id = request.args.get('class_id', type=int)
+    output_format = request.args.get('format', 'zip')
+    if not (class_id and (request.args.get('term_id') or request.args.get('term'))):
+        return jsonify({'message': 'class_id and term are required'}), 400
+    if output_format not in ['zip', 'pdf']:
+        return jsonify({'message': 'format must be zip or pdf'}), 400
+    
+    term = requested_term(request.args)
+    if not term:
+        return jsonify({'message': 'Term not found'}), 404
+    
+    # Optional from/to dates for the attendance block
+    attendance_range = None
+    if request.args.get('from') or request.args.get('to'):
+        try:
+            attendance_range = parse_report_range(request.args)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+    
+    cards = load_class_report_cards(class_id, term, attendance_range)
+    if not cards:
+        return jsonify({'message': 'No active students in this class'}), 404
+    
+    filename = f"report_cards_{class_id}_{term.name.replace(' ', '_')}"
+    
+    if output_format == 'pdf':
+        rendered = dict(render_report_cards(cards))
+        pdf_data = merge_pdfs(rendered[card['filename']] for card in cards)
+        return Response(pdf_data, mimetype='application/pdf', headers={
+            'Content-Disposition': f'attachment; filename={filename}.pdf'
+        })
+    
+    return Response(stream_with_context(stream_zip(render_report_cards(cards))), mimetype='application/zip', headers={
+        'Content-Disposition': f'attachment; filename={filename}.zip'
+    })
+
 @results_bp.route('/report-card/<int:student_id>', methods=['GET'])
 @jwt_required()
 def generate_report_card(student_id):
@@ -136,27 +276,31 @@ def generate_report_card(student_id):
     if current_user['role'] not in ['admin', 'teacher']:
         return jsonify({'message': 'Unauthorized access'}), 403
     
-    term = request.args.get('term')
-    if not term:
+    if not (request.args.get('term_id') or request.args.get('term')):
         return jsonify({'message': 'Term is required'}), 400
     
-    # Get student info
-    student = Student.query.get_or_404(student_id)
+    term = requested_term(request.args)
+    if not term:
+        return jsonify({'message': 'Term not found'}), 404
     
-    # Get all results for the student in the specified term
-    results = Result.query.filter_by(
-        student_id=student_id,
-        term=term
-    ).all()
+    # Optional from/to dates override the term's own date range
+    attendance_range = None
+    if request.args.get('from') or request.args.get('to'):
+        try:
+            attendance_range = parse_report_range(request.args)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
     
-    # Get attendance summary for the term
-    # (Assuming term corresponds to a date range - you'll need to implement this logic)
-    # attendance = calculate_attendance_summary(student_id, term)
+    student, attendance = load_report_card(student_id, term, attendance_range)
+    if student is None:
+        return jsonify({'message': 'Student not found'}), 404
     
-    # Generate PDF (placeholder - implement this in utils/pdf_generator.py)
-    # pdf_data = generate_pdf_report_card(student, results, attendance)
+    if request.args.get('format') == 'pdf':
+        pdf_data = generate_pdf_report_card(student, student.results, attendance or EMPTY_ATTENDANCE)
+        return Response(pdf_data, mimetype='application/pdf', headers={
+            'Content-Disposition': f'attachment; filename={report_card_filename(student.admission_number, term.name)}'
+        })
     
-    # For now, return JSON data
     report_card = {
         'student': {
             'id': student.id,
@@ -164,15 +308,16 @@ def generate_report_card(student_id):
             'name': f"{student.first_name} {student.last_name}",
             'class': student.class_.name if student.class_ else None,
         },
-        'term': term,
+        'term_id': term.id,
+        'term': term.name,
         'results': [{
             'subject': result.subject.name,
             'marks': result.marks,
             'grade': result.grade,
             'remarks': result.remarks
-        } for result in results],
-        # 'attendance': attendance,
+        } for result in student.results],
+        'attendance': attendance,
         'generated_on': datetime.utcnow().isoformat()
     }
     
-    return jsonify(report_card), 200
\ No newline at end of file
+    return jsonify(report_card), 200
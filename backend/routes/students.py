@@ -1,11 +1,41 @@
+import io
 from flask import request, jsonify, Blueprint
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
 from app import db
 from app.models import Student, Class
 from datetime import datetime
+from utils.result_stats import invalidate_result_stats
+from utils.student_search import search_students, DEFAULT_LIMIT
+from utils.student_import import import_students
+from utils.student_profile import student_profile, invalidate_student_profiles
+from utils.promotion import promote_students
+from utils.fees import sync_fee_balances
+from utils.pagination import Field, column_field, isoformat, paginate
+from utils.helpers import stream_csv
 
 students_bp = Blueprint('students_bp', __name__)
 
+STUDENT_FIELDS = {
+    'id': column_field(Student.id),
+    'admission_number': column_field(Student.admission_number),
+    'first_name': column_field(Student.first_name),
+    'last_name': column_field(Student.last_name),
+    'date_of_birth': column_field(Student.date_of_birth, isoformat),
+    'gender': column_field(Student.gender),
+    'class_id': column_field(Student.class_id),
+    'class_name': Field(
+        lambda student: student.class_.name if student.class_ else None,
+        [Student.class_id],
+        [joinedload(Student.class_).load_only(Class.name)]
+    ),
+    'admission_date': column_field(Student.admission_date, isoformat),
+    'address': column_field(Student.address, default=False),
+    'phone': column_field(Student.phone, default=False),
+    'email': column_field(Student.email, default=False),
+    'is_active': column_field(Student.is_active, default=False)
+}
+
 @students_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_students():
@@ -21,21 +51,33 @@ def get_students():
     if class_id:
         query = query.filter_by(class_id=class_id)
     
-    students = query.all()
+    try:
+        page = paginate(query, [(Student.id, False)], STUDENT_FIELDS)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
-    students_data = [{
-        'id': student.id,
-        'admission_number': student.admission_number,
-        'first_name': student.first_name,
-        'last_name': student.last_name,
-        'date_of_birth': student.date_of_birth.isoformat() if student.date_of_birth else None,
-        'gender': student.gender,
-        'class_id': student.class_id,
-        'class_name': student.class_.name if student.class_ else None,
-        'admission_date': student.admission_date.isoformat() if student.admission_date else None
-    } for student in students]
+    return jsonify(page), 200
+
+@students_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_student_index():
+    current_user = get_jwt_identity()
+    if current_user['role'] not in ['admin', 'teacher']:
+        return jsonify({'message': 'Unauthorized access'}), 403
     
-    return jsonify(students_data), 200
+    query = request.args.get('q', '')
+    include_inactive = request.args.get('include_inactive', 'false').lower() == 'true'
+    
+    if not query.strip():
+        return jsonify({'message': 'Search query is required'}), 400
+    try:
+        limit = int(request.args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'message': 'Limit must be a positive number'}), 400
+    if limit < 1:
+        return jsonify({'message': 'Limit must be a positive number'}), 400
+    
+    return jsonify(search_students(query, limit, include_inactive)), 200
 
 @students_bp.route('/<int:student_id>', methods=['GET'])
 @jwt_required()
@@ -44,7 +86,9 @@ def get_student(student_id):
     if current_user['role'] not in ['admin', 'teacher']:
         return jsonify({'message': 'Unauthorized access'}), 403
     
-    student = Student.query.get_or_404(student_id)
+    student = Student.query.options(joinedload(Student.class_).load_only(Class.name)).filter_by(
+        id=student_id
+    ).first_or_404()
     
     student_data = {
         'id': student.id,
@@ -64,6 +108,19 @@ def get_student(student_id):
     
     return jsonify(student_data), 200
 
+@students_bp.route('/<int:student_id>/profile', methods=['GET'])
+@jwt_required()
+def get_student_profile(student_id):
+    current_user = get_jwt_identity()
+    if current_user['role'] not in ['admin', 'teacher']:
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    profile = student_profile(student_id)
+    if profile is None:
+        return jsonify({'message': 'Student not found'}), 404
+    
+    return jsonify(profile), 200
+
 @students_bp.route('/', methods=['POST'])
 @jwt_required()
 def create_student():
@@ -99,10 +156,63 @@ def create_student():
     )
     
     db.session.add(student)
+    db.session.flush()
+    sync_fee_balances([student.id])
     db.session.commit()
+    invalidate_student_profiles([student.id])
     
     return jsonify({'message': 'Student created successfully', 'id': student.id}), 201
 
+@students_bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_student_roster():
+    current_user = get_jwt_identity()
+    if current_user['role'] != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    # Accept a multipart upload named 'file' or a raw text/csv body
+    upload = request.files.get('file')
+    lines = io.TextIOWrapper(upload.stream if upload else request.stream, encoding='utf-8-sig', newline='')
+    
+    try:
+        return stream_csv(import_students(lines), ['line', 'admission_number', 'outcome', 'reason'])
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+@students_bp.route('/promote', methods=['POST'])
+@jwt_required()
+def promote_class_students():
+    current_user = get_jwt_identity()
+    if current_user['role'] != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    data = request.get_json()
+    
+    # {"mapping": {"<class_id>": <next class_id or null to graduate>}, "repeaters": [...], "graduates": [...]}
+    try:
+        mapping = {
+            int(class_id): None if target is None else int(target)
+            for class_id, target in data['mapping'].items()
+        }
+        repeaters = [int(student_id) for student_id in data.get('repeaters', [])]
+        graduates = [int(student_id) for student_id in data.get('graduates', [])]
+    except (KeyError, AttributeError, TypeError, ValueError):
+        return jsonify({'message': 'Expected a mapping of class ids and lists of student ids'}), 400
+    
+    try:
+        summary = promote_students(mapping, repeaters, graduates, dry_run=bool(data.get('dry_run')))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    if summary['dry_run']:
+        return jsonify(summary), 200
+    
+    db.session.commit()
+    invalidate_result_stats(set(mapping) | set(mapping.values()) - {None})
+    invalidate_student_profiles()
+    
+    return jsonify(summary), 200
+
 @students_bp.route('/<int:student_id>', methods=['PUT'])
 @jwt_required()
 def update_student(student_id):
@@ -130,10 +240,18 @@ def update_student(student_id):
     student.address = data.get('address', student.address)
     student.phone = data.get('phone', student.phone)
     student.email = data.get('email', student.email)
+    previous_class_id, was_active = student.class_id, student.is_active
     student.class_id = data.get('class_id', student.class_id)
     student.is_active = data.get('is_active', student.is_active)
     
+    if student.class_id != previous_class_id or student.is_active != was_active:
+        db.session.flush()
+        sync_fee_balances([student.id])
     db.session.commit()
+    invalidate_student_profiles([student.id])
+    
+    if student.class_id != previous_class_id:
+        invalidate_result_stats({previous_class_id, student.class_id})
     
     return jsonify({'message': 'Student updated successfully'}), 200
 
@@ -148,6 +266,9 @@ def delete_student(student_id):
     
     # Soft delete by setting is_active to False
     student.is_active = False
+    db.session.flush()
+    sync_fee_balances([student.id])
     db.session.commit()
+    invalidate_student_profiles([student.id])
     
     return jsonify({'message': 'Student deactivated successfully'}), 200
\ No newline at end of file
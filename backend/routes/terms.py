@@ -0,0 +1,110 @@
+from flask import request, jsonify, Blueprint
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app import db
+from app.models import Term
+from utils.terms import current_term
+from utils.helpers import validate_date
+
+terms_bp = Blueprint('terms_bp', __name__)
+
+def term_data(term):
+    return {
+        'id': term.id,
+        'name': term.name,
+        'start_date': term.start_date.isoformat() if term.start_date else None,
+        'end_date': term.end_date.isoformat() if term.end_date else None
+    }
+
+def parse_term_dates(data, term=None):
+    # Returns (start_date, end_date, error message)
+    dates = []
+    for field in ('start_date', 'end_date'):
+        if field not in data:
+            dates.append(getattr(term, field, None))
+            continue
+        value = validate_date(data[field] or '')
+        if value is None:
+            return None, None, 'Invalid date format. Use YYYY-MM-DD'
+        dates.append(value)
+
+    start_date, end_date = dates
+    if start_date and end_date and end_date < start_date:
+        return None, None, 'end_date must not be before start_date'
+    return start_date, end_date, None
+
+@terms_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_terms():
+    current_user = get_jwt_identity()
+    if current_user['role'] not in ['admin', 'teacher']:
+        return jsonify({'message': 'Unauthorized access'}), 403
+
+    terms = Term.query.order_by(Term.start_date.is_(None), Term.start_date, Term.id).all()
+
+    return jsonify([term_data(term) for term in terms]), 200
+
+@terms_bp.route('/current', methods=['GET'])
+@jwt_required()
+def get_current_term():
+    current_user = get_jwt_identity()
+    if current_user['role'] not in ['admin', 'teacher']:
+        return jsonify({'message': 'Unauthorized access'}), 403
+
+    term = current_term()
+    if not term:
+        return jsonify({'message': 'No term has started yet'}), 404
+
+    return jsonify(term_data(term)), 200
+
+@terms_bp.route('/', methods=['POST'])
+@jwt_required()
+def create_term():
+    current_user = get_jwt_identity()
+    if current_user['role'] != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+
+    data = request.get_json()
+
+    required_fields = ['name', 'start_date', 'end_date']
+    if not all(data.get(field) for field in required_fields):
+        return jsonify({'message': 'Missing required fields'}), 400
+
+    if Term.query.filter_by(name=data['name'].strip()).first():
+        return jsonify({'message': 'Term already exists'}), 400
+
+    start_date, end_date, error = parse_term_dates(data)
+    if error:
+        return jsonify({'message': error}), 400
+
+    term = Term(name=data['name'].strip(), start_date=start_date, end_date=end_date)
+    db.session.add(term)
+    db.session.commit()
+
+    return jsonify({'message': 'Term created successfully', 'id': term.id}), 201
+
+@terms_bp.route('/<int:term_id>', methods=['PUT'])
+@jwt_required()
+def update_term(term_id):
+    current_user = get_jwt_identity()
+    if current_user['role'] != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+
+    term = Term.query.get_or_404(term_id)
+    data = request.get_json()
+
+    if 'name' in data:
+        name = (data['name'] or '').strip()
+        if not name:
+            return jsonify({'message': 'Name must not be empty'}), 400
+        if Term.query.filter(Term.name == name, Term.id != term.id).first():
+            return jsonify({'message': 'Term already exists'}), 400
+        term.name = name
+
+    start_date, end_date, error = parse_term_dates(data, term)
+    if error:
+        return jsonify({'message': error}), 400
+    term.start_date, term.end_date = start_date, end_date
+
+    db.session.commit()
+
+    return jsonify({'message': 'Term updated successfully'}), 200
@@ -1,10 +1,97 @@
-from flask import request, jsonify, Blueprint
+from flask import request, jsonify, Blueprint, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import case
+from sqlalchemy.orm import joinedload
 from app import db
 from app.models import Timetable, Class, Subject, User
+from utils.pagination import Field, column_field, paginate
+from utils.helpers import validate_time
+from utils.timetable import (
+    DAYS, Slot, minutes, format_minutes, parse_slot, slot_values, timetable_index, timetable_version, timetable_etag,
+    describe_conflicts, timetable_conflicts, replace_timetable
+)
+from utils.timetable_feeds import timetable_feed
+from utils.timetable_generator import parse_generator_request, teacher_bookings, blocked_slots, generate_timetable
 
 timetable_bp = Blueprint('timetable_bp', __name__)
 
+def known_ids(model, ids):
+    return {row.id for row in db.session.query(model.id).filter(model.id.in_(ids))} if ids else set()
+
+def save_class_timetables(class_ids, slots):
+    # The write path for bulk uploads and generated timetables alike
+    errors = []
+    classes = known_ids(Class, class_ids)
+    subjects = known_ids(Subject, {slot.subject_id for slot in slots})
+    teachers = known_ids(User, {slot.teacher_id for slot in slots} - {None})
+    for index, slot in enumerate(slots):
+        if slot.subject_id not in subjects:
+            errors.append({'entry': index, 'message': 'Subject not found'})
+        if slot.teacher_id is not None and slot.teacher_id not in teachers:
+            errors.append({'entry': index, 'message': 'Teacher not found'})
+    if errors or not classes >= class_ids:
+        return jsonify({
+            'message': 'Invalid timetable entries',
+            'errors': errors,
+            'unknown_classes': sorted(class_ids - classes)
+        }), 400
+    
+    # Checked after taking the write lock, so no concurrent write can clash with these entries
+    version = timetable_index.begin_write()
+    conflicts = timetable_conflicts(slots, class_ids)
+    if conflicts:
+        return jsonify({'message': 'Timetable has overlapping entries', 'conflicts': conflicts}), 400
+    
+    replaced_ids = replace_timetable(class_ids, slots)
+    db.session.commit()
+    timetable_index.reload_classes(version, class_ids, replaced_ids)
+    
+    return jsonify({
+        'message': 'Timetable saved successfully',
+        'classes': sorted(class_ids),
+        'entries': len(slots),
+        'replaced': len(replaced_ids)
+    }), 200
+
+def format_time(value):
+    return value.strftime('%H:%M')
+
+TIMETABLE_FIELDS = {
+    'id': column_field(Timetable.id),
+    'class_id': column_field(Timetable.class_id),
+    'class_name': Field(
+        lambda item: item.class_.name if item.class_ else None,
+        [Timetable.class_id],
+        [joinedload(Timetable.class_).load_only(Class.name)]
+    ),
+    'subject_id': column_field(Timetable.subject_id),
+    'subject_name': Field(
+        lambda item: item.subject.name if item.subject else None,
+        [Timetable.subject_id],
+        [joinedload(Timetable.subject).load_only(Subject.name)]
+    ),
+    'day_of_week': column_field(Timetable.day_of_week),
+    'start_time': column_field(Timetable.start_time, format_time),
+    'end_time': column_field(Timetable.end_time, format_time),
+    'teacher_id': column_field(Timetable.teacher_id),
+    'teacher_name': Field(
+        lambda item: item.teacher.username if item.teacher else None,
+        [Timetable.teacher_id],
+        [joinedload(Timetable.teacher).load_only(User.username)]
+    ),
+    'room': column_field(Timetable.room)
+}
+
+# Monday first, rather than the alphabetical order of the stored names
+DAY_ORDER = case({day: index for index, day in enumerate(DAYS)}, value=Timetable.day_of_week, else_=len(DAYS))
+
+def conditional(body, etag, mimetype):
+    response = current_app.response_class(body, mimetype=mimetype)
+    response.set_etag(etag)
+    # Clients may keep the response but must revalidate it, which is cheap
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
 @timetable_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_timetable():
@@ -12,6 +99,11 @@ def get_timetable():
     if current_user['role'] not in ['admin', 'teacher']:
         return jsonify({'message': 'Unauthorized access'}), 403
     
+    # Answered from the version row alone while the timetable is unchanged
+    etag = timetable_etag(timetable_version(), request.query_string.decode())
+    if request.if_none_match.contains(etag):
+        return conditional('', etag, 'application/json')
+    
     class_id = request.args.get('class_id')
     teacher_id = request.args.get('teacher_id')
     
@@ -22,22 +114,118 @@ def get_timetable():
     if teacher_id:
         query = query.filter_by(teacher_id=teacher_id)
     
-    timetable = query.order_by(Timetable.day_of_week, Timetable.start_time).all()
+    try:
+        page = paginate(query, [
+            (DAY_ORDER, False), (Timetable.start_time, False), (Timetable.id, False)
+        ], TIMETABLE_FIELDS)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return conditional(current_app.json.dumps(page), etag, 'application/json')
+
+@timetable_bp.route('/<any(class, teacher):kind>/<int:key>/grid', methods=['GET'])
+@jwt_required()
+def get_weekly_grid(kind, key):
+    current_user = get_jwt_identity()
+    if current_user['role'] not in ['admin', 'teacher']:
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    feed = timetable_feed(kind, key, 'json')
+    if feed.body is None:
+        return jsonify({'message': f'{kind.capitalize()} not found'}), 404
+    
+    return conditional(feed.body, feed.etag, 'application/json')
+
+@timetable_bp.route('/<any(class, teacher):kind>/<int:key>/timetable.ics', methods=['GET'])
+@jwt_required()
+def get_calendar_feed(kind, key):
+    current_user = get_jwt_identity()
+    if current_user['role'] not in ['admin', 'teacher']:
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    feed = timetable_feed(kind, key, 'ics')
+    if feed.body is None:
+        return jsonify({'message': f'{kind.capitalize()} not found'}), 404
+    
+    return conditional(feed.body, feed.etag, 'text/calendar')
+
+def requested_window(args):
+    # ``day_of_week``, ``start_time`` and ``end_time`` query parameters as (day, start, end) minutes
+    day_of_week = args.get('day_of_week')
+    start_time = validate_time(args.get('start_time', ''))
+    end_time = validate_time(args.get('end_time', ''))
+    if day_of_week not in DAYS:
+        raise ValueError(f"day_of_week must be one of {', '.join(DAYS)}")
+    if start_time is None or end_time is None:
+        raise ValueError('Invalid time format. Use HH:MM')
+    if start_time >= end_time:
+        raise ValueError('End time must be after start time')
+    return day_of_week, minutes(start_time), minutes(end_time)
+
+def active_teachers():
+    return db.session.query(User.id, User.username).filter(User.role == 'teacher', User.is_active == True).order_by(User.id).all()
+
+@timetable_bp.route('/free', methods=['GET'])
+@jwt_required()
+def get_free_teachers_or_classes():
+    current_user = get_jwt_identity()
+    if current_user['role'] not in ['admin', 'teacher']:
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    kind = request.args.get('kind', 'teacher')
+    if kind not in ['teacher', 'class']:
+        return jsonify({'message': 'kind must be teacher or class'}), 400
+    try:
+        day_of_week, start, end = requested_window(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    if kind == 'teacher':
+        names = {row.id: row.username for row in active_teachers()}
+    else:
+        names = {row.id: row.name for row in db.session.query(Class.id, Class.name).order_by(Class.id)}
+    
+    # One AND of each weekly occupancy bitset with the requested window, once the
+    # index has caught up with writes from every worker
+    timetable_index.sync()
+    free = timetable_index.free(kind, names, day_of_week, start, end)
     
-    timetable_data = [{
-        'id': item.id,
-        'class_id': item.class_id,
-        'class_name': item.class_.name if item.class_ else None,
-        'subject_id': item.subject_id,
-        'subject_name': item.subject.name if item.subject else None,
-        'day_of_week': item.day_of_week,
-        'start_time': item.start_time.strftime('%H:%M') if item.start_time else None,
-        'end_time': item.end_time.strftime('%H:%M') if item.end_time else None,
-        'teacher_id': item.teacher_id,
-        'teacher_name': f"{item.teacher.first_name} {item.teacher.last_name}" if item.teacher else None
-    } for item in timetable]
+    return jsonify({
+        'kind': kind,
+        'day_of_week': day_of_week,
+        'start_time': format_minutes(start),
+        'end_time': format_minutes(end),
+        'free': [{'id': key, 'name': names[key]} for key in free]
+    }), 200
+
+@timetable_bp.route('/substitutes', methods=['GET'])
+@jwt_required()
+def get_substitute_teachers():
+    current_user = get_jwt_identity()
+    if current_user['role'] not in ['admin', 'teacher']:
+        return jsonify({'message': 'Unauthorized access'}), 403
     
-    return jsonify(timetable_data), 200
+    teacher_id = request.args.get('teacher_id', type=int)
+    day_of_week = request.args.get('day_of_week')
+    if teacher_id is None or day_of_week not in DAYS:
+        return jsonify({'message': f"teacher_id and a day_of_week of {', '.join(DAYS)} are required"}), 400
+    
+    teachers = {row.id: row.username for row in active_teachers() if row.id != teacher_id}
+    timetable_index.sync()
+    lessons = timetable_index.day_slots('teacher', teacher_id, day_of_week)
+    
+    return jsonify([{
+        'entry_id': slot.id,
+        'class_id': slot.class_id,
+        'subject_id': slot.subject_id,
+        'room': slot.room,
+        'start_time': format_minutes(slot.start),
+        'end_time': format_minutes(slot.end),
+        'free_teachers': [
+            {'id': key, 'name': teachers[key]}
+            for key in timetable_index.free('teacher', teachers, day_of_week, slot.start, slot.end)
+        ]
+    } for slot in lessons]), 200
 
 @timetable_bp.route('/', methods=['POST'])
 @jwt_required()
@@ -46,51 +234,93 @@ def create_timetable_entry():
     if current_user['role'] != 'admin':
         return jsonify({'message': 'Unauthorized access'}), 403
     
-    data = request.get_json()
-    
-    required_fields = ['class_id', 'subject_id', 'day_of_week', 'start_time', 'end_time']
-    if not all(field in data for field in required_fields):
-        return jsonify({'message': 'Missing required fields'}), 400
-    
     try:
-        # Validate time format
-        start_time = datetime.strptime(data['start_time'], '%H:%M').time()
-        end_time = datetime.strptime(data['end_time'], '%H:%M').time()
-    except ValueError:
-        return jsonify({'message': 'Invalid time format. Use HH:MM'}), 400
-    
-    # Check for overlapping timetable entries
-    overlapping = Timetable.query.filter(
-        Timetable.class_id == data['class_id'],
-        Timetable.day_of_week == data['day_of_week'],
-        Timetable.start_time < end_time,
-        Timetable.end_time > start_time
-    ).first()
-    
-    if overlapping:
+        slot = parse_slot(request.get_json())
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    # Overlaps for the class, the teacher and the room, from the index as of every
+    # committed write; the lock keeps it that way until this write commits
+    version = timetable_index.begin_write()
+    clashes = timetable_index.conflicts(slot)
+    if clashes:
         return jsonify({
-            'message': 'Timetable entry overlaps with existing entry',
-            'conflict_with': {
-                'subject': overlapping.subject.name,
-                'teacher': f"{overlapping.teacher.first_name} {overlapping.teacher.last_name}" if overlapping.teacher else None,
-                'time': f"{overlapping.start_time.strftime('%H:%M')}-{overlapping.end_time.strftime('%H:%M')}"
-            }
+            'message': 'Timetable entry overlaps with existing entries',
+            'conflicts': describe_conflicts(clashes)
         }), 400
     
-    timetable = Timetable(
-        class_id=data['class_id'],
-        subject_id=data['subject_id'],
-        day_of_week=data['day_of_week'],
-        start_time=start_time,
-        end_time=end_time,
-        teacher_id=data.get('teacher_id')
-    )
+    timetable = Timetable(**slot_values(slot))
     
     db.session.add(timetable)
     db.session.commit()
+    timetable_index.add(version, timetable)
     
     return jsonify({'message': 'Timetable entry created successfully', 'id': timetable.id}), 201
 
+@timetable_bp.route('/bulk', methods=['PUT'])
+@jwt_required()
+def replace_class_timetables():
+    current_user = get_jwt_identity()
+    if current_user['role'] != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    data = request.get_json()
+    
+    # {"entries": [...], "class_ids": [...]}: every listed class, and every class with an
+    # entry, ends up with exactly these entries; a class listed without entries is cleared
+    if not isinstance(data, dict) or not isinstance(data.get('entries'), list):
+        return jsonify({'message': 'Expected an object with an array of entries'}), 400
+    try:
+        class_ids = {int(class_id) for class_id in data.get('class_ids', [])}
+    except (TypeError, ValueError):
+        return jsonify({'message': 'class_ids must be numbers'}), 400
+    
+    slots = []
+    errors = []
+    for index, entry in enumerate(data['entries']):
+        try:
+            slots.append(parse_slot(entry))
+        except ValueError as e:
+            errors.append({'entry': index, 'message': str(e)})
+    if errors:
+        return jsonify({'message': 'Invalid timetable entries', 'errors': errors}), 400
+    
+    class_ids.update(slot.class_id for slot in slots)
+    return save_class_timetables(class_ids, slots)
+
+@timetable_bp.route('/generate', methods=['POST'])
+@jwt_required()
+def generate_class_timetables():
+    current_user = get_jwt_identity()
+    if current_user['role'] != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+    
+    try:
+        options = parse_generator_request(request.get_json())
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    lessons, days, periods = options['lessons'], options['days'], options['periods']
+    class_ids = {lesson.class_id for lesson in lessons}
+    teacher_ids = {lesson.teacher_id for lesson in lessons} - {None}
+    
+    # Teachers stay booked in the classes not being generated
+    windows = teacher_bookings(teacher_ids, class_ids)
+    for teacher_id, teacher_windows in options['unavailable'].items():
+        windows.setdefault(teacher_id, []).extend(teacher_windows)
+    blocked = {teacher_id: blocked_slots(teacher_windows, days, periods) for teacher_id, teacher_windows in windows.items()}
+    
+    try:
+        slots = generate_timetable(lessons, days, periods, blocked, options['seed'], options['time_limit'])
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    if options['dry_run']:
+        return jsonify({'entries': [dict(slot_values(slot), start_time=format_minutes(slot.start),
+                                         end_time=format_minutes(slot.end)) for slot in slots]}), 200
+    
+    return save_class_timetables(class_ids, slots)
+
 @timetable_bp.route('/<int:entry_id>', methods=['PUT'])
 @jwt_required()
 def update_timetable_entry(entry_id):
@@ -99,22 +329,25 @@ def update_timetable_entry(entry_id):
         return jsonify({'message': 'Unauthorized access'}), 403
     
     timetable = Timetable.query.get_or_404(entry_id)
-    data = request.get_json()
     
     try:
-        if 'start_time' in data:
-            timetable.start_time = datetime.strptime(data['start_time'], '%H:%M').time()
-        if 'end_time' in data:
-            timetable.end_time = datetime.strptime(data['end_time'], '%H:%M').time()
-    except ValueError:
-        return jsonify({'message': 'Invalid time format. Use HH:MM'}), 400
-    
-    timetable.class_id = data.get('class_id', timetable.class_id)
-    timetable.subject_id = data.get('subject_id', timetable.subject_id)
-    timetable.day_of_week = data.get('day_of_week', timetable.day_of_week)
-    timetable.teacher_id = data.get('teacher_id', timetable.teacher_id)
+        slot = parse_slot(request.get_json() or {}, Slot.from_entry(timetable))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    version = timetable_index.begin_write()
+    clashes = timetable_index.conflicts(slot)
+    if clashes:
+        return jsonify({
+            'message': 'Timetable entry overlaps with existing entries',
+            'conflicts': describe_conflicts(clashes)
+        }), 400
+    
+    for column, value in slot_values(slot).items():
+        setattr(timetable, column, value)
     
     db.session.commit()
+    timetable_index.add(version, timetable)
     
     return jsonify({'message': 'Timetable entry updated successfully'}), 200
 
@@ -127,7 +360,9 @@ def delete_timetable_entry(entry_id):
     
     timetable = Timetable.query.get_or_404(entry_id)
     
+    version = timetable_index.begin_write()
     db.session.delete(timetable)
     db.session.commit()
+    timetable_index.remove(version, entry_id)
     
-    return jsonify({'message': 'Timetable entry deleted successfully'}), 200
\ No newline at end of file
+    return jsonify({'message': 'Timetable entry deleted successfully'}), 200
@@ -2,7 +2,10 @@ import random
 from datetime import datetime, date, time, timedelta
 from faker import Faker
 from app import create_app, db
-from app.models import User, Student, Class, Subject, Fee, Attendance, Timetable, Result
+from app.models import User, Student, Class, Subject, Fee, FeeStructure, Term, Attendance, Timetable, Result
+from utils.attendance import rebuild_attendance_rollup
+from utils.fees import rebuild_fee_balances
+from utils.grading import calculate_grade
 
 def create_seed_data():
     app = create_app()
@@ -101,20 +104,29 @@ def create_seed_data():
         
         db.session.commit()
         
+        print("Creating terms...")
+        terms = [
+            Term(name='Term 1 2023', start_date=date(2023, 1, 1), end_date=date(2023, 4, 30)),
+            Term(name='Term 2 2023', start_date=date(2023, 5, 1), end_date=date(2023, 8, 31)),
+            Term(name='Term 3 2023', start_date=date(2023, 9, 1), end_date=date(2023, 12, 31)),
+            Term(name='Term 1 2024', start_date=date(2024, 1, 1), end_date=date(2024, 4, 30))
+        ]
+        db.session.add_all(terms)
+        db.session.commit()
+        
         print("Creating fees...")
-        # Create fee records
-        terms = ['Term 1 2023', 'Term 2 2023', 'Term 3 2023', 'Term 1 2024']
+        # Create fee structures and fee records
+        for class_ in classes:
+            for term in terms:
+                db.session.add(FeeStructure(class_id=class_.id, term_id=term.id, amount=15000))
+        
         for student in random.sample(students, 80):  # 80% of students have fees
             for term in random.sample(terms, random.randint(1, 3)):  # 1-3 terms per student
                 fee = Fee(
                     student_id=student.id,
                     amount=random.randint(5000, 20000),
-                    payment_date=fake.date_between(
-                        start_date=datetime.strptime(term.split()[2] + '-' + 
-                                                    {'Term 1': '01', 'Term 2': '05', 'Term 3': '09'}[' '.join(term.split()[:2])] + '-01', '%Y-%m-%d'),
-                        end_date='today'
-                    ),
-                    term=term,
+                    payment_date=fake.date_between(start_date=term.start_date, end_date='today'),
+                    term_id=term.id,
                     payment_method=random.choice(['Cash', 'Cheque', 'Bank Transfer', 'Mobile Money']),
                     receipt_number=f'RCP-{random.randint(1000, 9999)}',
                     notes=fake.sentence() if random.random() > 0.7 else None
@@ -122,14 +134,19 @@ def create_seed_data():
                 db.session.add(fee)
         
         db.session.commit()
+        rebuild_fee_balances()
+        db.session.commit()
         
         print("Creating attendance records...")
         # Create attendance records
         for student in random.sample(students, 90):  # 90% of students have attendance
-            for _ in range(random.randint(5, 30)):  # 5-30 attendance records per student
+            # 5-30 attendance records per student, at most one per day
+            attendance_dates = {fake.date_between(start_date='-1y', end_date='today')
+                                for _ in range(random.randint(5, 30))}
+            for attendance_date in attendance_dates:
                 attendance = Attendance(
                     student_id=student.id,
-                    date=fake.date_between(start_date='-1y', end_date='today'),
+                    date=attendance_date,
                     status=random.choices(
                         ['present', 'absent', 'late'],
                         weights=[80, 15, 5]
@@ -139,6 +156,8 @@ def create_seed_data():
                 db.session.add(attendance)
         
         db.session.commit()
+        rebuild_attendance_rollup()
+        db.session.commit()
         
         print("Creating timetable...")
         # Create timetable
@@ -170,21 +189,12 @@ def create_seed_data():
             for term in random.sample(terms, random.randint(1, 3)):  # 1-3 terms per student
                 for subject in random.sample(subjects, random.randint(3, 8)):  # 3-8 subjects per term
                     marks = random.randint(30, 100)
-                    if marks >= 80:
-                        grade = 'A'
-                    elif marks >= 70:
-                        grade = 'B'
-                    elif marks >= 60:
-                        grade = 'C'
-                    elif marks >= 50:
-                        grade = 'D'
-                    else:
-                        grade = 'F'
+                    grade = calculate_grade(marks)
                     
                     result = Result(
                         student_id=student.id,
                         subject_id=subject.id,
-                        term=term,
+                        term_id=term.id,
                         marks=marks,
                         grade=grade,
                         remarks=fake.sentence() if random.random() > 0.7 else None
@@ -0,0 +1,39 @@
+import pytest
+from app import db
+from app.models import User
+from benchmarks.common import create_benchmark_app, admin_headers
+from utils.result_stats import invalidate_result_stats
+from utils.student_profile import invalidate_student_profiles
+from utils.timetable import timetable_index
+from utils.timetable_feeds import invalidate_timetable_feeds
+
+def reset_caches():
+    # Module-level caches outlive each test's in-memory database
+    timetable_index.invalidate()
+    invalidate_timetable_feeds()
+    invalidate_student_profiles()
+    invalidate_result_stats()
+
+@pytest.fixture
+def app():
+    reset_caches()
+    app = create_benchmark_app()
+    with app.app_context():
+        yield app
+        db.session.remove()
+    reset_caches()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def headers(app):
+    return admin_headers()
+
+@pytest.fixture
+def teachers(app):
+    users = [User(username=f'teacher{i}', email=f'teacher{i}@example.com', role='teacher') for i in range(1, 4)]
+    db.session.add_all(users)
+    db.session.commit()
+    return [user.id for user in users]
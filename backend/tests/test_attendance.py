@@ -0,0 +1,72 @@
+from datetime import date
+from app import db
+from app.models import Attendance, AttendanceRollup
+from benchmarks.common import create_students
+from utils.attendance import rebuild_attendance_rollup, summarize_outcomes, upsert_attendance
+
+def rollup():
+    return {
+        (row.student_id, row.year, row.month): (row.present_days, row.absent_days, row.late_days, row.total_days)
+        for row in AttendanceRollup.query
+    }
+
+def assert_matches_rebuild():
+    # The incrementally kept rollup must equal one recomputed from scratch
+    kept = rollup()
+    rebuild_attendance_rollup()
+    assert rollup() == kept
+
+def test_upserts_keep_rollup_in_step(app):
+    first, second = create_students(2)
+    outcomes = upsert_attendance([
+        {'student_id': first, 'date': '2024-09-02', 'status': 'present'},
+        {'student_id': first, 'date': '2024-09-03', 'status': 'late'},
+        {'student_id': first, 'date': '2024-10-01', 'status': 'absent'},
+        {'student_id': second, 'date': '2024-09-02', 'status': 'absent'}
+    ])
+    db.session.commit()
+    assert summarize_outcomes(outcomes) == {'created': 4, 'updated': 0, 'skipped': 0}
+    assert rollup() == {
+        (first, 2024, 9): (1, 0, 1, 2),
+        (first, 2024, 10): (0, 1, 0, 1),
+        (second, 2024, 9): (0, 1, 0, 1)
+    }
+
+    # Corrections move a day between counts without changing the total
+    outcomes = upsert_attendance([
+        {'student_id': first, 'date': '2024-09-03', 'status': 'present'},
+        {'student_id': second, 'date': '2024-09-02', 'status': 'absent'},
+        {'student_id': second, 'date': '2024-09-04', 'status': 'late'}
+    ])
+    db.session.commit()
+    assert summarize_outcomes(outcomes) == {'created': 1, 'updated': 2, 'skipped': 0}
+    assert rollup()[first, 2024, 9] == (2, 0, 0, 2)
+    assert rollup()[second, 2024, 9] == (0, 1, 1, 2)
+    assert_matches_rebuild()
+
+def test_later_record_for_the_same_day_wins(app):
+    student_id, = create_students(1)
+    outcomes = upsert_attendance([
+        {'student_id': student_id, 'date': '2024-09-02', 'status': 'present'},
+        {'student_id': student_id, 'date': '2024-09-02', 'status': 'absent'},
+        {'student_id': student_id, 'date': 'yesterday', 'status': 'absent'},
+        {'student_id': student_id + 1, 'date': '2024-09-02', 'status': 'absent'}
+    ])
+    db.session.commit()
+    assert [outcome['outcome'] for outcome in outcomes] == ['skipped', 'created', 'skipped', 'skipped']
+    assert rollup() == {(student_id, 2024, 9): (0, 1, 0, 1)}
+    assert_matches_rebuild()
+
+def test_legacy_status_only_counted_in_total(app):
+    student_id, = create_students(1)
+    db.session.add(Attendance(student_id=student_id, date=date(2024, 9, 2), status='excused'))
+    db.session.commit()
+    rebuild_attendance_rollup()
+    db.session.commit()
+    assert rollup() == {(student_id, 2024, 9): (0, 0, 0, 1)}
+
+    # Replacing it must not take a day from a count it was never in
+    upsert_attendance([{'student_id': student_id, 'date': '2024-09-02', 'status': 'present'}])
+    db.session.commit()
+    assert rollup() == {(student_id, 2024, 9): (1, 0, 0, 1)}
+    assert_matches_rebuild()
@@ -0,0 +1,51 @@
+from utils.cache import Cache
+
+def test_value_is_cached_until_invalidated():
+    cache = Cache()
+    calls = []
+    compute = lambda: calls.append(1) or len(calls)
+
+    assert cache.get_or_set('key', compute) == 1
+    assert cache.get_or_set('key', compute) == 1
+    cache.invalidate('key')
+    assert cache.get_or_set('key', compute) == 2
+
+def test_value_computed_across_an_invalidation_is_not_stored():
+    cache = Cache()
+    values = iter(['stale', 'fresh'])
+
+    def compute():
+        value = next(values)
+        # A write commits and invalidates while this reader is still computing
+        cache.invalidate('key')
+        return value
+
+    assert cache.get_or_set('key', compute) == 'stale'
+    assert cache.get_or_set('key', lambda: 'fresh') == 'fresh'
+    assert cache.get_or_set('key', lambda: 'unused') == 'fresh'
+
+def test_invalidate_where_and_clear_also_discard_racing_values():
+    cache = Cache()
+    cache.get_or_set(('class', 1), lambda: 'kept')
+
+    def compute():
+        cache.invalidate_where(lambda key: key == ('class', 2))
+        return 'raced'
+
+    assert cache.get_or_set(('class', 2), compute) == 'raced'
+    assert cache.get_or_set(('class', 2), lambda: 'recomputed') == 'recomputed'
+    assert cache.get_or_set(('class', 1), lambda: 'unused') == 'kept'
+
+    cache.clear()
+    assert cache.get_or_set(('class', 1), lambda: 'after clear') == 'after clear'
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('utils.cache.time.monotonic', lambda: now[0])
+    cache = Cache(ttl=60)
+
+    assert cache.get_or_set('key', lambda: 'first') == 'first'
+    now[0] += 59
+    assert cache.get_or_set('key', lambda: 'second') == 'first'
+    now[0] += 2
+    assert cache.get_or_set('key', lambda: 'second') == 'second'
@@ -0,0 +1,105 @@
+from datetime import date
+import pytest
+from app import db
+from app.models import Class, FeeBalance
+from benchmarks.common import create_students, create_terms
+from utils.fees import parse_amount, rebuild_fee_balances, set_fee_structure
+
+@pytest.fixture
+def term(app):
+    # Terms that have not ended, so balances follow students between classes
+    return create_terms(date.today().year + 1)[0]
+
+@pytest.fixture
+def students(app, term):
+    student_ids = create_students(4, class_count=2)
+    db.session.add(Class(name='Class 3'))
+    for class_id, amount in ((1, 1000), (2, 1500), (3, 2000)):
+        set_fee_structure(class_id, term.id, amount)
+    db.session.commit()
+    return student_ids
+
+def balances():
+    return {
+        row.student_id: (row.amount_due, row.amount_paid, row.balance)
+        for row in FeeBalance.query.order_by(FeeBalance.student_id)
+    }
+
+def assert_matches_rebuild():
+    # The incrementally kept ledger must equal one recomputed from scratch
+    kept = balances()
+    rebuild_fee_balances()
+    assert balances() == kept
+
+@pytest.mark.parametrize('value', ['inf', '-inf', 'nan', 'abc', None, True, 0, -500])
+def test_parse_amount_rejects(value):
+    with pytest.raises(ValueError):
+        parse_amount(value)
+
+def test_parse_amount_accepts_positive_numbers():
+    assert parse_amount('12.5') == 12.5
+    assert parse_amount(300) == 300.0
+
+def test_payment_and_update(client, headers, students, term):
+    student_id = students[0]
+    response = client.post('/api/fees/', json={'student_id': student_id, 'term_id': term.id, 'amount': 400}, headers=headers)
+    assert response.status_code == 201
+    fee_id = response.get_json()['id']
+    assert balances()[student_id] == (1500, 400, 1100)
+
+    assert client.put(f'/api/fees/{fee_id}', json={'amount': 250}, headers=headers).status_code == 200
+    assert balances()[student_id] == (1500, 250, 1250)
+    assert_matches_rebuild()
+
+def test_update_moving_payment_to_another_term(client, headers, students, term):
+    other_term = create_terms(date.today().year + 2)[0]
+    set_fee_structure(2, other_term.id, 900)
+    db.session.commit()
+    student_id = students[0]
+    fee_id = client.post('/api/fees/', json={'student_id': student_id, 'term_id': term.id, 'amount': 400},
+                         headers=headers).get_json()['id']
+
+    assert client.put(f'/api/fees/{fee_id}', json={'term_id': other_term.id}, headers=headers).status_code == 200
+    rows = {(row.term_id, row.amount_paid) for row in FeeBalance.query.filter_by(student_id=student_id)}
+    assert rows == {(term.id, 0), (other_term.id, 400)}
+    assert_matches_rebuild()
+
+@pytest.mark.parametrize('amount', ['inf', 'nan', -500, 0])
+def test_invalid_payment_leaves_ledger_unchanged(client, headers, students, term, amount):
+    student_id = students[0]
+    fee_id = client.post('/api/fees/', json={'student_id': student_id, 'term_id': term.id, 'amount': 400},
+                         headers=headers).get_json()['id']
+    before = balances()
+
+    response = client.post('/api/fees/', json={'student_id': student_id, 'term_id': term.id, 'amount': amount},
+                           headers=headers)
+    assert response.status_code == 400
+    assert client.put(f'/api/fees/{fee_id}', json={'amount': amount}, headers=headers).status_code == 400
+    assert balances() == before
+
+def test_class_move_reprices_balance(client, headers, students, term):
+    student_id = students[0]
+    client.post('/api/fees/', json={'student_id': student_id, 'term_id': term.id, 'amount': 400}, headers=headers)
+
+    assert client.put(f'/api/students/{student_id}', json={'class_id': 3}, headers=headers).status_code == 200
+    assert balances()[student_id] == (2000, 400, 1600)
+    assert_matches_rebuild()
+
+def test_deactivated_student_keeps_only_payments(client, headers, students, term):
+    student_id, unpaid_id = students[0], students[2]
+    client.post('/api/fees/', json={'student_id': student_id, 'term_id': term.id, 'amount': 400}, headers=headers)
+
+    for key in (student_id, unpaid_id):
+        assert client.put(f'/api/students/{key}', json={'is_active': False}, headers=headers).status_code == 200
+    assert balances()[student_id] == (1500, 400, 1100)
+    assert unpaid_id not in balances()
+    assert_matches_rebuild()
+
+def test_promotion_moves_balances(client, headers, students, term):
+    # Odd ids start in class 2, which graduates; even ids move up from class 1 into it
+    client.post('/api/fees/', json={'student_id': students[1], 'term_id': term.id, 'amount': 100}, headers=headers)
+    response = client.post('/api/students/promote', json={'mapping': {'1': 2, '2': None}}, headers=headers)
+    assert response.status_code == 200
+
+    assert balances() == {students[1]: (1500, 100, 1400), students[3]: (1500, 0, 1500)}
+    assert_matches_rebuild()
@@ -0,0 +1,67 @@
+from datetime import date
+import pytest
+from app import db
+from app.models import Student
+from benchmarks.common import create_students
+from utils.pagination import MAX_LIMIT, column_field, decode_cursor, encode_cursor, paginate
+
+FIELDS = {'id': column_field(Student.id), 'email': column_field(Student.email)}
+
+def test_cursor_round_trip_with_nulls_and_dates():
+    order_by = [(Student.email, False), (Student.date_of_birth, True), (Student.id, False)]
+    for values in ([None, date(2012, 1, 1), 7], ['a@example.com', None, 8]):
+        assert decode_cursor(encode_cursor(values), order_by) == values
+
+@pytest.mark.parametrize('cursor', ['not base64!', encode_cursor([1]), encode_cursor({'id': 1}), encode_cursor(['a', 'x'])])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, [(Student.email, False), (Student.id, False)])
+
+@pytest.fixture
+def students(app):
+    student_ids = create_students(12)
+    # Every third student has no email, so pages cross NULL sort keys
+    for student_id in student_ids:
+        email = None if student_id % 3 == 0 else f'{student_id % 4}@example.com'
+        db.session.query(Student).filter(Student.id == student_id).update({'email': email})
+    db.session.commit()
+    return student_ids
+
+def pages(app, order_by, limit):
+    ids, cursor = [], None
+    while True:
+        url = f'/?fields=id&limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        with app.test_request_context(url):
+            page = paginate(Student.query, order_by, FIELDS)
+        ids += [item['id'] for item in page['items']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            return ids
+
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('limit', [1, 2, 5])
+def test_pages_cover_every_row_once_in_order(app, students, descending, limit):
+    order_by = [(Student.email, descending), (Student.id, False)]
+    with app.test_request_context('/?fields=id'):
+        expected = [item['id'] for item in paginate(Student.query, order_by, FIELDS)]
+
+    emails = {row.id: row.email for row in db.session.query(Student.id, Student.email)}
+    keys = [(emails[student_id] is not None, emails[student_id] or '') for student_id in expected]
+    # NULLs first ascending and last descending
+    assert keys == sorted(keys, reverse=descending)
+    assert sorted(expected) == students
+    assert pages(app, order_by, limit) == expected
+
+def test_unpaged_request_returns_every_row(app, students):
+    with app.test_request_context('/'):
+        rows = paginate(Student.query, [(Student.id, False)], FIELDS)
+    assert [row['id'] for row in rows] == students
+
+@pytest.mark.parametrize('limit', ['abc', '', '2.5', '0', str(MAX_LIMIT + 1)])
+def test_invalid_limit(app, limit):
+    with app.test_request_context(f'/?limit={limit}'):
+        with pytest.raises(ValueError):
+            paginate(Student.query, [(Student.id, False)], FIELDS)
+
+def test_invalid_limit_is_a_bad_request(client, headers):
+    assert client.get('/api/students/?limit=abc', headers=headers).status_code == 400
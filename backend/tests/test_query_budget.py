@@ -0,0 +1,5 @@
+from benchmarks.query_budget import budget_failures
+
+def test_routes_within_query_budget():
+    # Seeds two databases and calls every route in each, so this takes a few seconds
+    assert budget_failures() == []
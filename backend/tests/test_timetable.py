@@ -0,0 +1,150 @@
+import random
+import pytest
+from app import db
+from app.models import Class, Subject, Timetable
+from utils.timetable import (
+    DAYS, Slot, TimetableIndex, _DayIntervals, parse_slot, slot_values, timetable_conflicts, timetable_index
+)
+from utils.timetable_generator import Lesson, blocked_slots, generate_timetable
+
+def slot(class_id, start, end, teacher_id=None, room=None, day_of_week='Monday', entry_id=None):
+    return Slot(entry_id, class_id, 1, teacher_id, room, day_of_week, start, end)
+
+def brute_force_pairs(slots):
+    # Every (dimension, i, j) clash by comparing all pairs
+    pairs = set()
+    for j, second in enumerate(slots):
+        for i, first in enumerate(slots[:j]):
+            if first.day_of_week == second.day_of_week and first.start < second.end and second.start < first.end:
+                pairs.update((dimension, i, j) for dimension, _ in set(first.dimensions()) & set(second.dimensions()))
+    return pairs
+
+@pytest.fixture
+def school(app, teachers):
+    db.session.add_all([Class(name='Class 1'), Class(name='Class 2'), Class(name='Class 3'),
+                        Subject(name='Maths', code='MAT')])
+    db.session.commit()
+    return teachers
+
+def book(**data):
+    # Commits an entry the way the timetable routes do
+    version = timetable_index.begin_write()
+    entry = Timetable(**slot_values(parse_slot(dict({'subject_id': 1, 'day_of_week': 'Monday'}, **data))))
+    db.session.add(entry)
+    db.session.commit()
+    timetable_index.add(version, entry)
+    return entry
+
+def test_day_intervals_overlapping():
+    intervals = _DayIntervals()
+    for entry_id, (start, end) in enumerate([(480, 720), (540, 560), (600, 640), (720, 760)], start=1):
+        intervals.add(slot(1, start, end, entry_id=entry_id))
+
+    # A long interval starting well before the window is still found
+    assert sorted(intervals.overlapping(630, 650)) == [1, 3]
+    # Touching ends do not overlap
+    assert intervals.overlapping(760, 800) == []
+    assert sorted(intervals.overlapping(700, 730)) == [1, 4]
+
+    intervals.remove(slot(1, 480, 720, entry_id=1))
+    assert intervals.overlapping(630, 650) == [3]
+
+def test_conflicts_found_in_every_dimension(school):
+    teacher_id = school[0]
+    book(class_id=1, teacher_id=teacher_id, room='Lab', start_time='08:00', end_time='09:00')
+
+    clashes = timetable_index.conflicts(slot(2, 510, 570, teacher_id=teacher_id, room='Lab'))
+    assert sorted(dimension for dimension, _ in clashes) == ['room', 'teacher']
+    assert timetable_index.conflicts(slot(1, 540, 600)) == []
+    assert timetable_index.conflicts(slot(1, 510, 540, day_of_week='Tuesday')) == []
+    assert [dimension for dimension, _ in timetable_index.conflicts(slot(1, 500, 520))] == ['class']
+
+def test_conflicts_follow_updates_and_deletes(school):
+    entry = book(class_id=1, start_time='08:00', end_time='09:00')
+    assert timetable_index.conflicts(slot(1, 500, 520))
+
+    version = timetable_index.begin_write()
+    db.session.delete(entry)
+    db.session.commit()
+    timetable_index.remove(version, entry.id)
+    assert timetable_index.conflicts(slot(1, 500, 520)) == []
+    assert timetable_index.free('class', [1], 'Monday', 480, 540) == [1]
+
+def test_index_reloads_after_another_workers_write(school):
+    teacher_id = school[0]
+    assert timetable_index.free('teacher', [teacher_id], 'Monday', 480, 540) == [teacher_id]
+
+    # A second index stands in for another worker process
+    other = TimetableIndex()
+    other.begin_write()
+    db.session.add(Timetable(**slot_values(slot(2, 480, 540, teacher_id=teacher_id))))
+    db.session.commit()
+
+    timetable_index.sync()
+    assert timetable_index.free('teacher', [teacher_id], 'Monday', 480, 540) == []
+    assert [dimension for dimension, _ in timetable_index.conflicts(slot(1, 500, 520, teacher_id=teacher_id))] == ['teacher']
+
+def test_free_confirms_partly_used_slots(school):
+    teacher_id = school[0]
+    # 08:00-08:02 shares a 5-minute slot with 08:02-08:05 without overlapping it
+    book(class_id=1, teacher_id=teacher_id, start_time='08:00', end_time='08:02')
+    assert timetable_index.free('teacher', [teacher_id], 'Monday', 482, 485) == [teacher_id]
+    assert timetable_index.free('teacher', [teacher_id], 'Monday', 481, 485) == []
+
+def test_sweep_finds_every_clash(app):
+    rng = random.Random(0)
+    slots = []
+    for _ in range(60):
+        start = rng.randrange(480, 900, 5)
+        slots.append(slot(rng.randint(1, 4), start, start + rng.choice((30, 40, 60, 120)),
+                          teacher_id=rng.choice((None, 1, 2, 3)), room=rng.choice((None, 'Lab', 'Hall')),
+                          day_of_week=rng.choice(DAYS[:2])))
+
+    found = {(conflict['dimension'], *sorted(conflict['entries'])) for conflict in timetable_conflicts(slots)}
+    assert found == brute_force_pairs(slots)
+
+def test_bulk_conflicts_include_other_classes_only(school):
+    teacher_id = school[0]
+    book(class_id=1, teacher_id=teacher_id, start_time='08:00', end_time='09:00')
+    book(class_id=2, start_time='08:00', end_time='09:00')
+
+    # Entries of the classes being replaced are not clashes
+    conflicts = timetable_conflicts([slot(1, 480, 540), slot(3, 480, 540, teacher_id=teacher_id)], class_ids=[1, 3])
+    assert [(conflict['dimension'], conflict['entries']) for conflict in conflicts] == []
+
+    conflicts = timetable_conflicts([slot(2, 500, 520, teacher_id=teacher_id)], class_ids=[2])
+    assert [(conflict['dimension'], conflict['entries'], conflict['existing']['class_id']) for conflict in conflicts] == [
+        ('teacher', [0], 1)
+    ]
+
+def test_route_rejects_double_booking(client, headers, school):
+    teacher_id = school[0]
+    entry = {'class_id': 1, 'subject_id': 1, 'teacher_id': teacher_id, 'day_of_week': 'Monday',
+             'start_time': '08:00', 'end_time': '09:00'}
+    assert client.post('/api/timetable/', json=entry, headers=headers).status_code == 201
+
+    response = client.post('/api/timetable/', json=dict(entry, class_id=2, start_time='08:30'), headers=headers)
+    assert response.status_code == 400
+    assert [conflict['dimension'] for conflict in response.get_json()['conflicts']] == ['teacher']
+    assert Timetable.query.count() == 1
+
+def test_generated_timetable_has_no_clashes():
+    days = list(DAYS[:5])
+    periods = [(480 + 45 * index, 520 + 45 * index) for index in range(7)]
+    lessons = [
+        Lesson(class_id, subject_id, teacher_id, periods_per_week)
+        for class_id in range(1, 5)
+        for subject_id, teacher_id, periods_per_week in ((1, class_id, 6), (2, 5, 5), (3, 6 + class_id % 2, 8))
+    ]
+    blocked = {5: blocked_slots([('Monday', 0, 1440)], days, periods)}
+
+    slots = generate_timetable(lessons, days, periods, blocked, seed=1, time_limit=10)
+    assert len(slots) == sum(lesson.periods for lesson in lessons)
+    assert brute_force_pairs(slots) == set()
+    assert not any(slot.teacher_id == 5 and slot.day_of_week == 'Monday' for slot in slots)
+    assert slots == generate_timetable(lessons, days, periods, blocked, seed=1, time_limit=10)
+
+def test_generator_rejects_overloaded_teacher():
+    periods = [(480, 520), (525, 565)]
+    with pytest.raises(ValueError):
+        generate_timetable([Lesson(1, 1, 1, 3), Lesson(2, 1, 1, 8)], ['Monday', 'Tuesday'], periods)
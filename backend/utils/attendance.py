@@ -0,0 +1,263 @@
+from datetime import datetime, date, timedelta
+from sqlalchemy import insert, update, delete, select, union_all
+from app import db
+from app.models import Attendance, AttendanceRollup, Student, Class
+from utils.helpers import dialect_insert, chunked
+
+ATTENDANCE_STATUSES = ('present', 'absent', 'late')
+ROLLUP_COUNTS = ('present_days', 'absent_days', 'late_days', 'total_days')
+
+PREFETCH_CHUNK_SIZE = 500
+WRITE_BATCH_SIZE = 1000
+
+def _skipped(index, reason):
+    return {'index': index, 'outcome': 'skipped', 'reason': reason}
+
+def upsert_attendance(records):
+    """Insert or update a batch of attendance records without committing.
+
+    Existing rows are prefetched in a handful of queries and writes are sent
+    as executemany batches. Returns one outcome per input record, in order.
+    """
+    outcomes = [None] * len(records)
+    pending = {}
+
+    for index, record in enumerate(records):
+        if not isinstance(record, dict) or not all(field in record for field in ('student_id', 'date', 'status')):
+            outcomes[index] = _skipped(index, 'Missing required fields')
+            continue
+
+        try:
+            student_id = int(record['student_id'])
+        except (TypeError, ValueError):
+            outcomes[index] = _skipped(index, 'Invalid student_id')
+            continue
+
+        try:
+            attendance_date = datetime.strptime(record['date'], '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            outcomes[index] = _skipped(index, 'Invalid date format. Use YYYY-MM-DD')
+            continue
+
+        if record['status'] not in ATTENDANCE_STATUSES:
+            outcomes[index] = _skipped(index, 'Invalid status')
+            continue
+
+        key = (student_id, attendance_date)
+        if key in pending:
+            # The last record for a student and date wins
+            outcomes[pending[key]['index']] = _skipped(pending[key]['index'], 'Superseded by a later record')
+        pending[key] = {'index': index, 'status': record['status'], 'remarks': record.get('remarks')}
+
+    if not pending:
+        return outcomes
+
+    student_ids = sorted({student_id for student_id, _ in pending})
+    dates = [attendance_date for _, attendance_date in pending]
+    first_date, last_date = min(dates), max(dates)
+
+    known_students = set()
+    existing = {}
+    for chunk in chunked(student_ids, PREFETCH_CHUNK_SIZE):
+        known_students.update(row.id for row in db.session.query(Student.id).filter(Student.id.in_(chunk)))
+        rows = db.session.query(Attendance.id, Attendance.student_id, Attendance.date, Attendance.status).filter(
+            Attendance.student_id.in_(chunk),
+            Attendance.date >= first_date,
+            Attendance.date <= last_date
+        )
+        existing.update(((row.student_id, row.date), row) for row in rows)
+
+    inserts = []
+    updates = []
+    deltas = {}
+    for (student_id, attendance_date), entry in pending.items():
+        index = entry['index']
+        if student_id not in known_students:
+            outcomes[index] = _skipped(index, 'Student not found')
+            continue
+
+        current = existing.get((student_id, attendance_date))
+        period = deltas.setdefault((student_id, attendance_date.year, attendance_date.month), dict.fromkeys(ROLLUP_COUNTS, 0))
+        if current is None:
+            period[entry['status'] + '_days'] += 1
+            period['total_days'] += 1
+            inserts.append({
+                'student_id': student_id,
+                'date': attendance_date,
+                'status': entry['status'],
+                'remarks': entry['remarks']
+            })
+            outcomes[index] = {'index': index, 'outcome': 'created'}
+        else:
+            # Legacy statuses only count towards total_days, as in rebuild_attendance_rollup
+            if current.status in ATTENDANCE_STATUSES:
+                period[current.status + '_days'] -= 1
+            period[entry['status'] + '_days'] += 1
+            updates.append({'id': current.id, 'status': entry['status'], 'remarks': entry['remarks']})
+            outcomes[index] = {'index': index, 'outcome': 'updated'}
+
+    for batch in chunked(inserts, WRITE_BATCH_SIZE):
+        db.session.execute(insert(Attendance), batch)
+    for batch in chunked(updates, WRITE_BATCH_SIZE):
+        db.session.execute(update(Attendance), batch)
+    apply_rollup_deltas(deltas)
+
+    return outcomes
+
+def apply_rollup_deltas(deltas):
+    """Add ``{(student_id, year, month): {count: delta}}`` to the rollup in the current transaction."""
+    rows = [
+        dict(counts, student_id=student_id, year=year, month=month)
+        for (student_id, year, month), counts in deltas.items()
+        if any(counts.values())
+    ]
+    if not rows:
+        return
+
+    stmt = dialect_insert(AttendanceRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['student_id', 'year', 'month'],
+        set_={name: getattr(AttendanceRollup, name) + stmt.excluded[name] for name in ROLLUP_COUNTS}
+    )
+    for batch in chunked(rows, WRITE_BATCH_SIZE):
+        db.session.execute(stmt, batch)
+
+def rebuild_attendance_rollup():
+    """Recompute every rollup row from attendances, repairing any drift. Does not commit."""
+    year = db.extract('year', Attendance.date)
+    month = db.extract('month', Attendance.date)
+    aggregated = select(Attendance.student_id, year, month, *status_counts()).group_by(
+        Attendance.student_id, year, month
+    )
+    db.session.execute(delete(AttendanceRollup))
+    db.session.execute(insert(AttendanceRollup).from_select(
+        ['student_id', 'year', 'month', *ROLLUP_COUNTS], aggregated
+    ))
+    return db.session.query(AttendanceRollup).count()
+
+def summarize_outcomes(outcomes):
+    summary = {'created': 0, 'updated': 0, 'skipped': 0}
+    for outcome in outcomes:
+        summary[outcome['outcome']] += 1
+    return summary
+
+def month_bounds(year, month):
+    # Half-open [start, end) range covering one calendar month
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+def parse_report_range(args):
+    """Resolve ``month``/``year`` or ``from``/``to`` query args to a half-open date range.
+
+    Raises ValueError with a user-facing message when the arguments are unusable.
+    """
+    if args.get('from') or args.get('to'):
+        try:
+            start = datetime.strptime(args.get('from', ''), '%Y-%m-%d').date()
+            end = datetime.strptime(args.get('to', ''), '%Y-%m-%d').date() + timedelta(days=1)
+        except ValueError:
+            raise ValueError('from and to must both be dates in YYYY-MM-DD format')
+        if end <= start:
+            raise ValueError('from must not be after to')
+        return start, end
+
+    month = args.get('month')
+    year = args.get('year')
+    if not (month and year):
+        raise ValueError('Month and year, or from and to dates, are required')
+    try:
+        return month_bounds(int(year), int(month))
+    except ValueError:
+        raise ValueError('Month and year must be numbers')
+
+def status_counts():
+    return (
+        db.func.count(db.case((Attendance.status == 'present', 1))).label('present_days'),
+        db.func.count(db.case((Attendance.status == 'absent', 1))).label('absent_days'),
+        db.func.count(db.case((Attendance.status == 'late', 1))).label('late_days'),
+        db.func.count(Attendance.id).label('total_days')
+    )
+
+def attendance_rate(present_days, total_days):
+    return round((present_days / total_days * 100), 2) if total_days > 0 else 0
+
+def _next_month(day):
+    return month_bounds(day.year, day.month)[1]
+
+def _period(day):
+    return day.year * 100 + day.month
+
+def attendance_counts(start, end, student_ids):
+    """Selectable of per-student counts over [start, end) for the students in ``student_ids``.
+
+    Whole calendar months are read from the rollup; only the partial months at
+    either edge of the range touch raw attendance rows.
+    """
+    first_full = start if start.day == 1 else _next_month(start)
+    last_full = date(end.year, end.month, 1)
+
+    parts = []
+    raw_ranges = [(start, end)]
+    if first_full < last_full:
+        period = AttendanceRollup.year * 100 + AttendanceRollup.month
+        parts.append(select(
+            AttendanceRollup.student_id, *(getattr(AttendanceRollup, name) for name in ROLLUP_COUNTS)
+        ).where(
+            AttendanceRollup.student_id.in_(student_ids),
+            period >= _period(first_full),
+            period < _period(last_full)
+        ))
+        raw_ranges = [(start, first_full), (last_full, end)]
+
+    for range_start, range_end in raw_ranges:
+        if range_start < range_end:
+            parts.append(select(Attendance.student_id, *status_counts()).where(
+                Attendance.student_id.in_(student_ids),
+                Attendance.date >= range_start,
+                Attendance.date < range_end
+            ).group_by(Attendance.student_id))
+
+    return (union_all(*parts) if len(parts) > 1 else parts[0]).subquery()
+
+def attendance_report(start, end, class_id=None):
+    """Per-student attendance counts for active students over [start, end), in one query."""
+    scope = select(Student.id).where(Student.is_active == True)
+    if class_id:
+        scope = scope.where(Student.class_id == class_id)
+
+    counts = attendance_counts(start, end, scope)
+    totals = [db.func.coalesce(db.func.sum(getattr(counts.c, name)), 0).label(name) for name in ROLLUP_COUNTS]
+
+    query = db.session.query(
+        Student.id,
+        Student.admission_number,
+        Student.first_name,
+        Student.last_name,
+        Student.class_id,
+        Class.name.label('class_name'),
+        *totals
+    ).outerjoin(
+        Class, Student.class_id == Class.id
+    ).outerjoin(
+        counts, counts.c.student_id == Student.id
+    ).filter(Student.is_active == True)
+
+    if class_id:
+        query = query.filter(Student.class_id == class_id)
+
+    rows = query.group_by(Student.id, Class.name).order_by(Student.id).all()
+
+    return [{
+        'student_id': row.id,
+        'admission_number': row.admission_number,
+        'first_name': row.first_name,
+        'last_name': row.last_name,
+        'class_id': row.class_id,
+        'class_name': row.class_name,
+        'present_days': row.present_days,
+        'absent_days': row.absent_days,
+        'late_days': row.late_days,
+        'total_days': row.total_days,
+        'attendance_rate': attendance_rate(row.present_days, row.total_days)
+    } for row in rows]
@@ -0,0 +1,129 @@
+import base64
+from datetime import date
+from app import db
+from app.models import Attendance, Student
+from utils.attendance import month_bounds
+
+# Two bits per day: 0 = no record, then one code per status
+STATUS_CODES = {'present': 1, 'absent': 2, 'late': 3}
+CODE_STATUSES = {code: status for status, code in STATUS_CODES.items()}
+DAY_SYMBOLS = '-PAL'
+
+# Lookup tables indexed by a packed byte (four days)
+_BYTE_SYMBOLS = [''.join(DAY_SYMBOLS[(value >> shift) & 3] for shift in (0, 2, 4, 6)) for value in range(256)]
+_BYTE_COUNTS = [
+    tuple(sum(1 for shift in (0, 2, 4, 6) if (value >> shift) & 3 == code) for code in (1, 2, 3))
+    for value in range(256)
+]
+
+class AttendanceCalendar:
+    """Attendance statuses for a run of consecutive days, packed two bits per day.
+
+    Day ``i`` (counted from ``start``) lives in byte ``i // 4`` at bit offset
+    ``(i % 4) * 2``, so a full year fits in 92 bytes.
+    """
+    __slots__ = ('start', 'days', 'bits')
+
+    def __init__(self, start, days, bits=None):
+        self.start = start
+        self.days = days
+        self.bits = bytearray(bits) if bits is not None else bytearray((days + 3) // 4)
+
+    @classmethod
+    def for_month(cls, year, month):
+        start, end = month_bounds(year, month)
+        return cls(start, (end - start).days)
+
+    @classmethod
+    def for_year(cls, year):
+        start = date(year, 1, 1)
+        return cls(start, (date(year + 1, 1, 1) - start).days)
+
+    @classmethod
+    def from_base64(cls, start, days, data):
+        return cls(start, days, base64.b64decode(data))
+
+    def _offset(self, day):
+        offset = (day - self.start).days
+        if not 0 <= offset < self.days:
+            raise ValueError(f'{day.isoformat()} is outside this calendar')
+        return offset
+
+    def set(self, day, status):
+        offset = self._offset(day)
+        # Two bits only hold the three known statuses; anything else reads as no record
+        code = STATUS_CODES.get(status, 0)
+        index, shift = offset // 4, (offset % 4) * 2
+        self.bits[index] = (self.bits[index] & ~(3 << shift)) | (code << shift)
+
+    def get(self, day):
+        offset = self._offset(day)
+        return CODE_STATUSES.get((self.bits[offset // 4] >> ((offset % 4) * 2)) & 3)
+
+    def counts(self):
+        present = absent = late = 0
+        for value in self.bits:
+            byte_present, byte_absent, byte_late = _BYTE_COUNTS[value]
+            present += byte_present
+            absent += byte_absent
+            late += byte_late
+        return {
+            'present_days': present,
+            'absent_days': absent,
+            'late_days': late,
+            'total_days': present + absent + late
+        }
+
+    def to_symbols(self):
+        return ''.join(_BYTE_SYMBOLS[value] for value in self.bits)[:self.days]
+
+    def to_base64(self):
+        return base64.b64encode(bytes(self.bits)).decode('ascii')
+
+def class_month_grid(class_id, year, month):
+    """Build one calendar per active student in a class for a month, from a single query."""
+    start, end = month_bounds(year, month)
+    template = AttendanceCalendar(start, (end - start).days)
+
+    rows = db.session.query(
+        Student.id,
+        Student.admission_number,
+        Student.first_name,
+        Student.last_name,
+        Attendance.date,
+        Attendance.status
+    ).outerjoin(
+        Attendance, db.and_(
+            Attendance.student_id == Student.id,
+            Attendance.date >= start,
+            Attendance.date < end
+        )
+    ).filter(
+        Student.class_id == class_id,
+        Student.is_active == True
+    ).order_by(Student.id)
+
+    grid = {}
+    for row in rows:
+        if row.id not in grid:
+            grid[row.id] = {
+                'admission_number': row.admission_number,
+                'name': f"{row.first_name} {row.last_name}",
+                'calendar': AttendanceCalendar(template.start, template.days)
+            }
+        if row.date is not None:
+            grid[row.id]['calendar'].set(row.date, row.status)
+
+    return template, grid
+
+def student_year_calendar(student_id, year):
+    # Raises ValueError for years the date type cannot span
+    calendar = AttendanceCalendar.for_year(year)
+    rows = db.session.query(Attendance.date, Attendance.status).filter(
+        Attendance.student_id == student_id,
+        Attendance.date >= calendar.start,
+        Attendance.date < date(year + 1, 1, 1)
+    )
+    for row in rows:
+        calendar.set(row.date, row.status)
+    return calendar
@@ -0,0 +1,49 @@
+import threading
+import time
+
+class Cache:
+    """A small in-process cache with optional per-entry expiry.
+
+    Entries live in this worker's memory only, so every write path that can
+    change a cached value must call ``invalidate`` for the affected keys, and
+    a ``ttl`` is what bounds how long writes made by other workers go unseen.
+    A value whose computation overlapped an invalidation is returned but not
+    stored, since it may have been read before the write it missed.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._entries = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_set(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generation
+        if entry is not None and (entry[1] is None or entry[1] > now):
+            return entry[0]
+
+        value = compute()
+        expires = now + self.ttl if self.ttl else None
+        with self._lock:
+            if self._generation == generation:
+                self._entries[key] = (value, expires)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
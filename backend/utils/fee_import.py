@@ -0,0 +1,125 @@
+import csv
+from datetime import date
+from sqlalchemy import insert
+from app import db
+from app.models import Fee, FeeStructure, Student
+from utils.fees import apply_payments, parse_amount
+from utils.student_profile import invalidate_student_profiles
+from utils.terms import term_ids_by_name
+
+IMPORT_BATCH_SIZE = 500
+REQUIRED_COLUMNS = ('admission_number', 'amount', 'term')
+
+def _outcome(line, receipt_number, outcome, reason=None):
+    return {'line': line, 'receipt_number': receipt_number, 'outcome': outcome, 'reason': reason}
+
+def _parse_row(row, students, terms):
+    admission_number = (row.get('admission_number') or '').strip()
+    if not all((row.get(column) or '').strip() for column in REQUIRED_COLUMNS):
+        raise ValueError('Missing required fields')
+
+    student = students.get(admission_number)
+    if student is None:
+        raise ValueError('Unknown admission number')
+
+    term_id = terms.get(row['term'].strip())
+    if term_id is None:
+        raise ValueError('Unknown term')
+
+    amount = parse_amount(row['amount'])
+
+    payment_date = (row.get('payment_date') or '').strip()
+    try:
+        payment_date = date.fromisoformat(payment_date) if payment_date else date.today()
+    except ValueError:
+        raise ValueError('Invalid date format. Use YYYY-MM-DD')
+
+    return {
+        'student_id': student[0],
+        'class_id': student[1],
+        'amount': amount,
+        'payment_date': payment_date,
+        'term_id': term_id,
+        'payment_method': (row.get('payment_method') or '').strip() or None,
+        'receipt_number': (row.get('receipt_number') or '').strip() or None,
+        'notes': (row.get('notes') or '').strip() or None
+    }
+
+def _flush(batch, fee_structure):
+    receipts = [fee['receipt_number'] for _, fee, _ in batch if fee and fee['receipt_number']]
+    taken = {
+        row.receipt_number for row in
+        db.session.query(Fee.receipt_number).filter(Fee.receipt_number.in_(receipts))
+    } if receipts else set()
+
+    fees = []
+    ledger = {}
+    outcomes = []
+    for line, fee, outcome in batch:
+        if fee is None:
+            outcomes.append(outcome)
+            continue
+        receipt_number = fee['receipt_number']
+        if receipt_number in taken:
+            outcomes.append(_outcome(line, receipt_number, 'duplicate', 'Receipt number already recorded'))
+            continue
+        if receipt_number:
+            taken.add(receipt_number)
+
+        class_id = fee.pop('class_id')
+        fees.append(fee)
+        key = (fee['student_id'], fee['term_id'])
+        if key not in ledger:
+            ledger[key] = {
+                'student_id': fee['student_id'],
+                'term_id': fee['term_id'],
+                'amount': 0,
+                'amount_due': fee_structure.get((class_id, fee['term_id']), 0)
+            }
+        ledger[key]['amount'] += fee['amount']
+        outcomes.append(_outcome(line, receipt_number, 'imported'))
+
+    if fees:
+        db.session.execute(insert(Fee), fees)
+        apply_payments(ledger.values())
+    db.session.commit()
+    invalidate_student_profiles(fee['student_id'] for fee in fees)
+    return outcomes
+
+def import_payments(lines, batch_size=IMPORT_BATCH_SIZE):
+    """Import fee payments from CSV lines, yielding one outcome per data row.
+
+    Rows are parsed lazily and committed in batches, so memory use is bounded
+    by the batch size plus the admission number and term lookups, not by the file.
+    """
+    reader = csv.DictReader(lines)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    students = {
+        row.admission_number: (row.id, row.class_id)
+        for row in db.session.query(Student.admission_number, Student.id, Student.class_id)
+    }
+    terms = term_ids_by_name()
+    fee_structure = {
+        (row.class_id, row.term_id): row.amount
+        for row in db.session.query(FeeStructure.class_id, FeeStructure.term_id, FeeStructure.amount)
+    }
+
+    batch = []
+    for row in reader:
+        line = reader.line_num
+        try:
+            fee = _parse_row(row, students, terms)
+        except ValueError as e:
+            batch.append((line, None, _outcome(line, row.get('receipt_number'), 'error', str(e))))
+        else:
+            batch.append((line, fee, None))
+
+        if len(batch) >= batch_size:
+            yield from _flush(batch, fee_structure)
+            batch = []
+
+    if batch:
+        yield from _flush(batch, fee_structure)
@@ -0,0 +1,164 @@
+import math
+from datetime import date
+from sqlalchemy import insert, update, delete, select, union
+from app import db
+from app.models import Fee, FeeStructure, FeeBalance, Student, Term
+from utils.helpers import dialect_insert
+
+def parse_amount(value):
+    """A payment amount from a JSON or CSV value; raises ValueError unless it is a positive, finite number."""
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('Amount must be a number')
+    if isinstance(value, bool) or not math.isfinite(amount):
+        raise ValueError('Amount must be a number')
+    if amount <= 0:
+        raise ValueError('Amount must be positive')
+    return amount
+
+def expected_fee(student_id, term_id):
+    amount = db.session.query(FeeStructure.amount).join(
+        Student, Student.class_id == FeeStructure.class_id
+    ).filter(Student.id == student_id, FeeStructure.term_id == term_id).scalar()
+    return amount or 0
+
+def apply_payment(student_id, term_id, amount):
+    """Add ``amount`` (negative to reverse) to a student's term balance without committing."""
+    if amount:
+        apply_payments([{
+            'student_id': student_id,
+            'term_id': term_id,
+            'amount': amount,
+            'amount_due': expected_fee(student_id, term_id)
+        }])
+
+def apply_payments(payments):
+    """Apply many payments to the ledger in one executemany upsert.
+
+    Each payment is a dict with ``student_id``, ``term_id``, ``amount`` and the
+    ``amount_due`` to use if the balance row does not exist yet.
+    """
+    rows = [{
+        'student_id': payment['student_id'],
+        'term_id': payment['term_id'],
+        'amount_due': payment['amount_due'],
+        'amount_paid': payment['amount'],
+        'balance': payment['amount_due'] - payment['amount']
+    } for payment in payments]
+    if not rows:
+        return
+
+    stmt = dialect_insert(FeeBalance)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['student_id', 'term_id'],
+        set_={
+            'amount_paid': FeeBalance.amount_paid + stmt.excluded.amount_paid,
+            'balance': FeeBalance.balance - stmt.excluded.amount_paid
+        }
+    )
+    db.session.execute(stmt, rows)
+
+def set_fee_structure(class_id, term_id, amount):
+    """Set the expected fee for a class and term and re-price its students' balances."""
+    stmt = dialect_insert(FeeStructure).values(class_id=class_id, term_id=term_id, amount=amount)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['class_id', 'term_id'],
+        set_={'amount': stmt.excluded.amount}
+    ))
+
+    class_students = select(Student.id).where(Student.class_id == class_id)
+    db.session.execute(
+        update(FeeBalance).where(
+            FeeBalance.term_id == term_id,
+            FeeBalance.student_id.in_(class_students)
+        ).values(amount_due=amount, balance=amount - FeeBalance.amount_paid),
+        execution_options={'synchronize_session': False}
+    )
+
+    # Open a balance for every active student who has not paid anything yet
+    db.session.execute(insert(FeeBalance).from_select(
+        ['student_id', 'term_id', 'amount_due', 'amount_paid', 'balance'],
+        select(Student.id, db.literal(term_id), db.literal(amount), db.literal(0), db.literal(amount)).where(
+            Student.class_id == class_id,
+            Student.is_active == True,
+            ~db.exists().where(FeeBalance.student_id == Student.id, FeeBalance.term_id == term_id)
+        )
+    ))
+
+def _balances(student_ids=None, term_ids=None):
+    # (student_id, term_id, amount_due, amount_paid, balance) from fee structures and payments,
+    # optionally limited to the given student and term ids (lists or selects)
+    def limit(query, student_column, term_column):
+        if student_ids is not None:
+            query = query.where(student_column.in_(student_ids))
+        if term_ids is not None:
+            query = query.where(term_column.in_(term_ids))
+        return query
+
+    keys = union(
+        limit(select(Student.id.label('student_id'), FeeStructure.term_id).join(
+            FeeStructure, FeeStructure.class_id == Student.class_id
+        ).where(Student.is_active == True), Student.id, FeeStructure.term_id),
+        limit(select(Fee.student_id, Fee.term_id), Fee.student_id, Fee.term_id)
+    ).subquery()
+    paid = limit(select(Fee.student_id, Fee.term_id, db.func.sum(Fee.amount).label('amount_paid')), Fee.student_id,
+                 Fee.term_id).group_by(Fee.student_id, Fee.term_id).subquery()
+
+    amount_due = db.func.coalesce(FeeStructure.amount, 0)
+    amount_paid = db.func.coalesce(paid.c.amount_paid, 0)
+    return select(keys.c.student_id, keys.c.term_id, amount_due, amount_paid, amount_due - amount_paid).select_from(
+        keys
+    ).join(
+        Student, Student.id == keys.c.student_id
+    ).outerjoin(
+        FeeStructure, db.and_(FeeStructure.class_id == Student.class_id, FeeStructure.term_id == keys.c.term_id)
+    ).outerjoin(
+        paid, db.and_(paid.c.student_id == keys.c.student_id, paid.c.term_id == keys.c.term_id)
+    )
+
+def sync_fee_balances(student_ids):
+    """Re-price balances of students who joined, moved class, or were (de)activated, without committing.
+
+    ``student_ids`` is a list or a select of ids. Only terms that have not
+    ended are touched, so past terms keep the price of the class the student
+    was in at the time.
+    """
+    open_terms = select(Term.id).where(db.or_(Term.end_date.is_(None), Term.end_date >= date.today()))
+    db.session.execute(
+        delete(FeeBalance).where(FeeBalance.student_id.in_(student_ids), FeeBalance.term_id.in_(open_terms)),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.execute(insert(FeeBalance).from_select(
+        ['student_id', 'term_id', 'amount_due', 'amount_paid', 'balance'], _balances(student_ids, open_terms)
+    ))
+
+def rebuild_fee_balances():
+    """Recompute every balance from fee structures and payments, repairing any drift. Does not commit."""
+    db.session.execute(delete(FeeBalance))
+    db.session.execute(insert(FeeBalance).from_select(
+        ['student_id', 'term_id', 'amount_due', 'amount_paid', 'balance'], _balances()
+    ))
+    return db.session.query(FeeBalance).count()
+
+def collection_summary(term, class_id=None):
+    query = db.session.query(
+        db.func.coalesce(db.func.sum(FeeBalance.amount_due), 0).label('amount_due'),
+        db.func.coalesce(db.func.sum(FeeBalance.amount_paid), 0).label('amount_paid'),
+        db.func.count(db.case((FeeBalance.balance > 0, 1))).label('students_in_arrears'),
+        db.func.coalesce(db.func.sum(db.case((FeeBalance.balance > 0, FeeBalance.balance))), 0).label('arrears')
+    ).filter(FeeBalance.term_id == term.id)
+
+    if class_id:
+        query = query.join(Student, Student.id == FeeBalance.student_id).filter(Student.class_id == class_id)
+
+    row = query.one()
+    return {
+        'term_id': term.id,
+        'term': term.name,
+        'amount_due': row.amount_due,
+        'amount_paid': row.amount_paid,
+        'arrears': row.arrears,
+        'students_in_arrears': row.students_in_arrears,
+        'collection_rate': round(row.amount_paid / row.amount_due * 100, 2) if row.amount_due else 0
+    }
@@ -0,0 +1,26 @@
+from bisect import bisect_right
+from flask import current_app
+
+DEFAULT_GRADE_BOUNDARIES = [(80, 'A'), (70, 'B'), (60, 'C'), (50, 'D'), (0, 'F')]
+
+class GradeScale:
+    """Maps marks to grades using (minimum marks, grade) boundaries."""
+
+    def __init__(self, boundaries):
+        ordered = sorted(boundaries)
+        self.thresholds = [minimum for minimum, _ in ordered]
+        self.grades = [grade for _, grade in ordered]
+
+    def grade(self, marks):
+        # Marks below the lowest boundary still get the lowest grade
+        return self.grades[max(bisect_right(self.thresholds, marks) - 1, 0)]
+
+    def grade_all(self, marks):
+        thresholds, grades = self.thresholds, self.grades
+        return [grades[max(bisect_right(thresholds, value) - 1, 0)] for value in marks]
+
+def grade_scale():
+    return GradeScale(current_app.config.get('GRADE_BOUNDARIES', DEFAULT_GRADE_BOUNDARIES))
+
+def calculate_grade(marks):
+    return grade_scale().grade(marks)
@@ -1,7 +1,12 @@
+import csv
+import io
 from datetime import datetime, date
 from functools import wraps
-from flask import jsonify, request
+from itertools import chain
+from flask import jsonify, Response, stream_with_context
 from flask_jwt_extended import get_jwt_identity
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
 
 def validate_date(date_str, format='%Y-%m-%d'):
     try:
@@ -15,6 +20,38 @@ def validate_time(time_str, format='%H:%M'):
     except ValueError:
         return None
 
+def chunked(items, size):
+    # Slices of ``items``; keeps IN lists well below SQLite's bound parameter limit
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def dialect_insert(model):
+    # INSERT construct that supports on_conflict_do_update on the bound database
+    dialect = postgresql if db.session.get_bind().dialect.name == 'postgresql' else sqlite
+    return dialect.insert(model)
+
+def stream_csv(rows, columns):
+    """Stream the dicts from the iterator ``rows`` as CSV, one line per row under a ``columns`` header.
+
+    The first row is pulled before the response starts, so a ValueError raised
+    up front (say, for a malformed upload) reaches the caller rather than
+    cutting the stream short.
+    """
+    first = next(rows, None)
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        values = (['' if row[column] is None else row[column] for column in columns]
+                  for row in chain([first] if first is not None else [], rows))
+        for line in chain([columns], values):
+            writer.writerow(line)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    return Response(stream_with_context(generate()), mimetype='text/csv')
+
 def admin_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
@@ -32,15 +69,3 @@ def teacher_or_admin_required(fn):
             return jsonify({'message': 'Teacher or admin access required'}), 403
         return fn(*args, **kwargs)
     return wrapper
-
-def paginate(query, schema):
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-    paginated = query.paginate(page=page, per_page=per_page, error_out=False)
-    
-    return {
-        'items': schema.dump(paginated.items),
-        'total': paginated.total,
-        'pages': paginated.pages,
-        'current_page': paginated.page
-    }
\ No newline at end of file
@@ -0,0 +1,104 @@
+import json
+import logging
+import time
+from flask import current_app, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from app import db
+
+logger = logging.getLogger('app.instrumentation')
+
+class RequestStats:
+    """What one request spent on SQL and JSON encoding."""
+
+    __slots__ = ('started', 'queries', 'db_time', 'slowest', 'slowest_time', 'json_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest = None
+        self.slowest_time = 0.0
+        self.json_time = 0.0
+
+    def record_query(self, statement, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest, self.slowest_time = statement, elapsed
+
+def _stats():
+    return g.get('request_stats') if has_request_context() else None
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    stats = _stats()
+    if stats is not None:
+        stats.record_query(statement, elapsed)
+
+class TimedJSONProvider(DefaultJSONProvider):
+    # Adds the time spent encoding JSON responses to the request's stats
+
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            stats = _stats()
+            if stats is not None:
+                stats.json_time += time.perf_counter() - started
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+def _start_request():
+    g.request_stats = RequestStats()
+
+def _finish_request(response):
+    stats = g.pop('request_stats', None)
+    if stats is None:
+        return response
+    total = time.perf_counter() - stats.started
+    response.headers.add('Server-Timing', ', '.join([
+        f'db;dur={_ms(stats.db_time)};desc="{stats.queries} queries"',
+        f'json;dur={_ms(stats.json_time)}',
+        f'total;dur={_ms(total)}'
+    ]))
+
+    config = current_app.config
+    if _ms(total) >= config['SLOW_REQUEST_MS'] or stats.queries >= config['SLOW_REQUEST_QUERIES']:
+        logger.warning(json.dumps({
+            'event': 'slow_request',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'total_ms': _ms(total),
+            'queries': stats.queries,
+            'db_ms': _ms(stats.db_time),
+            'json_ms': _ms(stats.json_time),
+            'slowest_query_ms': _ms(stats.slowest_time),
+            'slowest_query': stats.slowest
+        }, sort_keys=True))
+    return response
+
+def init_instrumentation(app):
+    """Time SQL and JSON encoding per request when ``REQUEST_INSTRUMENTATION`` is set.
+
+    Adds a ``Server-Timing`` header to every response and logs requests over
+    ``SLOW_REQUEST_MS`` or ``SLOW_REQUEST_QUERIES`` as one JSON object each.
+    When the setting is off nothing is registered, so there is no overhead.
+    """
+    if not app.config.get('REQUEST_INSTRUMENTATION'):
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    app.json = TimedJSONProvider(app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
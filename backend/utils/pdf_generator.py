@@ -3,12 +3,18 @@ from fpdf import FPDF
 from datetime import datetime
 import os
 
+def school_logo_path():
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], 'school_logo.png')
+
 class PDF(FPDF):
+    def __init__(self, logo_path=None):
+        super().__init__()
+        self.logo_path = logo_path
+    
     def header(self):
         # Logo
-        logo_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'school_logo.png')
-        if os.path.exists(logo_path):
-            self.image(logo_path, 10, 8, 33)
+        if self.logo_path and os.path.exists(self.logo_path):
+            self.image(self.logo_path, 10, 8, 33)
         
         # School name
         self.set_font('Arial', 'B', 15)
@@ -21,14 +27,15 @@ class PDF(FPDF):
         self.set_font('Arial', 'I', 8)
         self.cell(0, 10, f'Page {self.page_no()}/{{nb}}', 0, 0, 'C')
 
-def generate_pdf_report_card(student, results, attendance):
-    pdf = PDF()
+def generate_pdf_report_card(student, results, attendance, logo_path=None):
+    # Worker processes have no app context, so they pass the logo path in
+    pdf = PDF(logo_path or school_logo_path())
     pdf.alias_nb_pages()
     pdf.add_page()
     
     # Student information
     pdf.set_font('Arial', 'B', 12)
-    pdf.cell(0, 10, f'REPORT CARD - TERM {results[0].term if results else "N/A"}', 0, 1)
+    pdf.cell(0, 10, f'REPORT CARD - TERM {results[0].term.name if results else "N/A"}', 0, 1)
     pdf.ln(5)
     
     pdf.set_font('Arial', '', 10)
@@ -51,7 +58,7 @@ def generate_pdf_report_card(student, results, attendance):
     for result in results:
         pdf.cell(80, 6, result.subject.name, 1, 0)
         pdf.cell(30, 6, str(result.marks), 1, 0, 'C')
-        pdf.cell(30, 6, result.grade, 1, 0, 'C')
+        pdf.cell(30, 6, result.grade or '', 1, 0, 'C')
         pdf.cell(0, 6, result.remarks or '', 1, 1)
     
     pdf.ln(10)
@@ -76,13 +83,13 @@ def generate_pdf_report_card(student, results, attendance):
     pdf.set_font('Arial', 'B', 10)
     pdf.cell(0, 6, 'Class Teacher Comments:', 0, 1)
     pdf.set_font('Arial', '', 10)
-    pdf.multi_cell(0, 6, 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. Nullam in dui mauris.', 0, 1)
+    pdf.multi_cell(0, 6, 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. Nullam in dui mauris.', 0)
     pdf.ln(5)
     
     pdf.set_font('Arial', 'B', 10)
     pdf.cell(0, 6, 'Principal Comments:', 0, 1)
     pdf.set_font('Arial', '', 10)
-    pdf.multi_cell(0, 6, 'Vivamus suscipit tortor eget felis porttitor volutpat. Curabitur non nulla sit amet nisl tempus convallis quis ac lectus.', 0, 1)
+    pdf.multi_cell(0, 6, 'Vivamus suscipit tortor eget felis porttitor volutpat. Curabitur non nulla sit amet nisl tempus convallis quis ac lectus.', 0)
     
     # Date and signature
     pdf.ln(15)
@@ -91,4 +98,4 @@ def generate_pdf_report_card(student, results, attendance):
     pdf.cell(0, 6, '_________________________', 0, 1, 'C')
     pdf.cell(0, 6, 'Principal Signature', 0, 1, 'C')
     
-    return pdf.output(dest='S').encode('latin1')
\ No newline at end of file
+    return bytes(pdf.output())
\ No newline at end of file
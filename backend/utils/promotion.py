@@ -0,0 +1,79 @@
+from sqlalchemy import select, update, and_, or_, case, true, false
+from app import db
+from app.models import Student, Class
+from utils.fees import sync_fee_balances
+from utils.helpers import chunked
+
+def _including(column, ids):
+    return or_(*(column.in_(chunk) for chunk in chunked(sorted(ids), 500))) if ids else false()
+
+def _excluding(column, ids):
+    return and_(*(column.notin_(chunk) for chunk in chunked(sorted(ids), 500))) if ids else true()
+
+def promote_students(mapping, repeaters=(), graduates=(), dry_run=False):
+    """Move active students up a class as a handful of set-based statements, without committing.
+
+    ``mapping`` sends each class id to the class its students move into, or to
+    None when the class graduates. ``repeaters`` stay in their class and
+    ``graduates`` are deactivated wherever they are; graduating students keep
+    their last class. With ``dry_run`` nothing is written. Returns a summary
+    of what moves (or would move) and raises ValueError for unknown classes.
+    Fee balances for terms that have not ended follow the students.
+    """
+    class_ids = set(mapping) | {target for target in mapping.values() if target is not None}
+    classes = {row.id: row.name for row in db.session.query(Class.id, Class.name).filter(Class.id.in_(class_ids))}
+    unknown = sorted(class_ids - set(classes))
+    if unknown:
+        raise ValueError(f"Unknown classes: {', '.join(str(class_id) for class_id in unknown)}")
+
+    repeaters, graduates = set(repeaters), set(graduates)
+    if repeaters & graduates:
+        raise ValueError('Students cannot be both repeating and graduating')
+
+    moves = {source: target for source, target in mapping.items() if target is not None}
+    leaving = [source for source, target in mapping.items() if target is None]
+    active = Student.is_active == True
+
+    graduating = and_(active, or_(
+        and_(Student.class_id.in_(leaving), _excluding(Student.id, repeaters)),
+        _including(Student.id, graduates)
+    ))
+    promoting = and_(
+        active, Student.class_id.in_(moves), _excluding(Student.id, repeaters), _excluding(Student.id, graduates)
+    )
+
+    promoted = db.session.query(Student.class_id, db.func.count(Student.id)).filter(promoting).group_by(
+        Student.class_id
+    ).all()
+    summary = {
+        'dry_run': dry_run,
+        'promoted': [{
+            'from_class_id': class_id,
+            'from_class': classes[class_id],
+            'to_class_id': moves[class_id],
+            'to_class': classes[moves[class_id]],
+            'students': count
+        } for class_id, count in sorted(promoted)],
+        'total_promoted': sum(count for _, count in promoted),
+        'graduated': db.session.query(db.func.count(Student.id)).filter(graduating).scalar(),
+        'repeating': db.session.query(db.func.count(Student.id)).filter(
+            active, Student.class_id.in_(mapping), _including(Student.id, repeaters)
+        ).scalar()
+    }
+    if dry_run:
+        return summary
+
+    # Graduates first: the promotion below only touches students still active. One CASE
+    # moves every class at once, so students moved from 1 to 2 are not then moved from 2 to 3
+    db.session.execute(
+        update(Student).where(graduating).values(is_active=False),
+        execution_options={'synchronize_session': False}
+    )
+    if moves:
+        db.session.execute(
+            update(Student).where(promoting).values(class_id=case(moves, value=Student.class_id)),
+            execution_options={'synchronize_session': False}
+        )
+    # Everyone who moved or left is now in one of these classes or among the graduates
+    sync_fee_balances(select(Student.id).where(or_(Student.class_id.in_(class_ids), _including(Student.id, graduates))))
+    return summary
@@ -0,0 +1,189 @@
+import atexit
+import io
+import os
+import re
+import threading
+import zipfile
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from types import SimpleNamespace
+from flask import current_app
+from PyPDF2 import PdfFileMerger
+from sqlalchemy import select
+from sqlalchemy.orm import contains_eager
+from app import db
+from app.models import Result, Student, Subject, Class
+from utils.attendance import ROLLUP_COUNTS, attendance_counts, attendance_rate, attendance_report
+from utils.pdf_generator import generate_pdf_report_card, school_logo_path
+from utils.terms import term_date_range
+
+EMPTY_ATTENDANCE = {'total_days': 0, 'present_days': 0, 'absent_days': 0, 'late_days': 0, 'attendance_rate': 0}
+
+def init_report_cards(app):
+    """Size the process pool that renders batch report cards by ``REPORT_CARD_WORKERS``.
+
+    The pool itself is created on the first batch that needs it (see
+    ``_executor``), so apps that never render one, such as CLI commands,
+    start no processes. It is kept in ``app.extensions['report_cards']`` and
+    shut down when the interpreter exits. With a single worker there is no
+    pool and cards render in the request.
+    """
+    previous = app.extensions.get('report_cards')
+    if previous is not None and previous['executor'] is not None:
+        previous['executor'].shutdown()
+    workers = app.config.get('REPORT_CARD_WORKERS') or os.cpu_count() or 1
+    app.extensions['report_cards'] = {'executor': None, 'workers': workers, 'lock': threading.Lock()}
+
+def _executor(pool):
+    with pool['lock']:
+        if pool['executor'] is None:
+            pool['executor'] = ProcessPoolExecutor(max_workers=pool['workers'])
+            atexit.register(pool['executor'].shutdown)
+        return pool['executor']
+
+def load_report_card(student_id, term, attendance_range=None):
+    """Load a student, their class, the term's results with subjects and an attendance summary in one query.
+
+    Returns ``(student, attendance)`` with ``student.results`` holding only the
+    term's results, or ``(None, None)`` if the student does not exist.
+    """
+    attendance_range = attendance_range or term_date_range(term)
+
+    query = db.session.query(Student).outerjoin(
+        Student.class_
+    ).outerjoin(
+        Result, db.and_(Result.student_id == Student.id, Result.term_id == term.id)
+    ).outerjoin(
+        Subject, Subject.id == Result.subject_id
+    ).options(
+        contains_eager(Student.class_),
+        contains_eager(Student.results.of_type(Result)).contains_eager(Result.subject)
+    ).filter(Student.id == student_id)
+
+    if attendance_range:
+        counts = attendance_counts(*attendance_range, [student_id])
+        totals = select(counts.c.student_id, *(
+            db.func.sum(getattr(counts.c, name)).label(name) for name in ROLLUP_COUNTS
+        )).group_by(counts.c.student_id).subquery()
+        query = query.outerjoin(totals, totals.c.student_id == Student.id).add_columns(
+            *(db.func.coalesce(getattr(totals.c, name), 0).label(name) for name in ROLLUP_COUNTS)
+        )
+
+    rows = query.order_by(Subject.name).populate_existing().all()
+    if not rows:
+        return None, None
+
+    if not attendance_range:
+        return rows[0], None
+
+    student, *counts = rows[0]
+    attendance = dict(zip(ROLLUP_COUNTS, counts))
+    attendance['attendance_rate'] = attendance_rate(attendance['present_days'], attendance['total_days'])
+    attendance['start'] = attendance_range[0].isoformat()
+    attendance['end'] = (attendance_range[1] - timedelta(days=1)).isoformat()
+    return student, attendance
+
+def load_class_report_cards(class_id, term, attendance_range=None):
+    """Everything needed to render a class's report cards, as plain picklable objects.
+
+    Uses three queries whatever the class size: students, results with
+    subjects, and (when a date range is given) the attendance report.
+    """
+    students = db.session.query(
+        Student.id, Student.admission_number, Student.first_name, Student.last_name, Class.name.label('class_name')
+    ).outerjoin(Class, Student.class_id == Class.id).filter(
+        Student.class_id == class_id,
+        Student.is_active == True
+    ).order_by(Student.last_name, Student.first_name).all()
+
+    results = {}
+    rows = db.session.query(
+        Result.student_id, Result.marks, Result.grade, Result.remarks, Subject.name.label('subject_name')
+    ).join(Subject, Subject.id == Result.subject_id).join(Student, Student.id == Result.student_id).filter(
+        Student.class_id == class_id,
+        Student.is_active == True,
+        Result.term_id == term.id
+    ).order_by(Subject.name)
+    for row in rows:
+        results.setdefault(row.student_id, []).append(SimpleNamespace(
+            term=SimpleNamespace(name=term.name),
+            subject=SimpleNamespace(name=row.subject_name),
+            marks=row.marks,
+            grade=row.grade,
+            remarks=row.remarks
+        ))
+
+    attendance = {}
+    attendance_range = attendance_range or term_date_range(term)
+    if attendance_range:
+        attendance = {row['student_id']: row for row in attendance_report(*attendance_range, class_id)}
+
+    return [{
+        'filename': report_card_filename(student.admission_number, term.name),
+        'student': SimpleNamespace(
+            first_name=student.first_name,
+            last_name=student.last_name,
+            admission_number=student.admission_number,
+            class_=SimpleNamespace(name=student.class_name) if student.class_name else None
+        ),
+        'results': results.get(student.id, []),
+        'attendance': attendance.get(student.id, EMPTY_ATTENDANCE)
+    } for student in students]
+
+def report_card_filename(admission_number, term_name):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', f'{admission_number}_{term_name}') + '.pdf'
+
+def _render(cards, logo_path):
+    return [
+        (card['filename'], generate_pdf_report_card(card['student'], card['results'], card['attendance'], logo_path))
+        for card in cards
+    ]
+
+def render_report_cards(cards):
+    """Yield ``(filename, pdf_bytes)`` for each card, in completion order, using the app's process pool."""
+    logo_path = school_logo_path()
+    pool = current_app.extensions['report_cards']
+    if pool['workers'] < 2 or len(cards) < 2:
+        yield from _render(cards, logo_path)
+        return
+
+    # Several cards per task keeps pickling overhead low while still streaming steadily
+    size = max(1, min(16, len(cards) // (pool['workers'] * 4)))
+    executor = _executor(pool)
+    futures = [executor.submit(_render, cards[start:start + size], logo_path) for start in range(0, len(cards), size)]
+    for future in as_completed(futures):
+        yield from future.result()
+
+class _ZipSink:
+    # Write-only buffer that zipfile can stream into without seeking
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+def stream_zip(files):
+    """Yield a ZIP archive chunk by chunk as ``(filename, data)`` pairs arrive."""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for filename, data in files:
+            archive.writestr(filename, data)
+            yield sink.drain()
+    yield sink.drain()
+
+def merge_pdfs(documents):
+    merger = PdfFileMerger()
+    for data in documents:
+        merger.append(io.BytesIO(data))
+    output = io.BytesIO()
+    merger.write(output)
+    return output.getvalue()
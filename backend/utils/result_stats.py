@@ -0,0 +1,125 @@
+import math
+import statistics
+from app import db
+from app.models import Result, Student, Subject
+from utils.cache import Cache
+from utils.grading import grade_scale
+from utils.helpers import chunked
+
+PERCENTILES = (10, 25, 50, 75, 90)
+# Bounds how long results written through another worker go unseen
+STATS_TTL = 60
+
+# Keyed by (class_id, term_id); see invalidate_result_stats
+_stats_cache = Cache(ttl=STATS_TTL)
+
+def percentile(sorted_values, q):
+    # Linear interpolation between closest ranks
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def _rankings(rows):
+    students = {}
+    for row in rows:
+        entry = students.setdefault(row.student_id, {
+            'student_id': row.student_id,
+            'admission_number': row.admission_number,
+            'name': f"{row.first_name} {row.last_name}",
+            'subjects': 0,
+            'total_marks': 0
+        })
+        entry['subjects'] += 1
+        entry['total_marks'] += row.marks
+
+    ranked = sorted(students.values(), key=lambda entry: -entry['total_marks'] / entry['subjects'])
+    position = 0
+    previous = None
+    for index, entry in enumerate(ranked, start=1):
+        entry['average_marks'] = round(entry['total_marks'] / entry['subjects'], 2)
+        # Students with the same average share a position (1, 2, 2, 4)
+        if entry['average_marks'] != previous:
+            position = index
+            previous = entry['average_marks']
+        entry['position'] = position
+    return ranked
+
+def _subject_statistics(rows):
+    subjects = {}
+    for row in rows:
+        entry = subjects.setdefault(row.subject_id, {'name': row.subject_name, 'marks': [], 'grades': {}})
+        entry['marks'].append(row.marks)
+        entry['grades'][row.grade] = entry['grades'].get(row.grade, 0) + 1
+
+    grades = list(reversed(grade_scale().grades))
+    statistics_data = []
+    for subject_id, entry in sorted(subjects.items(), key=lambda item: item[1]['name']):
+        marks = sorted(entry['marks'])
+        statistics_data.append({
+            'subject_id': subject_id,
+            'subject_name': entry['name'],
+            'count': len(marks),
+            'mean': round(statistics.fmean(marks), 2),
+            'median': round(statistics.median(marks), 2),
+            'stddev': round(statistics.pstdev(marks), 2),
+            'min': marks[0],
+            'max': marks[-1],
+            'percentiles': {f'p{q}': round(percentile(marks, q), 2) for q in PERCENTILES},
+            'grade_distribution': {
+                grade: entry['grades'].get(grade, 0)
+                for grade in grades + sorted(set(entry['grades']) - set(grades), key=str)
+            }
+        })
+    return statistics_data
+
+def _compute(class_id, term_id):
+    rows = db.session.query(
+        Result.student_id,
+        Result.subject_id,
+        Result.marks,
+        Result.grade,
+        Subject.name.label('subject_name'),
+        Student.admission_number,
+        Student.first_name,
+        Student.last_name
+    ).join(
+        Student, Student.id == Result.student_id
+    ).join(
+        Subject, Subject.id == Result.subject_id
+    ).filter(
+        Student.class_id == class_id,
+        Result.term_id == term_id
+    ).all()
+
+    return {
+        'class_id': class_id,
+        'term_id': term_id,
+        'rankings': _rankings(rows),
+        'subjects': _subject_statistics(rows)
+    }
+
+def class_term_statistics(class_id, term_id):
+    """Positions and per-subject statistics for a class and term, computed from one query.
+
+    Cached for ``STATS_TTL`` seconds; writes through this worker invalidate it at once.
+    """
+    return _stats_cache.get_or_set((class_id, term_id), lambda: _compute(class_id, term_id))
+
+def invalidate_result_stats(class_ids=None, term_ids=None):
+    """Drop cached statistics touching any of ``class_ids`` and ``term_ids`` (None matches all)."""
+    class_ids = None if class_ids is None else set(class_ids)
+    term_ids = None if term_ids is None else set(term_ids)
+    _stats_cache.invalidate_where(lambda key: (class_ids is None or key[0] in class_ids)
+                                  and (term_ids is None or key[1] in term_ids))
+
+def invalidate_for_students(student_ids, term_ids):
+    # Call after committing: a reader that started before the commit may still
+    # return old values, but the cache will not keep them
+    class_ids = set()
+    for chunk in chunked(sorted(set(student_ids)), 500):
+        class_ids.update(
+            row.class_id for row in
+            db.session.query(Student.class_id).filter(Student.id.in_(chunk)).distinct()
+        )
+    invalidate_result_stats(class_ids, term_ids)
@@ -0,0 +1,87 @@
+from sqlalchemy import insert, update
+from app import db
+from app.models import Result, Student
+from utils.grading import grade_scale
+from utils.helpers import chunked
+
+PREFETCH_CHUNK_SIZE = 500
+WRITE_BATCH_SIZE = 1000
+
+def validate_mark_sheet(rows):
+    """Check a mark sheet's rows, returning (entries, errors).
+
+    Entries are ``(student_id, marks, remarks)`` tuples; errors carry the
+    row index so the whole sheet can be corrected and resubmitted.
+    """
+    entries = []
+    errors = []
+    seen = set()
+
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict) or not all(field in row for field in ('student_id', 'marks')):
+            errors.append({'index': index, 'message': 'Missing required fields'})
+            continue
+        try:
+            student_id = int(row['student_id'])
+            marks = float(row['marks'])
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'message': 'student_id and marks must be numbers'})
+            continue
+        if not 0 <= marks <= 100:
+            errors.append({'index': index, 'message': 'Marks must be between 0 and 100'})
+            continue
+        if student_id in seen:
+            errors.append({'index': index, 'message': 'Student appears more than once'})
+            continue
+        seen.add(student_id)
+        entries.append((index, student_id, marks, row.get('remarks')))
+
+    known = set()
+    for chunk in chunked(sorted(seen), PREFETCH_CHUNK_SIZE):
+        known.update(row.id for row in db.session.query(Student.id).filter(Student.id.in_(chunk)))
+    for index, student_id, _, _ in entries:
+        if student_id not in known:
+            errors.append({'index': index, 'message': 'Student not found'})
+
+    entries = [(student_id, marks, remarks) for _, student_id, marks, remarks in entries]
+    return entries, sorted(errors, key=lambda error: error['index'])
+
+def upsert_mark_sheet(term_id, subject_id, entries):
+    """Insert or update one subject's results for a term without committing.
+
+    Existing results are found with a single prefetch per chunk of students
+    and grades are assigned for the whole sheet in one pass.
+    """
+    existing = {}
+    student_ids = [student_id for student_id, _, _ in entries]
+    for chunk in chunked(student_ids, PREFETCH_CHUNK_SIZE):
+        rows = db.session.query(Result.id, Result.student_id).filter(
+            Result.subject_id == subject_id,
+            Result.term_id == term_id,
+            Result.student_id.in_(chunk)
+        )
+        existing.update((row.student_id, row.id) for row in rows)
+
+    grades = grade_scale().grade_all([marks for _, marks, _ in entries])
+
+    inserts = []
+    updates = []
+    for (student_id, marks, remarks), grade in zip(entries, grades):
+        if student_id in existing:
+            updates.append({'id': existing[student_id], 'marks': marks, 'grade': grade, 'remarks': remarks})
+        else:
+            inserts.append({
+                'student_id': student_id,
+                'subject_id': subject_id,
+                'term_id': term_id,
+                'marks': marks,
+                'grade': grade,
+                'remarks': remarks
+            })
+
+    for batch in chunked(inserts, WRITE_BATCH_SIZE):
+        db.session.execute(insert(Result), batch)
+    for batch in chunked(updates, WRITE_BATCH_SIZE):
+        db.session.execute(update(Result), batch)
+
+    return {'created': len(inserts), 'updated': len(updates)}
@@ -0,0 +1,108 @@
+import csv
+from datetime import date
+from sqlalchemy import insert, select
+from app import db
+from app.models import Student, Class
+from utils.fees import sync_fee_balances
+
+IMPORT_BATCH_SIZE = 1000
+REQUIRED_COLUMNS = ('admission_number', 'first_name', 'last_name', 'date_of_birth', 'gender')
+OPTIONAL_COLUMNS = ('address', 'phone', 'email')
+ACTIVE_VALUES = {'1': True, 'true': True, 'yes': True, '0': False, 'false': False, 'no': False}
+
+def _outcome(line, admission_number, outcome, reason=None):
+    return {'line': line, 'admission_number': admission_number, 'outcome': outcome, 'reason': reason}
+
+def _parse_date(value, required=True):
+    value = (value or '').strip()
+    if not value:
+        if required:
+            raise ValueError('Missing required fields')
+        return date.today()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError('Invalid date format. Use YYYY-MM-DD')
+
+def _class_id(row, classes, class_ids):
+    # A class may be given by name (as exported from other systems) or by id
+    name = (row.get('class') or '').strip()
+    if name:
+        class_id = classes.get(name.casefold())
+        if class_id is None:
+            raise ValueError('Unknown class')
+        return class_id
+
+    class_id = (row.get('class_id') or '').strip()
+    if not class_id:
+        return None
+    if not class_id.isdigit() or int(class_id) not in class_ids:
+        raise ValueError('Unknown class')
+    return int(class_id)
+
+def _parse_row(row, classes, class_ids):
+    if not all((row.get(column) or '').strip() for column in REQUIRED_COLUMNS):
+        raise ValueError('Missing required fields')
+
+    is_active = (row.get('is_active') or '').strip().lower()
+    if is_active and is_active not in ACTIVE_VALUES:
+        raise ValueError('is_active must be true or false')
+
+    student = {column: row[column].strip() for column in REQUIRED_COLUMNS}
+    student['date_of_birth'] = _parse_date(row['date_of_birth'])
+    student['admission_date'] = _parse_date(row.get('admission_date'), required=False)
+    student['class_id'] = _class_id(row, classes, class_ids)
+    student['is_active'] = ACTIVE_VALUES.get(is_active, True)
+    for column in OPTIONAL_COLUMNS:
+        student[column] = (row.get(column) or '').strip() or None
+    return student
+
+def _flush(students):
+    if students:
+        db.session.execute(insert(Student), students)
+        sync_fee_balances(select(Student.id).where(
+            Student.admission_number.in_([student['admission_number'] for student in students])
+        ))
+    db.session.commit()
+
+def import_students(lines, batch_size=IMPORT_BATCH_SIZE):
+    """Import students from CSV lines, yielding one outcome per data row.
+
+    Rows are parsed lazily and committed in batches; admission numbers are
+    checked against one prefetched set, which also catches repeats within the
+    file, so no row costs a query of its own.
+    """
+    reader = csv.DictReader(lines)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    taken = {row.admission_number for row in db.session.query(Student.admission_number)}
+    classes = {row.name.casefold(): row.id for row in db.session.query(Class.name, Class.id)}
+    class_ids = set(classes.values())
+
+    students = []
+    outcomes = []
+    for row in reader:
+        line = reader.line_num
+        admission_number = (row.get('admission_number') or '').strip()
+        try:
+            student = _parse_row(row, classes, class_ids)
+        except ValueError as e:
+            outcomes.append(_outcome(line, admission_number, 'error', str(e)))
+        else:
+            if admission_number in taken:
+                outcomes.append(_outcome(line, admission_number, 'duplicate', 'Admission number already exists'))
+            else:
+                taken.add(admission_number)
+                students.append(student)
+                outcomes.append(_outcome(line, admission_number, 'imported'))
+
+        if len(outcomes) >= batch_size:
+            _flush(students)
+            yield from outcomes
+            students = []
+            outcomes = []
+
+    _flush(students)
+    yield from outcomes
@@ -0,0 +1,125 @@
+from datetime import timedelta
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+from app import db
+from app.models import Student, Class, Result, Subject, FeeBalance, Term, AttendanceRollup
+from utils.attendance import ROLLUP_COUNTS, attendance_counts, attendance_rate
+from utils.cache import Cache
+from utils.terms import current_term, term_date_range
+
+PROFILE_TTL = 30
+RECENT_TERMS = 3
+
+# Keyed by student_id; see invalidate_student_profiles
+_profile_cache = Cache(ttl=PROFILE_TTL)
+
+def _attendance_summary(counts):
+    summary = {name: int(value or 0) for name, value in zip(ROLLUP_COUNTS, counts)}
+    summary['attendance_rate'] = attendance_rate(summary['present_days'], summary['total_days'])
+    return summary
+
+def _fee_balances(student_id):
+    rows = db.session.query(
+        FeeBalance.term_id, Term.name, FeeBalance.amount_due, FeeBalance.amount_paid, FeeBalance.balance
+    ).join(Term, Term.id == FeeBalance.term_id).filter(
+        FeeBalance.student_id == student_id
+    ).order_by(Term.start_date, Term.id).all()
+
+    return {
+        'terms': [{
+            'term_id': row.term_id,
+            'term': row.name,
+            'amount_due': row.amount_due,
+            'amount_paid': row.amount_paid,
+            'balance': row.balance
+        } for row in rows],
+        'total_balance': sum(row.balance for row in rows)
+    }
+
+def _attendance(student_id):
+    overall = db.session.query(*(
+        db.func.sum(getattr(AttendanceRollup, name)) for name in ROLLUP_COUNTS
+    )).filter(AttendanceRollup.student_id == student_id).one()
+    attendance = {'overall': _attendance_summary(overall), 'term': None}
+
+    term = current_term()
+    term_range = term_date_range(term)
+    if term_range:
+        counts = attendance_counts(*term_range, [student_id])
+        totals = db.session.execute(select(*(db.func.sum(getattr(counts.c, name)) for name in ROLLUP_COUNTS))).one()
+        attendance['term'] = {
+            'term_id': term.id,
+            'term': term.name,
+            'start': term_range[0].isoformat(),
+            'end': (term_range[1] - timedelta(days=1)).isoformat(),
+            **_attendance_summary(totals)
+        }
+    return attendance
+
+def _recent_results(results):
+    terms = {}
+    for result in results:
+        terms.setdefault(result.term, []).append(result)
+
+    recent = sorted(terms, key=lambda term: (term.start_date is not None, term.start_date, term.id), reverse=True)
+    return [{
+        'term_id': term.id,
+        'term': term.name,
+        'average_marks': round(sum(result.marks for result in terms[term]) / len(terms[term]), 2),
+        'results': [{
+            'subject_id': result.subject_id,
+            'subject_name': result.subject.name,
+            'marks': result.marks,
+            'grade': result.grade,
+            'remarks': result.remarks
+        } for result in sorted(terms[term], key=lambda result: result.subject.name)]
+    } for term in recent[:RECENT_TERMS]]
+
+def _compute(student_id):
+    student = Student.query.options(
+        joinedload(Student.class_).load_only(Class.name),
+        selectinload(Student.results).options(
+            joinedload(Result.subject).load_only(Subject.name),
+            joinedload(Result.term)
+        )
+    ).filter(Student.id == student_id).first()
+    if student is None:
+        return None
+
+    return {
+        'student': {
+            'id': student.id,
+            'admission_number': student.admission_number,
+            'first_name': student.first_name,
+            'last_name': student.last_name,
+            'date_of_birth': student.date_of_birth.isoformat() if student.date_of_birth else None,
+            'gender': student.gender,
+            'address': student.address,
+            'phone': student.phone,
+            'email': student.email,
+            'class_id': student.class_id,
+            'class_name': student.class_.name if student.class_ else None,
+            'admission_date': student.admission_date.isoformat() if student.admission_date else None,
+            'is_active': student.is_active
+        },
+        'fees': _fee_balances(student_id),
+        'attendance': _attendance(student_id),
+        'recent_results': _recent_results(student.results)
+    }
+
+def student_profile(student_id):
+    """A student's details, fee balances, attendance and recent results in a fixed number of queries.
+
+    Cached for ``PROFILE_TTL`` seconds, which bounds how stale names of classes,
+    terms and subjects can be; writes to the student's own rows invalidate it.
+    Returns None if the student does not exist.
+    """
+    return _profile_cache.get_or_set(student_id, lambda: _compute(student_id))
+
+def invalidate_student_profiles(student_ids=None):
+    """Drop cached profiles for ``student_ids`` (None drops all). Call after committing."""
+    if student_ids is None:
+        _profile_cache.clear()
+        return
+    student_ids = set(student_ids)
+    _profile_cache.invalidate_where(lambda key: key in student_ids)
@@ -0,0 +1,82 @@
+import re
+from sqlalchemy import or_
+from app import db
+from app.models import Student, Class
+
+SEARCH_COLUMNS = ('first_name', 'last_name', 'admission_number', 'phone', 'email')
+# bm25 weights, in SEARCH_COLUMNS order: names and admission numbers outrank contact details
+SEARCH_WEIGHTS = (10.0, 10.0, 8.0, 2.0, 2.0)
+# Shorter queries match much of the roster, where scoring every match costs
+# tens of milliseconds for little benefit, so they are returned in id order
+MIN_RANKED_LENGTH = 3
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+def search_terms(text):
+    # Words only, so punctuation in "ADM-0012" or an email address cannot break the MATCH syntax
+    return re.findall(r'\w+', (text or '').lower())
+
+def _fts_search(text, terms, limit, include_inactive):
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    if len(text.strip()) >= MIN_RANKED_LENGTH:
+        order_by = f'lower(s.admission_number) = :exact DESC, bm25(students_fts, {weights}), s.id'
+    else:
+        order_by = 's.id'
+    return db.session.execute(db.text(f"""
+        SELECT s.id, s.admission_number, s.first_name, s.last_name, s.phone, s.email,
+               s.class_id, c.name AS class_name, s.is_active
+        FROM students_fts
+        JOIN students s ON s.id = students_fts.rowid
+        LEFT JOIN classes c ON c.id = s.class_id
+        WHERE students_fts MATCH :query {'' if include_inactive else 'AND s.is_active = 1'}
+        ORDER BY {order_by}
+        LIMIT :limit
+    """), {
+        'query': ' '.join(f'"{term}"*' for term in terms),
+        'exact': text.strip().lower(),
+        'limit': limit
+    }).all()
+
+def _prefix_search(text, terms, limit, include_inactive):
+    # Databases without the FTS index: every word must start one of the columns, as with the
+    # FTS prefix queries. Anchored patterns can use an index (text_pattern_ops on PostgreSQL)
+    query = db.session.query(
+        Student.id, Student.admission_number, Student.first_name, Student.last_name, Student.phone, Student.email,
+        Student.class_id, Class.name.label('class_name'), Student.is_active
+    ).outerjoin(Class, Student.class_id == Class.id)
+    for term in terms:
+        # \w+ words can still contain the LIKE wildcard _
+        pattern = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        query = query.filter(or_(*(
+            getattr(Student, column).ilike(pattern, escape='\\') for column in SEARCH_COLUMNS
+        )))
+    if not include_inactive:
+        query = query.filter(Student.is_active == True)
+    return query.order_by(
+        (db.func.lower(Student.admission_number) == text.strip().lower()).desc(), Student.last_name, Student.first_name
+    ).limit(limit).all()
+
+def search_students(text, limit=DEFAULT_LIMIT, include_inactive=False):
+    """Ranked students whose names, admission number, phone or email start with each word of ``text``."""
+    terms = search_terms(text)
+    if not terms:
+        return []
+
+    search = _fts_search if db.session.get_bind().dialect.name == 'sqlite' else _prefix_search
+    return [{
+        'id': row.id,
+        'admission_number': row.admission_number,
+        'first_name': row.first_name,
+        'last_name': row.last_name,
+        'phone': row.phone,
+        'email': row.email,
+        'class_id': row.class_id,
+        'class_name': row.class_name,
+        'is_active': bool(row.is_active)
+    } for row in search(text, terms, min(limit, MAX_LIMIT), include_inactive)]
+
+def rebuild_student_search():
+    """Repopulate the full-text index from the students table. Does not commit."""
+    if db.session.get_bind().dialect.name == 'sqlite':
+        db.session.execute(db.text("INSERT INTO students_fts (students_fts) VALUES ('rebuild')"))
+    return db.session.query(Student).count()
@@ -0,0 +1,207 @@
+import random
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from sqlalchemy import insert
+from app import db
+from app.models import User, Student, Class, Subject, Term, Fee, FeeStructure, Attendance, Result, Timetable
+from utils.attendance import rebuild_attendance_rollup
+from utils.fees import rebuild_fee_balances
+from utils.grading import grade_scale
+from utils.student_search import rebuild_student_search
+from utils.timetable import DAYS, bump_timetable_version
+
+BATCH_SIZE = 20000
+
+# Name pools; students get one of each, so 60 x 60 distinct names
+FIRST_NAMES = (
+    'Amina', 'Brian', 'Chloe', 'David', 'Esther', 'Faith', 'George', 'Hassan', 'Irene', 'James', 'Kevin', 'Lucy',
+    'Mary', 'Noah', 'Olivia', 'Peter', 'Quincy', 'Ruth', 'Samuel', 'Grace', 'Victor', 'Wanjiru', 'Xavier', 'Yusuf',
+    'Zawadi', 'Abel', 'Beatrice', 'Caleb', 'Diana', 'Elijah', 'Fatuma', 'Gideon', 'Hannah', 'Isaac', 'Joy', 'Kamau',
+    'Lilian', 'Moses', 'Naomi', 'Otieno', 'Purity', 'Rose', 'Stephen', 'Tabitha', 'Umar', 'Vera', 'William', 'Achieng',
+    'Baraka', 'Cynthia', 'Daniel', 'Eunice', 'Felix', 'Gloria', 'Halima', 'Ian', 'Janet', 'Kiprop', 'Linda', 'Mercy'
+)
+LAST_NAMES = (
+    'Achieng', 'Banda', 'Chege', 'Mwangi', 'Otieno', 'Kamau', 'Njoroge', 'Wafula', 'Mutua', 'Omondi', 'Kariuki',
+    'Wanjala', 'Kiptoo', 'Onyango', 'Muthoni', 'Nyambura', 'Odhiambo', 'Kimani', 'Chebet', 'Korir', 'Smith',
+    'Johnson', 'Brown', 'Taylor', 'Wilson', 'Davies', 'Evans', 'Thomas', 'Roberts', 'Walker', 'Wright', 'Hughes',
+    'Green', 'Hall', 'Wood', 'Clarke', 'Jackson', 'Turner', 'Hill', 'Moore', 'Ali', 'Hassan', 'Mohamed', 'Abdi',
+    'Okafor', 'Adeyemi', 'Mensah', 'Boateng', 'Ndlovu', 'Dlamini', 'Moyo', 'Phiri', 'Tembo', 'Zulu', 'Nkosi',
+    'Mbeki', 'Osei', 'Owusu', 'Kato', 'Ssempa'
+)
+SUBJECT_NAMES = (
+    'Mathematics', 'English', 'Science', 'Social Studies', 'Kiswahili', 'Computer Science', 'Art', 'Music',
+    'Physical Education', 'History', 'Geography', 'Biology', 'Chemistry', 'Physics', 'Business Studies', 'French'
+)
+# (month, day) of each term's first and last day
+TERM_DATES = (((1, 8), (4, 5)), ((4, 29), (8, 2)), ((8, 26), (11, 29)))
+# Eight 40-minute periods from 08:00
+PERIODS = [(time(*divmod(480 + 40 * period, 60)), time(*divmod(520 + 40 * period, 60))) for period in range(8)]
+
+def _insert(model, rows):
+    # Core executemany in batches, so neither the ORM nor one huge parameter list is involved
+    rows = iter(rows)
+    count = 0
+    while True:
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            return count
+        db.session.execute(insert(model), batch)
+        count += len(batch)
+
+def _school_days(start, end):
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+def _terms(count, end_year):
+    # The last ``count`` terms up to and including the third term of ``end_year``
+    years = -(-count // len(TERM_DATES))
+    terms = [
+        (f'Term {number} {year}', date(year, *start), date(year, *end))
+        for year in range(end_year - years + 1, end_year + 1)
+        for number, (start, end) in enumerate(TERM_DATES, start=1)
+    ]
+    return terms[-count:]
+
+def generate_school_data(schools=1, classes=12, students=5000, subjects=10, terms=10, attendance_years=1,
+                         end_year=None, seed=0):
+    """Fill an empty database with synthetic but plausible school records, without committing.
+
+    The schema has a single school, so ``schools`` repeats the ``classes``
+    (and their teachers) under a per-school prefix. Every student has a
+    result for every subject in every term and an attendance row for every
+    school day of the last ``attendance_years`` years of terms. Apart from
+    the salted password hash the output depends only on the arguments;
+    ``end_year`` defaults to this year.
+    Returns the number of rows written per table.
+    """
+    rng = random.Random(seed)
+    end_year = end_year or date.today().year
+    subjects = min(subjects, len(SUBJECT_NAMES))
+    counts = {}
+
+    # One bcrypt hash shared by every account; hashing per teacher would dominate small runs
+    created_at = datetime(end_year, 1, 1)
+    admin = User(username='admin', email='admin@school.com', role='admin', is_active=True, created_at=created_at)
+    admin.set_password('admin123')
+    db.session.add(admin)
+    db.session.flush()
+    teachers_per_school = classes + 4
+    counts['users'] = 1 + _insert(User, ({
+        'username': f'teacher{index}',
+        'email': f'teacher{index}@school.com',
+        'password_hash': admin.password_hash,
+        'role': 'teacher',
+        'is_active': True,
+        'created_at': created_at
+    } for index in range(1, schools * teachers_per_school + 1)))
+    teacher_ids = [row.id for row in db.session.query(User.id).filter(User.role == 'teacher').order_by(User.id)]
+
+    counts['classes'] = _insert(Class, ({
+        'name': f'School {school + 1} Grade {grade + 1}' if schools > 1 else f'Grade {grade + 1}',
+        'teacher_id': teacher_ids[school * teachers_per_school + grade]
+    } for school in range(schools) for grade in range(classes)))
+    class_ids = [row.id for row in db.session.query(Class.id).order_by(Class.id)]
+
+    counts['subjects'] = _insert(Subject, ({
+        'name': name, 'code': ''.join(word[:3] for word in name.upper().split())[:10]
+    } for name in SUBJECT_NAMES[:subjects]))
+    subject_ids = [row.id for row in db.session.query(Subject.id).order_by(Subject.id)]
+
+    counts['terms'] = _insert(Term, ({'name': name, 'start_date': start, 'end_date': end}
+                                     for name, start, end in _terms(terms, end_year)))
+    term_rows = db.session.query(Term.id, Term.start_date, Term.end_date).order_by(Term.start_date).all()
+
+    # Grade level drives the age and fee of each class
+    grade_of = {class_id: index % classes for index, class_id in enumerate(class_ids)}
+    student_classes = [class_ids[rng.randrange(len(class_ids))] for _ in range(students)]
+    counts['students'] = _insert(Student, ({
+        'admission_number': f'SYN-{index:07d}',
+        'first_name': FIRST_NAMES[rng.randrange(len(FIRST_NAMES))],
+        'last_name': LAST_NAMES[rng.randrange(len(LAST_NAMES))],
+        'date_of_birth': date(end_year - 6 - grade_of[class_id], 1, 1) + timedelta(days=rng.randrange(365)),
+        'gender': 'Female' if rng.random() < 0.5 else 'Male',
+        'phone': f'07{rng.randrange(10 ** 8):08d}',
+        'class_id': class_id,
+        'admission_date': date(end_year - grade_of[class_id], 1, 8),
+        'is_active': rng.random() < 0.97
+    } for index, class_id in enumerate(student_classes, start=1)))
+    student_ids = [row.id for row in db.session.query(Student.id).order_by(Student.id)]
+    students = list(zip(student_ids, student_classes))
+
+    counts['fee_structures'] = _insert(FeeStructure, ({
+        'class_id': class_id, 'term_id': term_id, 'amount': 15000 + 1000 * grade_of[class_id]
+    } for class_id in class_ids for term_id, _, _ in term_rows))
+
+    def fees():
+        receipt = 0
+        for term_id, start, end in term_rows:
+            for student_id, class_id in students:
+                due = 15000 + 1000 * grade_of[class_id]
+                # Most pay in full in one or two instalments; some pay part or nothing
+                share = rng.choice((1, 1, 1, 1, 0.5, 0.5, 0.25, 0))
+                instalments = [due * share] if share < 1 or rng.random() < 0.6 else [due / 2, due / 2]
+                for amount in instalments:
+                    if amount:
+                        receipt += 1
+                        yield {
+                            'student_id': student_id,
+                            'amount': amount,
+                            'payment_date': start + timedelta(days=rng.randrange((end - start).days + 1)),
+                            'term_id': term_id,
+                            'payment_method': rng.choice(('Cash', 'Bank Transfer', 'Mobile Money')),
+                            'receipt_number': f'SYN-RCP-{receipt:08d}'
+                        }
+    counts['fees'] = _insert(Fee, fees())
+
+    def attendance():
+        since = date(end_year - attendance_years + 1, 1, 1)
+        days = [day for _, start, end in term_rows if start >= since for day in _school_days(start, end)]
+        for student_id, _ in students:
+            absent = rng.uniform(0.02, 0.15)
+            late = absent + rng.uniform(0.01, 0.05)
+            for day in days:
+                draw = rng.random()
+                yield {
+                    'student_id': student_id,
+                    'date': day,
+                    'status': 'absent' if draw < absent else 'late' if draw < late else 'present'
+                }
+    counts['attendances'] = _insert(Attendance, attendance())
+
+    grades = grade_scale().grade_all(range(101))
+    def results():
+        ability = {student_id: rng.gauss(62, 10) for student_id, _ in students}
+        difficulty = {subject_id: rng.gauss(0, 5) for subject_id in subject_ids}
+        for term_id, _, _ in term_rows:
+            for student_id, _ in students:
+                for subject_id in subject_ids:
+                    marks = min(100, max(0, round(rng.gauss(ability[student_id] + difficulty[subject_id], 9))))
+                    yield {
+                        'student_id': student_id,
+                        'subject_id': subject_id,
+                        'term_id': term_id,
+                        'marks': marks,
+                        'grade': grades[marks]
+                    }
+    counts['results'] = _insert(Result, results())
+
+    # Teachers rotate across their school's classes so nobody is booked twice in a period
+    counts['timetable'] = _insert(Timetable, ({
+        'class_id': class_ids[school * classes + grade],
+        'subject_id': subject_ids[(grade + period) % len(subject_ids)],
+        'teacher_id': teacher_ids[school * teachers_per_school + (grade + period + day) % teachers_per_school],
+        'room': f'Room {grade + 1}' if schools == 1 else f'S{school + 1} Room {grade + 1}',
+        'day_of_week': day_name,
+        'start_time': start,
+        'end_time': end
+    } for school in range(schools) for grade in range(classes)
+        for day, day_name in enumerate(DAYS[:5]) for period, (start, end) in enumerate(PERIODS)))
+    bump_timetable_version()
+
+    counts['fee_balances'] = rebuild_fee_balances()
+    counts['attendance_rollups'] = rebuild_attendance_rollup()
+    rebuild_student_search()
+    return counts
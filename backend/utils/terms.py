@@ -0,0 +1,29 @@
+from datetime import date, timedelta
+from app import db
+from app.models import Term
+
+def find_term(value):
+    """Look up a term by id or by name like "Term 1 2023", or None if there is no such term."""
+    if value is None or str(value).strip() == '':
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return db.session.get(Term, int(value))
+    return Term.query.filter_by(name=value).first()
+
+def requested_term(data):
+    # Requests may name a term by ``term_id`` or, as before terms had ids, by ``term``
+    return find_term(data.get('term_id') or data.get('term'))
+
+def current_term(on=None):
+    """The term in progress on ``on`` (default today), or else the last one to have started."""
+    return Term.query.filter(Term.start_date <= (on or date.today())).order_by(Term.start_date.desc()).first()
+
+def term_date_range(term):
+    """Half-open [start, end) dates for a term, or None if its dates are not set."""
+    if term is None or not (term.start_date and term.end_date):
+        return None
+    return term.start_date, term.end_date + timedelta(days=1)
+
+def term_ids_by_name():
+    return {row.name: row.id for row in db.session.query(Term.name, Term.id)}
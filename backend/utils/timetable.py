@@ -0,0 +1,399 @@
+import hashlib
+import threading
+from datetime import time
+from bisect import bisect_left, insort
+from collections import namedtuple
+from sqlalchemy import insert, update, delete
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import Timetable, TimetableVersion, Class, Subject, User
+from utils.helpers import validate_time
+
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+# Weekly occupancy bitsets have one bit per SLOT_MINUTES of each day
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+def minutes(value):
+    return value.hour * 60 + value.minute
+
+class Slot(namedtuple('Slot', 'id class_id subject_id teacher_id room day_of_week start end')):
+    """A timetable entry as the index sees it, with times in minutes since midnight."""
+
+    @property
+    def mask(self):
+        return occupancy_mask(self.day_of_week, self.start, self.end)
+
+    @classmethod
+    def from_entry(cls, entry):
+        return cls(entry.id, entry.class_id, entry.subject_id, entry.teacher_id, entry.room,
+                   entry.day_of_week, minutes(entry.start_time), minutes(entry.end_time))
+
+    def dimensions(self):
+        # Everything that can only be in one place at a time
+        yield 'class', self.class_id
+        if self.teacher_id is not None:
+            yield 'teacher', self.teacher_id
+        if self.room:
+            yield 'room', self.room
+
+def occupancy_mask(day_of_week, start, end):
+    """Bits covering [start, end) minutes on ``day_of_week``, widened to whole slots."""
+    first, last = start // SLOT_MINUTES, -(-end // SLOT_MINUTES)
+    return ((1 << (last - first)) - 1) << (DAYS.index(day_of_week) * SLOTS_PER_DAY + first)
+
+def _optional_id(value):
+    return None if value in (None, '') else int(value)
+
+def parse_slot(data, current=None):
+    """Validate a timetable entry from request data, raising ValueError with the reason.
+
+    With ``current`` (the entry's existing Slot) fields missing from ``data``
+    keep their current values, as for a partial update.
+    """
+    if current is None:
+        required_fields = ['class_id', 'subject_id', 'day_of_week', 'start_time', 'end_time']
+        if not isinstance(data, dict) or not all(field in data for field in required_fields):
+            raise ValueError('Missing required fields')
+        current = Slot(None, None, None, None, None, None, None, None)
+
+    try:
+        class_id = int(data['class_id']) if 'class_id' in data else current.class_id
+        subject_id = int(data['subject_id']) if 'subject_id' in data else current.subject_id
+        teacher_id = _optional_id(data['teacher_id']) if 'teacher_id' in data else current.teacher_id
+    except (TypeError, ValueError):
+        raise ValueError('class_id, subject_id and teacher_id must be numbers')
+
+    start, end = current.start, current.end
+    if 'start_time' in data or 'end_time' in data:
+        start_time = validate_time(str(data['start_time'])) if 'start_time' in data else None
+        end_time = validate_time(str(data['end_time'])) if 'end_time' in data else None
+        if ('start_time' in data and start_time is None) or ('end_time' in data and end_time is None):
+            raise ValueError('Invalid time format. Use HH:MM')
+        start = minutes(start_time) if start_time else start
+        end = minutes(end_time) if end_time else end
+    if start >= end:
+        raise ValueError('End time must be after start time')
+
+    day_of_week = data.get('day_of_week', current.day_of_week)
+    if day_of_week not in DAYS:
+        raise ValueError(f"day_of_week must be one of {', '.join(DAYS)}")
+
+    room = data['room'] if 'room' in data else current.room
+    room = str(room).strip() or None if room is not None else None
+    return Slot(current.id, class_id, subject_id, teacher_id, room, day_of_week, start, end)
+
+def slot_values(slot):
+    # Column values for a Timetable row
+    return {
+        'class_id': slot.class_id,
+        'subject_id': slot.subject_id,
+        'teacher_id': slot.teacher_id,
+        'room': slot.room,
+        'day_of_week': slot.day_of_week,
+        'start_time': time(slot.start // 60, slot.start % 60),
+        'end_time': time(slot.end // 60, slot.end % 60)
+    }
+
+class _DayIntervals:
+    """One class, teacher or room's intervals on one day, sorted by start."""
+
+    __slots__ = ('intervals', 'longest')
+
+    def __init__(self):
+        self.intervals = []
+        # Never shrinks on removal; an upper bound is all overlapping() needs
+        self.longest = 0
+
+    def add(self, slot):
+        insort(self.intervals, (slot.start, slot.end, slot.id))
+        self.longest = max(self.longest, slot.end - slot.start)
+
+    def remove(self, slot):
+        index = bisect_left(self.intervals, (slot.start, slot.end, slot.id))
+        if index < len(self.intervals) and self.intervals[index][2] == slot.id:
+            del self.intervals[index]
+
+    def overlapping(self, start, end):
+        # An overlapping interval starts before ``end`` and, being at most ``longest``
+        # long, no earlier than ``start - longest``; existing clashes are tolerated
+        low = bisect_left(self.intervals, (start - self.longest,))
+        high = bisect_left(self.intervals, (end,))
+        return [entry_id for _, interval_end, entry_id in self.intervals[low:high] if interval_end > start]
+
+def timetable_version():
+    """The shared timetable version: how many timetable writes have been committed, by any worker."""
+    return db.session.query(TimetableVersion.version).scalar() or 0
+
+def timetable_etag(version, *parts):
+    """A strong ETag for a response determined by the shared timetable ``version`` and ``parts``.
+
+    The version lives in the database, so every worker hands out the same
+    ETag for the same data.
+    """
+    token = ':'.join(str(part) for part in (version, *parts))
+    return hashlib.sha256(token.encode()).hexdigest()[:32]
+
+def bump_timetable_version():
+    """Advance the shared version in the current transaction and return the new value.
+
+    Every write to the timetable table must do this before committing, or
+    other workers' indexes never see it. The version row stays locked until
+    the transaction ends.
+    """
+    db.session.execute(update(TimetableVersion).values(version=TimetableVersion.version + 1))
+    return timetable_version()
+
+class TimetableIndex:
+    """Per-day interval lists and weekly occupancy bitsets for every class, teacher and room.
+
+    Mirrors the timetable table as of ``version``, the shared counter that
+    every timetable write advances in its own transaction (see
+    ``begin_write``). ``sync`` reloads the index when a write from another
+    worker has moved the counter on; this worker's writes are applied in place
+    by ``add``, ``remove`` and ``reload_classes`` after committing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.version = None
+        self._slots = None
+        self._days = {}
+        self._members = {}
+        self._occupancy = {}
+
+    def _load(self, version=None):
+        # The version is read before the rows: a write committed in between is then
+        # already in the rows but not the version, which only costs another reload
+        self.version = timetable_version() if version is None else version
+        self._slots = {}
+        self._days = {}
+        self._members = {}
+        self._occupancy = {}
+        for row in db.session.query(
+            Timetable.id, Timetable.class_id, Timetable.subject_id, Timetable.teacher_id,
+            Timetable.room, Timetable.day_of_week, Timetable.start_time, Timetable.end_time
+        ):
+            self._add(Slot.from_entry(row))
+
+    def _ensure_loaded(self):
+        if self._slots is None:
+            self._load()
+
+    def _add(self, slot):
+        self._slots[slot.id] = slot
+        mask = slot.mask
+        for dimension in slot.dimensions():
+            self._days.setdefault((*dimension, slot.day_of_week), _DayIntervals()).add(slot)
+            self._members.setdefault(dimension, set()).add(slot.id)
+            self._occupancy[dimension] = self._occupancy.get(dimension, 0) | mask
+
+    def _remove(self, entry_id):
+        slot = self._slots.pop(entry_id, None)
+        if slot is not None:
+            for dimension in slot.dimensions():
+                self._days[(*dimension, slot.day_of_week)].remove(slot)
+                # Rebuilt from the remaining entries, which may overlap the removed one
+                members = self._members[dimension]
+                members.discard(entry_id)
+                occupancy = 0
+                for member in members:
+                    occupancy |= self._slots[member].mask
+                self._occupancy[dimension] = occupancy
+
+    def sync(self, version=None):
+        """Reload unless the index already reflects ``version`` (by default the shared one); returns it."""
+        if version is None:
+            version = timetable_version()
+        with self._lock:
+            if self._slots is None or self.version != version:
+                self._load(version)
+        return version
+
+    def begin_write(self):
+        """Advance the shared version in the current transaction and sync to the one before it.
+
+        The UPDATE locks the version row until the transaction ends, so
+        timetable writes run one at a time and conflicts checked after this
+        call see every committed entry; none can be added before this commit.
+        Returns the version the write commits as, for ``add``, ``remove`` or
+        ``reload_classes`` once committed.
+        """
+        version = bump_timetable_version()
+        self.sync(version - 1)
+        return version
+
+    def conflicts(self, slot, ignore=(), ignore_classes=()):
+        """Every (dimension, existing slot) clashing with ``slot``.
+
+        Skips ``slot.id`` itself, the ids in ``ignore`` and entries of ``ignore_classes``.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            clashes = []
+            for dimension, key in slot.dimensions():
+                intervals = self._days.get((dimension, key, slot.day_of_week))
+                if intervals is None:
+                    continue
+                for entry_id in intervals.overlapping(slot.start, slot.end):
+                    existing = self._slots[entry_id]
+                    if entry_id != slot.id and entry_id not in ignore and existing.class_id not in ignore_classes:
+                        clashes.append((dimension, existing))
+            return clashes
+
+    def free(self, dimension, keys, day_of_week, start, end):
+        """The ``keys`` (teacher or class ids) with nothing booked in [start, end) on ``day_of_week``.
+
+        The bitsets settle most keys with one AND; a hit may only share a
+        partly used 5-minute slot, so hits are confirmed against the intervals.
+        Call ``sync`` first in each request, so the bitsets include other workers' writes.
+        """
+        mask = occupancy_mask(day_of_week, start, end)
+        with self._lock:
+            self._ensure_loaded()
+            return [
+                key for key in keys
+                if not self._occupancy.get((dimension, key), 0) & mask
+                or not any(self._days[dimension, key, day_of_week].overlapping(start, end))
+            ]
+
+    def day_slots(self, dimension, key, day_of_week):
+        """The entries booked for a teacher, class or room on one day, in start order."""
+        with self._lock:
+            self._ensure_loaded()
+            intervals = self._days.get((dimension, key, day_of_week))
+            return [self._slots[entry_id] for _, _, entry_id in intervals.intervals] if intervals else []
+
+    def week_slots(self, dimension, key):
+        """``(version, slots)``, the entries booked for a teacher, class or room in day and start order."""
+        with self._lock:
+            self._ensure_loaded()
+            slots = []
+            for day_of_week in DAYS:
+                intervals = self._days.get((dimension, key, day_of_week))
+                if intervals:
+                    slots.extend(self._slots[entry_id] for _, _, entry_id in intervals.intervals)
+            return self.version, slots
+
+    def _applies(self, version):
+        # Whether a write committed as ``version`` can be applied in place; if the index
+        # is not exactly one write behind it is dropped and reloaded on next use
+        if self._slots is not None and self.version == version - 1:
+            self.version = version
+            return True
+        if self.version != version:
+            self._reset()
+        return False
+
+    def add(self, version, *entries):
+        with self._lock:
+            if self._applies(version):
+                for entry in entries:
+                    self._remove(entry.id)
+                    self._add(Slot.from_entry(entry))
+
+    def remove(self, version, *entry_ids):
+        with self._lock:
+            if self._applies(version):
+                for entry_id in entry_ids:
+                    self._remove(entry_id)
+
+    def reload_classes(self, version, class_ids, replaced_ids):
+        """Swap ``replaced_ids`` for the committed entries of ``class_ids``, after a bulk replace."""
+        entries = db.session.query(
+            Timetable.id, Timetable.class_id, Timetable.subject_id, Timetable.teacher_id,
+            Timetable.room, Timetable.day_of_week, Timetable.start_time, Timetable.end_time
+        ).filter(Timetable.class_id.in_(class_ids)).all()
+        with self._lock:
+            if self._applies(version):
+                for entry_id in replaced_ids:
+                    self._remove(entry_id)
+                for entry in entries:
+                    self._add(Slot.from_entry(entry))
+
+    def invalidate(self):
+        with self._lock:
+            self._reset()
+
+timetable_index = TimetableIndex()
+
+def format_minutes(value):
+    return f'{value // 60:02d}:{value % 60:02d}'
+
+def describe_conflicts(clashes):
+    """Conflict report entries for ``(dimension, slot)`` pairs, with names from one query."""
+    entries = {
+        entry.id: entry for entry in db.session.query(Timetable).options(
+            joinedload(Timetable.class_).load_only(Class.name),
+            joinedload(Timetable.subject).load_only(Subject.name),
+            joinedload(Timetable.teacher).load_only(User.username)
+        ).filter(Timetable.id.in_({slot.id for _, slot in clashes}))
+    } if clashes else {}
+
+    report = []
+    for dimension, slot in clashes:
+        entry = entries.get(slot.id)
+        report.append({
+            'dimension': dimension,
+            'entry_id': slot.id,
+            'class_id': slot.class_id,
+            'class_name': entry.class_.name if entry and entry.class_ else None,
+            'subject': entry.subject.name if entry and entry.subject else None,
+            'teacher_id': slot.teacher_id,
+            'teacher': entry.teacher.username if entry and entry.teacher else None,
+            'room': slot.room,
+            'day_of_week': slot.day_of_week,
+            'time': f'{format_minutes(slot.start)}-{format_minutes(slot.end)}'
+        })
+    return report
+
+def _overlaps(slots):
+    # Sweep each (dimension, key, day) group in start order, keeping the intervals still
+    # open; each new interval clashes with every one of them, so all pairs are found
+    groups = {}
+    for index, slot in enumerate(slots):
+        for dimension in slot.dimensions():
+            groups.setdefault((*dimension, slot.day_of_week), []).append(index)
+
+    for (dimension, _, day_of_week), indexes in groups.items():
+        indexes.sort(key=lambda index: (slots[index].start, slots[index].end))
+        open_intervals = []
+        for index in indexes:
+            open_intervals = [other for other in open_intervals if slots[other].end > slots[index].start]
+            for other in open_intervals:
+                yield dimension, other, index
+            open_intervals.append(index)
+
+def timetable_conflicts(slots, class_ids=()):
+    """Every clash among ``slots`` and between them and entries of classes other than ``class_ids``.
+
+    Entries are referred to by their position in ``slots``.
+    """
+    conflicts = [{
+        'dimension': dimension,
+        'entries': [first, second],
+        'day_of_week': slots[second].day_of_week,
+        'times': [f'{format_minutes(slots[index].start)}-{format_minutes(slots[index].end)}' for index in (first, second)]
+    } for dimension, first, second in _overlaps(slots)]
+
+    class_ids = set(class_ids)
+    clashes = [(index, clash) for index, slot in enumerate(slots)
+               for clash in timetable_index.conflicts(slot, ignore_classes=class_ids)]
+    for (index, _), existing in zip(clashes, describe_conflicts([clash for _, clash in clashes])):
+        conflicts.append({'dimension': existing.pop('dimension'), 'entries': [index], 'existing': existing})
+    return conflicts
+
+def replace_timetable(class_ids, slots):
+    """Replace every entry of ``class_ids`` with ``slots`` without committing; returns the replaced ids.
+
+    Call after ``timetable_index.begin_write``, and after committing pass its
+    version and both of these to ``timetable_index.reload_classes``.
+    """
+    replaced_ids = [row.id for row in db.session.query(Timetable.id).filter(Timetable.class_id.in_(class_ids))]
+    db.session.execute(delete(Timetable).where(Timetable.class_id.in_(class_ids)))
+    if slots:
+        db.session.execute(insert(Timetable), [slot_values(slot) for slot in slots])
+    return replaced_ids
@@ -0,0 +1,157 @@
+import hashlib
+import json
+from collections import namedtuple
+from datetime import date, timedelta
+from app import db
+from app.models import Timetable, Class, Subject, User
+from utils.cache import Cache
+from utils.terms import current_term
+from utils.timetable import DAYS, format_minutes, timetable_index
+
+# Bounds how stale the term dates in ICS feeds can be; timetable writes, from any worker, are seen at once
+FEED_TTL = 300
+SCHOOL_DAYS = DAYS[:5]
+
+Feed = namedtuple('Feed', 'version etag body')
+
+# Keyed by (kind, id, format); see timetable_feed
+_feed_cache = Cache(ttl=FEED_TTL)
+
+def _owner_name(kind, key):
+    if kind == 'class':
+        return db.session.query(Class.name).filter(Class.id == key).scalar()
+    return db.session.query(User.username).filter(User.id == key, User.role == 'teacher').scalar()
+
+def _entries(slots):
+    # Slots with class, subject and teacher names, from one query
+    names = {row.id: row for row in db.session.query(
+        Timetable.id, Class.name.label('class_name'), Subject.name.label('subject_name'),
+        User.username.label('teacher_name')
+    ).outerjoin(Class, Class.id == Timetable.class_id).outerjoin(
+        Subject, Subject.id == Timetable.subject_id
+    ).outerjoin(User, User.id == Timetable.teacher_id).filter(
+        Timetable.id.in_([slot.id for slot in slots])
+    )} if slots else {}
+
+    return [{
+        'entry_id': slot.id,
+        'day_of_week': slot.day_of_week,
+        'start_time': format_minutes(slot.start),
+        'end_time': format_minutes(slot.end),
+        'class_id': slot.class_id,
+        'class_name': names[slot.id].class_name if slot.id in names else None,
+        'subject_id': slot.subject_id,
+        'subject_name': names[slot.id].subject_name if slot.id in names else None,
+        'teacher_id': slot.teacher_id,
+        'teacher_name': names[slot.id].teacher_name if slot.id in names else None,
+        'room': slot.room
+    } for slot in slots]
+
+def weekly_grid(kind, key, name, entries):
+    # School days are always present so clients can lay out fixed columns
+    periods = sorted({(entry['start_time'], entry['end_time']) for entry in entries})
+    return {
+        'kind': kind,
+        'id': key,
+        'name': name,
+        'periods': [{'start_time': start, 'end_time': end} for start, end in periods],
+        'days': [{
+            'day_of_week': day_of_week,
+            'entries': [entry for entry in entries if entry['day_of_week'] == day_of_week]
+        } for day_of_week in DAYS if day_of_week in SCHOOL_DAYS or any(
+            entry['day_of_week'] == day_of_week for entry in entries
+        )]
+    }
+
+def _ics_text(value):
+    return str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+def _ics_line(line):
+    # Folded to 75 octets as RFC 5545 asks, never splitting a UTF-8 sequence
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line
+    parts, current = [], ''
+    for char in line:
+        if len((current + char).encode()) > (75 if not parts else 74):
+            parts.append(current)
+            current = ''
+        current += char
+    parts.append(current)
+    return '\r\n '.join(parts)
+
+def _ics_time(day, value):
+    return f'{day:%Y%m%d}T{value.replace(":", "")}00'
+
+def ics_calendar(name, entries, term=None):
+    """A weekly recurring VEVENT per entry, bounded by ``term`` when it has dates.
+
+    Times are floating (local to the school), so the output depends only on its inputs.
+    """
+    if term is not None and term.start_date and term.end_date:
+        first_day, until = term.start_date, term.end_date
+    else:
+        today = date.today()
+        first_day, until = today - timedelta(days=today.weekday()), None
+
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//School Management System//Timetable//EN',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{_ics_text(name)} timetable'
+    ]
+    for entry in entries:
+        day = first_day + timedelta(days=(DAYS.index(entry['day_of_week']) - first_day.weekday()) % 7)
+        rule = 'FREQ=WEEKLY' + (f';UNTIL={until:%Y%m%d}T235959' if until else '')
+        summary = entry['subject_name'] or 'Lesson'
+        if entry['class_name']:
+            summary += f" ({entry['class_name']})"
+        lines += [
+            'BEGIN:VEVENT',
+            f"UID:timetable-{entry['entry_id']}@school-management-system",
+            f"DTSTAMP:{first_day:%Y%m%d}T000000Z",
+            f"DTSTART:{_ics_time(day, entry['start_time'])}",
+            f"DTEND:{_ics_time(day, entry['end_time'])}",
+            f'RRULE:{rule}',
+            f'SUMMARY:{_ics_text(summary)}'
+        ]
+        if entry['room']:
+            lines.append(f"LOCATION:{_ics_text(entry['room'])}")
+        if entry['teacher_name']:
+            lines.append(f"DESCRIPTION:{_ics_text('Teacher: ' + entry['teacher_name'])}")
+        lines.append('END:VEVENT')
+    lines.append('END:VCALENDAR')
+    return ''.join(_ics_line(line) + '\r\n' for line in lines)
+
+def _render(kind, key, format):
+    version, slots = timetable_index.week_slots(kind, key)
+    name = _owner_name(kind, key)
+    if name is None:
+        return Feed(version, None, None)
+
+    entries = _entries(slots)
+    if format == 'ics':
+        body = ics_calendar(name, entries, current_term())
+    else:
+        body = json.dumps(weekly_grid(kind, key, name, entries), sort_keys=True)
+    return Feed(version, hashlib.sha256(body.encode()).hexdigest()[:32], body)
+
+def timetable_feed(kind, key, format='json'):
+    """The weekly grid (``json``) or iCalendar (``ics``) feed for a class or teacher.
+
+    Rendered once per shared timetable version and hashed into a strong
+    ETag, so polls between writes cost one query for the version. The body
+    is None when there is no such class or teacher.
+    """
+    version = timetable_index.sync()
+    cache_key = (kind, key, format)
+    feed = _feed_cache.get_or_set(cache_key, lambda: _render(kind, key, format))
+    if feed.version != version:
+        _feed_cache.invalidate(cache_key)
+        feed = _feed_cache.get_or_set(cache_key, lambda: _render(kind, key, format))
+    return feed
+
+def invalidate_timetable_feeds():
+    """Drop every rendered feed, for when the timetable database itself is replaced."""
+    _feed_cache.clear()
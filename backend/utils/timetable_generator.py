@@ -0,0 +1,332 @@
+import math
+import random
+import time
+from collections import namedtuple
+from app import db
+from app.models import Timetable
+from utils.helpers import validate_time
+from utils.timetable import DAYS, Slot, minutes
+
+Lesson = namedtuple('Lesson', 'class_id subject_id teacher_id periods')
+
+# A clash outweighs any amount of subject bunching
+HARD = 1000
+TABU_TENURE = 10
+RANDOM_MOVE_RATE = 0.02
+# Non-improving steps per lesson period before spreading gives up
+SPREAD_PATIENCE = 2
+DEFAULT_TIME_LIMIT = 10
+MAX_TIME_LIMIT = 60
+
+def _window(item):
+    start = validate_time(str(item.get('start_time'))) if isinstance(item, dict) else None
+    end = validate_time(str(item.get('end_time'))) if isinstance(item, dict) else None
+    if start is None or end is None or start >= end:
+        raise ValueError('Periods, breaks and unavailable times need start_time before end_time, as HH:MM')
+    return minutes(start), minutes(end)
+
+def parse_generator_request(data):
+    """Validate a generator request, raising ValueError with the reason.
+
+    Breaks apply to the whole school, so periods overlapping one are dropped;
+    ``unavailable`` becomes ``{teacher_id: [(day, start, end), ...]}``.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('lessons'), list) or not isinstance(data.get('periods'), list):
+        raise ValueError('Expected lessons and periods arrays')
+
+    days = data.get('days', list(DAYS[:5]))
+    if not isinstance(days, list) or not days or any(day not in DAYS for day in days):
+        raise ValueError(f"days must be a list of {', '.join(DAYS)}")
+
+    breaks = [_window(item) for item in data.get('breaks', [])]
+    periods = sorted(
+        period for period in map(_window, data['periods'])
+        if not any(start < period[1] and period[0] < end for start, end in breaks)
+    )
+    if not periods:
+        raise ValueError('No teaching periods outside breaks')
+
+    try:
+        lessons = [Lesson(
+            int(item['class_id']),
+            int(item['subject_id']),
+            None if item.get('teacher_id') is None else int(item['teacher_id']),
+            int(item['periods_per_week'])
+        ) for item in data['lessons']]
+    except (KeyError, TypeError, ValueError, AttributeError):
+        raise ValueError('Lessons need numeric class_id, subject_id, teacher_id and periods_per_week')
+    if not lessons or any(lesson.periods < 1 for lesson in lessons):
+        raise ValueError('Expected lessons with a positive periods_per_week')
+
+    unavailable = {}
+    for item in data.get('unavailable', []):
+        if not isinstance(item, dict) or not str(item.get('teacher_id', '')).isdigit():
+            raise ValueError('Unavailable times need a teacher_id')
+        if item.get('day_of_week') not in DAYS:
+            raise ValueError(f"day_of_week must be one of {', '.join(DAYS)}")
+        unavailable.setdefault(int(item['teacher_id']), []).append((item['day_of_week'], *_window(item)))
+
+    try:
+        seed = int(data.get('seed', 0))
+        time_limit = float(data.get('time_limit', DEFAULT_TIME_LIMIT))
+    except (TypeError, ValueError):
+        raise ValueError('seed and time_limit must be numbers')
+    if not 0 < time_limit <= MAX_TIME_LIMIT:
+        raise ValueError(f'time_limit must be more than 0 and at most {MAX_TIME_LIMIT} seconds')
+
+    return {
+        'lessons': lessons,
+        'days': days,
+        'periods': periods,
+        'unavailable': unavailable,
+        'seed': seed,
+        'time_limit': time_limit,
+        'dry_run': bool(data.get('dry_run'))
+    }
+
+def teacher_bookings(teacher_ids, class_ids):
+    """``{teacher_id: [(day, start, end), ...]}`` for the teachers' entries outside ``class_ids``."""
+    bookings = {}
+    if teacher_ids:
+        for entry in db.session.query(
+            Timetable.teacher_id, Timetable.day_of_week, Timetable.start_time, Timetable.end_time
+        ).filter(Timetable.teacher_id.in_(teacher_ids), Timetable.class_id.notin_(class_ids)):
+            bookings.setdefault(entry.teacher_id, []).append(
+                (entry.day_of_week, minutes(entry.start_time), minutes(entry.end_time))
+            )
+    return bookings
+
+def blocked_slots(windows, days, periods):
+    """Weekly slot numbers (day index * len(periods) + period index) overlapping any ``(day, start, end)`` window."""
+    blocked = set()
+    for day, start, end in windows:
+        if day not in days:
+            continue
+        for period, (period_start, period_end) in enumerate(periods):
+            if period_start < end and start < period_end:
+                blocked.add(days.index(day) * len(periods) + period)
+    return blocked
+
+class _Search:
+    """Min-conflicts local search with a short tabu list over one occurrence per weekly lesson period.
+
+    Classes and teachers must never share a slot (hard); a lesson should not
+    meet more often on one day than spreading it over the week requires (soft).
+    """
+
+    def __init__(self, lessons, day_count, period_count, blocked, rng):
+        self.period_count = period_count
+        self.rng = rng
+        slot_count = day_count * period_count
+
+        self.lesson_of = [index for index, lesson in enumerate(lessons) for _ in range(lesson.periods)]
+        self.class_of = [lessons[index].class_id for index in self.lesson_of]
+        self.teacher_of = [lessons[index].teacher_id for index in self.lesson_of]
+        self.domain = [
+            [slot for slot in range(slot_count) if slot not in blocked.get(teacher_id, ())]
+            for teacher_id in self.teacher_of
+        ]
+        self.cap = [math.ceil(lesson.periods / day_count) for lesson in lessons]
+
+        self.cells = {}
+        for class_id, teacher_id in zip(self.class_of, self.teacher_of):
+            self.cells.setdefault(('class', class_id), [set() for _ in range(slot_count)])
+            if teacher_id is not None:
+                self.cells.setdefault(('teacher', teacher_id), [set() for _ in range(slot_count)])
+        self.lesson_days = [[0] * day_count for _ in lessons]
+        self.occurrences = [[] for _ in lessons]
+        for occurrence, lesson in enumerate(self.lesson_of):
+            self.occurrences[lesson].append(occurrence)
+        self.slot = [None] * len(self.lesson_of)
+        self.hot = set()
+        self.hard = 0
+        self.crowded = set()
+        self.soft = 0
+
+    def _keys(self, occurrence):
+        yield 'class', self.class_of[occurrence]
+        if self.teacher_of[occurrence] is not None:
+            yield 'teacher', self.teacher_of[occurrence]
+
+    def _place(self, occurrence, slot):
+        self.slot[occurrence] = slot
+        for key in self._keys(occurrence):
+            cell = self.cells[key][slot]
+            cell.add(occurrence)
+            if len(cell) >= 2:
+                self.hard += 1
+                self.hot.add((key, slot))
+        lesson, day = self.lesson_of[occurrence], slot // self.period_count
+        self.lesson_days[lesson][day] += 1
+        if self.lesson_days[lesson][day] > self.cap[lesson]:
+            self.soft += 1
+            self.crowded.add((lesson, day))
+
+    def _unplace(self, occurrence):
+        slot = self.slot[occurrence]
+        for key in self._keys(occurrence):
+            cell = self.cells[key][slot]
+            if len(cell) >= 2:
+                self.hard -= 1
+                if len(cell) == 2:
+                    self.hot.discard((key, slot))
+            cell.discard(occurrence)
+        lesson, day = self.lesson_of[occurrence], slot // self.period_count
+        if self.lesson_days[lesson][day] > self.cap[lesson]:
+            self.soft -= 1
+            if self.lesson_days[lesson][day] == self.cap[lesson] + 1:
+                self.crowded.discard((lesson, day))
+        self.lesson_days[lesson][day] -= 1
+
+    def _soft_delta(self, occurrence, target):
+        lesson = self.lesson_of[occurrence]
+        source_day, target_day = self.slot[occurrence] // self.period_count, target // self.period_count
+        if source_day == target_day:
+            return 0
+        days = self.lesson_days[lesson]
+        return (days[target_day] >= self.cap[lesson]) - (days[source_day] > self.cap[lesson])
+
+    def _move_delta(self, occurrence, target):
+        source = self.slot[occurrence]
+        delta = 0
+        for key in self._keys(occurrence):
+            cells = self.cells[key]
+            delta += HARD * ((len(cells[target]) >= 1) - (len(cells[source]) >= 2))
+        return delta + self._soft_delta(occurrence, target)
+
+    def _swap_delta(self, first, second):
+        # Same class, so only the teachers' cells and the lessons' days change
+        source, target = self.slot[first], self.slot[second]
+        delta = 0
+        if self.teacher_of[first] != self.teacher_of[second]:
+            for occurrence, old, new in ((first, source, target), (second, target, source)):
+                if self.teacher_of[occurrence] is not None:
+                    cells = self.cells[('teacher', self.teacher_of[occurrence])]
+                    delta += HARD * ((len(cells[new]) >= 1) - (len(cells[old]) >= 2))
+        if self.lesson_of[first] != self.lesson_of[second]:
+            delta += self._soft_delta(first, target) + self._soft_delta(second, source)
+        return delta
+
+    def construct(self):
+        # Most constrained first: fewest available slots, then random order
+        order = sorted(range(len(self.slot)), key=lambda occurrence: (len(self.domain[occurrence]), self.rng.random()))
+        for occurrence in order:
+            best, best_cost = [], None
+            for slot in self.domain[occurrence]:
+                cost = sum(HARD for key in self._keys(occurrence) if self.cells[key][slot])
+                lesson = self.lesson_of[occurrence]
+                cost += self.lesson_days[lesson][slot // self.period_count] >= self.cap[lesson]
+                if best_cost is None or cost < best_cost:
+                    best, best_cost = [slot], cost
+                elif cost == best_cost:
+                    best.append(slot)
+            self._place(occurrence, self.rng.choice(best))
+
+    def _moves(self, occurrence):
+        source = self.slot[occurrence]
+        class_cells = self.cells[('class', self.class_of[occurrence])]
+        moves = []
+        for target in self.domain[occurrence]:
+            if target == source:
+                continue
+            moves.append((self._move_delta(occurrence, target), target, None))
+            if len(class_cells[target]) == 1:
+                other = next(iter(class_cells[target]))
+                if source in self.domain[other]:
+                    moves.append((self._swap_delta(occurrence, other), target, other))
+        return moves
+
+    def _apply(self, occurrence, target, other):
+        source = self.slot[occurrence]
+        self._unplace(occurrence)
+        if other is not None:
+            self._unplace(other)
+            self._place(other, source)
+        self._place(occurrence, target)
+
+    def improve(self, deadline):
+        """Move occurrences out of clashing cells until there are none or time runs out."""
+        tabu = {}
+        iteration = 0
+        while self.hard and (iteration % 100 or time.monotonic() < deadline):
+            iteration += 1
+            key, source = self.rng.choice(sorted(self.hot))
+            occurrence = self.rng.choice(sorted(self.cells[key][source]))
+            moves = self._moves(occurrence)
+            if not moves:
+                continue
+
+            if self.rng.random() < RANDOM_MOVE_RATE:
+                _, target, other = self.rng.choice(moves)
+            else:
+                # Tabu moves are allowed only when they clear every remaining clash
+                allowed = [move for move in moves
+                           if tabu.get((occurrence, move[1]), 0) < iteration or self.hard * HARD + move[0] < HARD]
+                if not allowed:
+                    continue
+                best = min(move[0] for move in allowed)
+                _, target, other = self.rng.choice([move for move in allowed if move[0] == best])
+
+            tabu[(occurrence, source)] = iteration + TABU_TENURE
+            if other is not None:
+                tabu[(other, target)] = iteration + TABU_TENURE
+            self._apply(occurrence, target, other)
+
+    def spread(self, deadline, patience):
+        """Spread bunched lessons over the week without introducing clashes."""
+        stale = 0
+        while self.soft and stale < patience and (stale % 100 or time.monotonic() < deadline):
+            stale += 1
+            lesson, day = self.rng.choice(sorted(self.crowded))
+            occurrence = self.rng.choice([
+                occurrence for occurrence in self.occurrences[lesson]
+                if self.slot[occurrence] // self.period_count == day
+            ])
+            # Sideways moves (delta 0) let the search drift towards an improving one
+            moves = [move for move in self._moves(occurrence) if move[0] <= 0]
+            if not moves:
+                continue
+            best = min(move[0] for move in moves)
+            _, target, other = self.rng.choice([move for move in moves if move[0] == best])
+            if best < 0:
+                stale = 0
+            self._apply(occurrence, target, other)
+
+def generate_timetable(lessons, days, periods, blocked=None, seed=0, time_limit=10):
+    """Place every weekly period of ``lessons`` so that no class or teacher is booked twice.
+
+    ``periods`` are the ``(start, end)`` minutes of each teaching period of a
+    day, so breaks are simply the gaps between them; ``blocked`` maps teacher
+    ids to slot numbers (see ``blocked_slots``) they cannot teach in. The same
+    input and ``seed`` give the same timetable unless ``time_limit`` seconds
+    cut the search short. Returns Slots and raises ValueError when there is
+    no room for the lessons or no conflict-free timetable was found in time.
+    """
+    blocked = blocked or {}
+    slot_count = len(days) * len(periods)
+
+    loads = {}
+    for lesson in lessons:
+        loads[('class', lesson.class_id)] = loads.get(('class', lesson.class_id), 0) + lesson.periods
+        if lesson.teacher_id is not None:
+            loads[('teacher', lesson.teacher_id)] = loads.get(('teacher', lesson.teacher_id), 0) + lesson.periods
+    for (kind, key), load in sorted(loads.items(), key=lambda item: (item[0][0], item[0][1])):
+        available = slot_count - (len(blocked.get(key, ())) if kind == 'teacher' else 0)
+        if load > available:
+            raise ValueError(f'{kind.capitalize()} {key} has {load} periods but only {available} free slots')
+
+    search = _Search(lessons, len(days), len(periods), blocked, random.Random(seed))
+    deadline = time.monotonic() + time_limit
+    search.construct()
+    search.improve(deadline)
+    if search.hard:
+        raise ValueError(f'No conflict-free timetable found within {time_limit} seconds ({search.hard} clashes left)')
+    search.spread(deadline, patience=SPREAD_PATIENCE * len(search.slot))
+
+    slots = []
+    for occurrence, slot in enumerate(search.slot):
+        lesson = lessons[search.lesson_of[occurrence]]
+        start, end = periods[slot % len(periods)]
+        slots.append(Slot(None, lesson.class_id, lesson.subject_id, lesson.teacher_id, None,
+                          days[slot // len(periods)], start, end))
+    return sorted(slots, key=lambda slot: (slot.class_id, days.index(slot.day_of_week), slot.start))